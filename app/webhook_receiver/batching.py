@@ -0,0 +1,116 @@
+"""
+Micro-batched GLPI ticket creation for the Axity Webhook Receiver
+Collects tickets from concurrent workers and sends them in a single POST
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from glpi import AsyncGLPIClient
+from metrics import batch_pending, glpi_batch_size, glpi_batch_fallbacks_total
+
+logger = logging.getLogger(__name__)
+
+
+class TicketBatcher:
+    """Groups ticket creations for up to ``window`` seconds or ``max_items`` tickets
+
+    Each caller awaits its own result. Items GLPI rejects inside a batch (or a
+    batch that fails as a whole) are retried one by one so a single bad ticket
+    does not fail its neighbours.
+
+    ``waiters`` returns how many callers could submit at all (e.g. the busy
+    queue workers); once all of them are waiting on a result the pending
+    batch is sent without waiting out the window, since nobody else can
+    join it. ``wake()`` re-checks this when that number drops.
+    """
+
+    def __init__(self, client: AsyncGLPIClient, max_items: int = 20, window: float = 0.2,
+                 waiters: Optional[Callable[[], int]] = None):
+        self.client = client
+        self.max_items = max(1, max_items)
+        self.window = window
+        self.waiters = waiters
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending: Set[asyncio.Task] = set()
+        self._waiting = 0
+
+    async def submit(self, ticket: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Queue a ticket input for the next batch and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((ticket, future))
+        batch_pending.inc()
+
+        self._waiting += 1
+        try:
+            if len(self._pending) >= self.max_items or self._everyone_waiting():
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+            return await future
+        finally:
+            self._waiting -= 1
+
+    def wake(self):
+        """Send the pending batch now if no other caller can still join it"""
+        if self._pending and self._everyone_waiting():
+            self._flush()
+
+    async def flush(self):
+        """Send whatever is pending and wait for every batch in flight"""
+        self._flush()
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    def _everyone_waiting(self) -> bool:
+        # Callers whose batch is already in flight cannot join this one either
+        return self.waiters is not None and self._waiting >= self.waiters()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        batch_pending.dec(len(batch))
+        # Callers cancelled meanwhile (shutdown) will retry their job; don't create orphan tickets
+        batch = [(ticket, future) for ticket, future in batch if not future.cancelled()]
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        tickets = [ticket for ticket, _ in batch]
+        glpi_batch_size.observe(len(tickets))
+
+        try:
+            results = await self.client.create_tickets(tickets)
+        except Exception as e:
+            logger.error("Error sending ticket batch of %s: %s", len(tickets), e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Tickets the batch created are final: resolve them before any fallback can fail
+        retry = []
+        for (ticket, future), result in zip(batch, results):
+            if result is None and len(batch) > 1:
+                retry.append((ticket, future))
+            elif not future.done():
+                future.set_result(result)
+
+        for ticket, future in retry:
+            glpi_batch_fallbacks_total.inc()
+            try:
+                result = (await self.client.create_tickets([ticket]))[0]
+            except Exception as e:
+                logger.error("Error retrying rejected ticket '%s': %s", ticket.get('name'), e)
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(result)
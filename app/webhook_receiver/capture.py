@@ -0,0 +1,154 @@
+"""
+Traffic capture for the Axity Webhook Receiver
+Records every incoming webhook body with its arrival time into rotating
+gzip-compressed NDJSON files that scripts/replay_capture.py can re-send
+"""
+
+import glob
+import gzip
+import heapq
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from metrics import capture_records_total
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_PATTERN = "capture-*.ndjson.gz"
+
+
+class TrafficCapture:
+    """Opt-in, non-blocking recorder of webhook requests
+
+    ``record()`` only puts a reference to the already-read body on a bounded
+    queue; a writer thread serializes, compresses and rotates. When the
+    queue is full the record is dropped and counted rather than slowing the
+    request down. Each process writes its own files (the pid is part of the
+    name), so several receiver workers can capture into one directory.
+
+    A file is rotated once ``max_bytes`` of uncompressed records were
+    written to it, and only the newest ``max_files`` files are kept. Open
+    files are sync-flushed every ``flush_interval`` seconds so a crash
+    loses at most that much traffic.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, max_files: int = 20,
+                 queue_size: int = 10000, flush_interval: float = 1.0, compresslevel: int = 6):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.flush_interval = flush_interval
+        self.compresslevel = compresslevel
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._file: Optional[gzip.GzipFile] = None
+        self._file_bytes = 0
+        self._sequence = 0
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Write out what is queued and close the current file"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Traffic capture queue still full at shutdown, closing without draining")
+        self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, path: str, body: bytes, received_at: float, content_type: Optional[str] = None):
+        """Queue one request body for capture, never blocking the caller"""
+        try:
+            self._queue.put_nowait((received_at, path, content_type, body))
+        except queue.Full:
+            capture_records_total.labels(result='dropped').inc()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    break
+                if item:
+                    self._write(*item)
+                if self._file and time.monotonic() - last_flush >= self.flush_interval:
+                    self._file.flush()
+                    last_flush = time.monotonic()
+        except Exception as e:
+            logger.error("Traffic capture stopped: %s", e, exc_info=True)
+        finally:
+            self._close_file()
+
+    def _write(self, received_at: float, path: str, content_type: Optional[str], body: bytes):
+        record = {"t": received_at, "path": path, "body": body.decode("utf-8", "surrogateescape")}
+        if content_type:
+            record["content_type"] = content_type
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        if self._file is None or self._file_bytes >= self.max_bytes:
+            self._rotate(received_at)
+        self._file.write(line)
+        self._file_bytes += len(line)
+        capture_records_total.labels(result='written').inc()
+
+    def _rotate(self, started_at: float):
+        self._close_file()
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(started_at))
+        path = os.path.join(self.directory, f"capture-{stamp}-{os.getpid()}-{self._sequence:04d}.ndjson.gz")
+        self._file = gzip.open(path, "wb", compresslevel=self.compresslevel)
+        self._file_bytes = 0
+        logger.info("Capturing webhook traffic to %s", path)
+        self._prune()
+
+    def _prune(self):
+        files = sorted(glob.glob(os.path.join(self.directory, CAPTURE_PATTERN)), key=os.path.getmtime)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning("Could not remove old capture file %s: %s", path, e)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_capture_file(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of one capture file, tolerating a file cut short by a crash"""
+    with gzip.open(path, "rb") as f:
+        try:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                record["body"] = record["body"].encode("utf-8", "surrogateescape")
+                yield record
+        except (EOFError, gzip.BadGzipFile):
+            return
+
+
+def read_capture(paths: List[str]) -> Iterator[Dict[str, Any]]:
+    """Records of several capture files (or directories) merged in arrival order"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, CAPTURE_PATTERN))))
+        else:
+            files.append(path)
+    return heapq.merge(*(read_capture_file(path) for path in files), key=lambda record: record["t"])
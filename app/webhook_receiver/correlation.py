@@ -0,0 +1,337 @@
+"""
+Alert storm correlation for the Axity Webhook Receiver
+When many alerts fire across groups at once, they share one parent GLPI ticket
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from glpi import AsyncGLPIClient
+from metrics import alerts_correlated_total, storm_active, storm_incidents_total
+from ticket_queue import connect
+
+logger = logging.getLogger(__name__)
+
+
+def alert_line(alert: Dict[str, Any], state: str) -> str:
+    """One-line summary of an alert for the parent ticket's followups"""
+    labels = alert.get('labels', {})
+    summary = alert.get('annotations', {}).get('summary', '')
+    return (f"{datetime.utcnow().isoformat(timespec='seconds')} {state} "
+            f"[{labels.get('severity', 'unknown').upper()}] {labels.get('alertname', 'Unknown Alert')} - "
+            f"{labels.get('service', labels.get('instance', 'unknown'))}: {summary}")
+
+
+class StormDetector:
+    """Sliding-window count of new firing alerts across Alertmanager groups
+
+    A storm is on while more than ``threshold`` alerts from at least
+    ``min_groups`` different groups arrived in the last ``window`` seconds.
+    Observations are kept in SQLite so every receiver process sees the
+    alerts the others received.
+    """
+
+    def __init__(self, threshold: int, path: str, window: float = 60.0, min_groups: int = 2):
+        self.threshold = threshold
+        self.window = window
+        self.min_groups = min_groups
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS storm_events (
+                    observed_at REAL NOT NULL,
+                    alerts INTEGER NOT NULL,
+                    group_key TEXT NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS storm_events_observed ON storm_events (observed_at)"
+            )
+
+    def observe(self, count: int, group_key: Optional[str]):
+        """Record ``count`` new firing alerts delivered in one notification"""
+        if count <= 0 or self.threshold <= 0:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO storm_events (observed_at, alerts, group_key) VALUES (?, ?, ?)",
+                (now, count, group_key or ''),
+            )
+            self._conn.execute("DELETE FROM storm_events WHERE observed_at < ?", (now - self.window,))
+
+    def stats(self) -> Tuple[int, int]:
+        """Alerts and distinct groups seen in the current window"""
+        with self._lock:
+            alerts, groups = self._conn.execute(
+                "SELECT COALESCE(SUM(alerts), 0), COUNT(DISTINCT group_key) FROM storm_events "
+                "WHERE observed_at >= ?",
+                (time.time() - self.window,),
+            ).fetchone()
+        return alerts, groups
+
+    def active(self) -> bool:
+        if self.threshold <= 0:
+            return False
+        alerts, groups = self.stats()
+        return alerts > self.threshold and groups >= self.min_groups
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class StormCorrelator:
+    """Collapses the alerts of a storm into one parent incident ticket
+
+    The first alert processed during a storm opens the parent ticket; every
+    other one is attached to it and summarised in a followup. Followups are
+    buffered and posted every ``followup_interval`` seconds, so GLPI sees one
+    write per interval instead of one ticket per alert. The buffer is in
+    SQLite, as the queue jobs of those alerts are already acked; lines left
+    by a previous run are posted after ``start()``. Parents and their
+    number of still-firing members are kept in SQLite: a member resolving
+    only adds a line, the parent is closed when its last member resolves and
+    the storm is over. If the storm is still on at that point, the detector
+    is checked again once its window has passed, since no new alert may come
+    to end the storm.
+    """
+
+    def __init__(self, client: AsyncGLPIClient, detector: StormDetector, path: str,
+                 followup_interval: float = 30.0):
+        self.client = client
+        self.detector = detector
+        self.followup_interval = followup_interval
+        self.parent: Optional[int] = None
+        self._storm = False
+        self._checked_at = 0.0
+        self._parent_lock = asyncio.Lock()
+        self._post_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._recheck: Optional[asyncio.TimerHandle] = None
+        self._rechecking: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS alert_storms (
+                    ticket_id INTEGER PRIMARY KEY,
+                    opened_at REAL NOT NULL,
+                    open_members INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS storm_followups (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ticket_id INTEGER NOT NULL,
+                    line TEXT NOT NULL
+                )
+            """)
+
+    def start(self):
+        """Schedule posting of followups buffered before a restart"""
+        if self._buffered() and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.followup_interval, self._schedule_flush)
+
+    async def active(self, check_interval: float = 1.0) -> bool:
+        """Whether new alerts should be attached to a storm parent
+
+        The detector is queried at most every ``check_interval`` seconds.
+        """
+        now = time.monotonic()
+        if now - self._checked_at >= check_interval:
+            self._checked_at = now
+            self._storm = await asyncio.to_thread(self.detector.active)
+        if self._storm:
+            storm_active.set(1)
+            return True
+
+        storm_active.set(0)
+        if self.parent is not None:
+            async with self._parent_lock:
+                parent, self.parent = self.parent, None
+            if parent is not None:
+                logger.info("Alert storm over, parent ticket #%s no longer takes new alerts", parent)
+                if await asyncio.to_thread(self._members, parent) == 0:
+                    await self._close_parent(parent)
+        return False
+
+    async def attach(self, alert: Dict[str, Any]) -> Optional[int]:
+        """Attach a firing alert to the storm parent, returning the parent ticket ID"""
+        parent = await self._parent_ticket(alert)
+        if parent is None:
+            return None
+
+        await asyncio.to_thread(self._add_members, parent, 1)
+        alerts_correlated_total.inc()
+        await self._append(parent, alert_line(alert, 'FIRING'))
+        return parent
+
+    async def resolve(self, ticket_id: int, alert: Dict[str, Any]) -> Optional[bool]:
+        """Handle a resolved member of a storm parent
+
+        Returns None when ``ticket_id`` is not a storm parent, otherwise
+        whether the resolution was recorded.
+        """
+        members = await asyncio.to_thread(self._add_members, ticket_id, -1)
+        if members is None:
+            return None
+
+        await self._append(ticket_id, alert_line(alert, 'RESOLVED'))
+        if members == 0:
+            if ticket_id != self.parent:
+                return await self._close_parent(ticket_id)
+            # Closes the parent when the storm is over, or tries again after the window
+            if await self.active(check_interval=0):
+                self._schedule_recheck()
+        return True
+
+    async def flush(self):
+        """Post every buffered followup now"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        await self._post_followups()
+
+    def close(self):
+        if self._recheck is not None:
+            self._recheck.cancel()
+            self._recheck = None
+        self.detector.close()
+        with self._lock:
+            self._conn.close()
+
+    async def _parent_ticket(self, alert: Dict[str, Any]) -> Optional[int]:
+        async with self._parent_lock:
+            if self.parent is not None:
+                return self.parent
+
+            alerts, groups = await asyncio.to_thread(self.detector.stats)
+            title = f"[STORM] {alerts} alerts across {groups} alert groups"
+            description = (
+                f"Alert storm detected: more than {self.detector.threshold} firing alerts from "
+                f"{groups} Alertmanager groups within {self.detector.window:.0f}s.\n\n"
+                f"Instead of one ticket per alert, the alerts of this storm are attached to this "
+                f"incident and listed in its followups.\n\nFirst alert:\n{alert_line(alert, 'FIRING')}\n\n"
+                f"This ticket was automatically created by the Axity Infrastructure Monitoring System."
+            )
+            result = await self.client.create_ticket(title, description, urgency=5, priority=5)
+            if not result:
+                return None
+
+            self.parent = result["id"]
+            await asyncio.to_thread(self._open, self.parent)
+            storm_incidents_total.inc()
+            logger.warning("Alert storm detected, opened parent ticket #%s: %s", self.parent, title)
+            return self.parent
+
+    async def _close_parent(self, ticket_id: int) -> bool:
+        await self.flush()
+        closed = await self.client.close_ticket(ticket_id)
+        if closed:
+            await asyncio.to_thread(self._forget, ticket_id)
+        return closed
+
+    def _schedule_recheck(self):
+        if self._recheck is not None:
+            self._recheck.cancel()
+        self._recheck = asyncio.get_running_loop().call_later(self.detector.window, self._start_recheck)
+
+    def _start_recheck(self):
+        self._recheck = None
+        self._rechecking = asyncio.create_task(self._recheck_parent())
+
+    async def _recheck_parent(self):
+        parent = self.parent
+        if parent is None:
+            return
+        try:
+            if await self.active(check_interval=0) and await asyncio.to_thread(self._members, parent) == 0:
+                self._schedule_recheck()
+        except Exception as e:
+            logger.error("Error checking whether alert storm #%s is over: %s", parent, e)
+
+    async def _append(self, ticket_id: int, line: str):
+        await asyncio.to_thread(self._store_line, ticket_id, line)
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.followup_interval, self._schedule_flush)
+
+    def _schedule_flush(self):
+        self._timer = None
+        self._flushing = asyncio.create_task(self._post_followups())
+
+    async def _post_followups(self):
+        async with self._post_lock:
+            pending = await asyncio.to_thread(self._buffered)
+            retry = False
+            for ticket_id, (last_id, lines) in pending.items():
+                content = f"{len(lines)} correlated alert updates:\n" + "\n".join(lines)
+                try:
+                    posted = await self.client.add_followup(ticket_id, content)
+                except Exception as e:
+                    logger.error("Error posting storm followup to ticket #%s: %s", ticket_id, e)
+                    posted = False
+                if posted:
+                    await asyncio.to_thread(self._drop_lines, ticket_id, last_id)
+                else:
+                    retry = True
+            # Unposted lines stay buffered for the next interval
+            if retry and self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.followup_interval, self._schedule_flush)
+
+    def _open(self, ticket_id: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO alert_storms (ticket_id, opened_at) VALUES (?, ?)",
+                (ticket_id, time.time()),
+            )
+
+    def _add_members(self, ticket_id: int, delta: int) -> Optional[int]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "UPDATE alert_storms SET open_members = MAX(0, open_members + ?) WHERE ticket_id = ? "
+                "RETURNING open_members",
+                (delta, ticket_id),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _members(self, ticket_id: int) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT open_members FROM alert_storms WHERE ticket_id = ?", (ticket_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _forget(self, ticket_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM alert_storms WHERE ticket_id = ?", (ticket_id,))
+            self._conn.execute("DELETE FROM storm_followups WHERE ticket_id = ?", (ticket_id,))
+
+    def _store_line(self, ticket_id: int, line: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO storm_followups (ticket_id, line) VALUES (?, ?)", (ticket_id, line))
+
+    def _buffered(self) -> Dict[int, Tuple[int, List[str]]]:
+        """Buffered lines per ticket, with the ID of the last one"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, ticket_id, line FROM storm_followups ORDER BY id").fetchall()
+        pending: Dict[int, Tuple[int, List[str]]] = {}
+        for line_id, ticket_id, line in rows:
+            lines = pending.get(ticket_id, (0, []))[1]
+            lines.append(line)
+            pending[ticket_id] = (line_id, lines)
+        return pending
+
+    def _drop_lines(self, ticket_id: int, last_id: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM storm_followups WHERE ticket_id = ? AND id <= ?", (ticket_id, last_id)
+            )
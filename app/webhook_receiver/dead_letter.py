@@ -0,0 +1,43 @@
+"""
+Dead-letter spool for the Axity Webhook Receiver
+Ticket actions that exhausted their retries are appended to a JSONL file
+and can be replayed later with: python3 scripts/open_alert.py --replay <file>
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class DeadLetterSpool:
+    """Append-only JSONL spool
+
+    Each record is serialized compactly and written with a single write(2)
+    on an O_APPEND descriptor, so appends stay cheap and lines from several
+    processes never interleave.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        self._lock = threading.Lock()
+
+    def append(self, record: Dict[str, Any]):
+        record = {"spooled_at": time.time(), **record}
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+        with self._lock:
+            os.write(self._fd, line)
+        logger.warning("Ticket action '%s' written to dead-letter spool %s", record.get('action'), self.path,
+                       extra={"fingerprint": record.get('fingerprint'), "ticket_id": record.get('ticket_id')})
+
+    def close(self):
+        with self._lock:
+            os.close(self._fd)
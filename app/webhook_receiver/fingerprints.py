@@ -0,0 +1,156 @@
+"""
+Alert fingerprint index for the Axity Webhook Receiver
+Maps Alertmanager fingerprints to GLPI ticket IDs so repeats don't open new tickets
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from ticket_queue import connect
+
+logger = logging.getLogger(__name__)
+
+
+def alert_fingerprint(alert: Dict[str, Any]) -> str:
+    """Alertmanager fingerprint, or a stable hash of the labels when absent"""
+    fingerprint = alert.get('fingerprint')
+    if fingerprint:
+        return fingerprint
+    labels = json.dumps(alert.get('labels', {}), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(labels.encode()).hexdigest()[:16]
+
+
+class FingerprintIndex:
+    """Persistent fingerprint -> ticket ID index with TTL eviction
+
+    A fingerprint is first *reserved* (ticket_id NULL) by the worker that will
+    create its ticket, so concurrent repeats of the same alert never race into
+    duplicate tickets. Reservations expire after ``pending_timeout`` in case the
+    worker dies; assigned entries expire ``ttl`` seconds after the alert was
+    last seen.
+    """
+
+    def __init__(self, path: str, ttl: float = 21600.0, pending_timeout: float = 60.0,
+                 evict_interval: float = 300.0):
+        self.ttl = ttl
+        self.pending_timeout = pending_timeout
+        self.evict_interval = evict_interval
+        self._last_evict = 0.0
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS alert_fingerprints (
+                    fingerprint TEXT PRIMARY KEY,
+                    ticket_id INTEGER,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS alert_fingerprints_expiry ON alert_fingerprints (expires_at)"
+            )
+
+    def reserve(self, fingerprint: str) -> Tuple[bool, Optional[int]]:
+        """Claim a fingerprint for ticket creation
+
+        Returns ``(True, None)`` when the caller must create the ticket, or
+        ``(False, ticket_id)`` when the alert is already tracked (ticket_id is
+        None while another worker is still creating it).
+        """
+        self._maybe_evict()
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM alert_fingerprints WHERE fingerprint = ? AND expires_at <= ?",
+                (fingerprint, now),
+            )
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO alert_fingerprints (fingerprint, ticket_id, created_at, expires_at) "
+                "VALUES (?, NULL, ?, ?)",
+                (fingerprint, now, now + self.pending_timeout),
+            ).rowcount
+            if inserted:
+                return True, None
+
+            # Seen again: slide the TTL of an existing ticket
+            self._conn.execute(
+                "UPDATE alert_fingerprints SET expires_at = ? WHERE fingerprint = ? AND ticket_id IS NOT NULL",
+                (now + self.ttl, fingerprint),
+            )
+            row = self._conn.execute(
+                "SELECT ticket_id FROM alert_fingerprints WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+        return False, row[0] if row else None
+
+    def assign(self, fingerprint: str, ticket_id: int):
+        """Record the ticket created for a reserved fingerprint"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO alert_fingerprints (fingerprint, ticket_id, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (fingerprint, ticket_id, time.time(), time.time() + self.ttl),
+            )
+
+    def release(self, fingerprint: str):
+        """Give up a reservation after a failed ticket creation"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM alert_fingerprints WHERE fingerprint = ? AND ticket_id IS NULL",
+                (fingerprint,),
+            )
+
+    def lookup(self, fingerprints: Iterable[str], refresh: bool = False) -> Dict[str, Optional[int]]:
+        """Live entries for the given fingerprints (ticket_id None while pending)
+
+        With ``refresh`` the alerts count as seen again: the TTL of those with
+        a ticket slides, as in reserve().
+        """
+        fingerprints = list(fingerprints)
+        if not fingerprints:
+            return {}
+        placeholders = ",".join("?" * len(fingerprints))
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                f"SELECT fingerprint, ticket_id FROM alert_fingerprints "
+                f"WHERE expires_at > ? AND fingerprint IN ({placeholders})",
+                (now, *fingerprints),
+            ).fetchall()
+            seen = [fingerprint for fingerprint, ticket_id in rows if ticket_id is not None]
+            if refresh and seen:
+                self._conn.execute(
+                    f"UPDATE alert_fingerprints SET expires_at = ? "
+                    f"WHERE fingerprint IN ({','.join('?' * len(seen))})",
+                    (now + self.ttl, *seen),
+                )
+        return dict(rows)
+
+    def forget(self, fingerprint: str):
+        """Drop a fingerprint once its ticket has been closed"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM alert_fingerprints WHERE fingerprint = ?", (fingerprint,))
+
+    def evict_expired(self) -> int:
+        """Delete expired entries, returning how many were removed"""
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM alert_fingerprints WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+        if removed:
+            logger.info("Evicted %s expired alert fingerprints", removed)
+        return removed
+
+    def _maybe_evict(self):
+        now = time.monotonic()
+        if now - self._last_evict >= self.evict_interval:
+            self._last_evict = now
+            self.evict_expired()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,401 @@
+"""
+Async GLPI API client for the Axity Webhook Receiver
+Uses a shared, pooled httpx.AsyncClient so GLPI round-trips never block the event loop
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from metrics import (
+    glpi_session_logins_total, glpi_session_reuse_total, glpi_session_reauth_total, glpi_retries_total,
+    glpi_stage_duration_seconds, glpi_responses_total, glpi_requests_in_flight,
+)
+from resilience import AdaptiveConcurrencyLimiter, CircuitBreaker, RetryPolicy, TokenBucket
+from shared_state import SharedState
+
+logger = logging.getLogger(__name__)
+
+# Errors raised before the request reached GLPI, safe to retry for any method
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE"}
+SESSION_KEY = "glpi_session_token"
+
+
+def build_http_client(pool_size: int = 20, keepalive: int = 10,
+                      timeout: float = 10.0, connect_timeout: float = 5.0) -> httpx.AsyncClient:
+    """Build the pooled keep-alive HTTP client shared by every GLPI call"""
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=keepalive,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+    )
+
+
+def ticket_input(title: str, description: str, urgency: int = 3, priority: int = 3) -> Dict[str, Any]:
+    """GLPI Ticket input for an automated incident"""
+    return {
+        "name": title,
+        "content": description,
+        "type": 1,           # 1 = Incident
+        "status": 1,         # 1 = New
+        "urgency": urgency,
+        "priority": priority,
+        "source": 6,         # 6 = Other (automated)
+        "_users_id_requester": 2,  # Assuming user ID 2 exists
+    }
+
+
+class AsyncGLPIClient:
+    """Async GLPI API Client
+
+    One instance is shared by the whole process: it logs in once, reuses the
+    Session-Token for every ticket and transparently logs in again when GLPI
+    answers 401 (expired or killed session).
+
+    Every call goes through an optional circuit breaker, token-bucket rate
+    limit and adaptive concurrency limit; while the breaker is open calls
+    raise CircuitOpenError without touching the network. Transient failures
+    (429/502/503/504, connection errors) are retried per ``retry``; a POST
+    whose response was lost, or answered 502/504, is not retried since GLPI
+    may have applied it.
+
+    With a ``session_store`` the Session-Token is shared with the other
+    receiver processes, so they all reuse a single GLPI login.
+    """
+
+    def __init__(self, http: httpx.AsyncClient, base_url: str, app_token: str,
+                 user_token: str, username: str, password: str,
+                 breaker: Optional[CircuitBreaker] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 concurrency: Optional[AdaptiveConcurrencyLimiter] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 session_store: Optional[SharedState] = None):
+        self.http = http
+        self.session_store = session_store
+        self.retry = retry or RetryPolicy(max_attempts=1)
+        self.breaker = breaker
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.base_url = base_url.rstrip('/')
+        self.user_token = user_token
+        self.username = username
+        self.password = password
+        self.session_token = None
+        self.headers = {
+            "Content-Type": "application/json",
+            "App-Token": app_token,
+        }
+        self._session_lock = asyncio.Lock()
+
+    def _auth_headers(self) -> Dict[str, str]:
+        # Try token-based authentication first
+        if self.user_token != "admin_token":
+            return {**self.headers, "Authorization": f"user_token {self.user_token}"}
+        # Fallback to username/password
+        return {**self.headers, "Authorization": f"Basic {self.username}:{self.password}"}
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying transient failures with jittered backoff"""
+        if method in IDEMPOTENT_METHODS:
+            retryable_errors, retryable_status = httpx.TransportError, RetryPolicy.RETRYABLE_STATUS
+        else:
+            retryable_errors, retryable_status = NOT_SENT_ERRORS, RetryPolicy.NOT_APPLIED_STATUS
+
+        for attempt in range(1, self.retry.max_attempts + 1):
+            last_attempt = attempt == self.retry.max_attempts
+            try:
+                response = await self._send_once(method, url, **kwargs)
+            except retryable_errors as e:
+                if last_attempt:
+                    raise
+                delay = self.retry.delay(attempt)
+                logger.warning("GLPI %s %s failed (%r), retrying in %.2fs", method, url, e, delay)
+            else:
+                if response.status_code not in retryable_status or last_attempt:
+                    return response
+                delay = self.retry.delay(attempt, response.headers.get("Retry-After"))
+                logger.warning("GLPI %s %s returned %s, retrying in %.2fs", method, url, response.status_code, delay)
+
+            glpi_retries_total.inc()
+            await asyncio.sleep(delay)
+
+    async def _send_once(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request through the breaker, rate limit and concurrency limit"""
+        if self.breaker:
+            self.breaker.before_call()
+
+        healthy = None
+        started = time.monotonic()
+        try:
+            async with self.concurrency or contextlib.nullcontext():
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire()
+                started = time.monotonic()
+                with glpi_requests_in_flight.track_inprogress():
+                    response = await self.http.request(method, url, **kwargs)
+            glpi_responses_total.labels(method=method, code=str(response.status_code)).inc()
+            healthy = response.status_code < 500
+            return response
+        except httpx.TransportError:
+            glpi_responses_total.labels(method=method, code='error').inc()
+            healthy = False
+            raise
+        finally:
+            latency = time.monotonic() - started
+            if self.breaker:
+                if healthy is None:
+                    self.breaker.record_cancelled()
+                elif healthy:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+            if self.concurrency and healthy is not None:
+                self.concurrency.record(latency, healthy)
+
+    async def init_session(self) -> bool:
+        """Initialize GLPI session"""
+        url = f"{self.base_url}/apirest.php/initSession"
+
+        try:
+            with glpi_stage_duration_seconds.labels(stage='session_init').time():
+                response = await self._send("GET", url, headers=self._auth_headers())
+            response.raise_for_status()
+
+            session_data = response.json()
+            self.session_token = session_data.get("session_token")
+
+            if self.session_token:
+                self.headers["Session-Token"] = self.session_token
+                if self.session_store:
+                    await asyncio.to_thread(self.session_store.set, SESSION_KEY, self.session_token)
+                glpi_session_logins_total.inc()
+                logger.info("GLPI session initialized successfully")
+                return True
+            else:
+                logger.error("Failed to get session token from GLPI response")
+                return False
+
+        except httpx.HTTPError as e:
+            logger.error("Error initializing GLPI session: %s", e)
+            return False
+        except json.JSONDecodeError as e:
+            logger.error("Invalid JSON response from GLPI: %s", e)
+            return False
+
+    async def ensure_session(self) -> bool:
+        """Reuse the cached session, logging in only when there is none"""
+        if self.session_token:
+            glpi_session_reuse_total.inc()
+            return True
+
+        # Concurrent callers wait for a single login instead of stampeding GLPI
+        async with self._session_lock:
+            if self.session_token:
+                glpi_session_reuse_total.inc()
+                return True
+            # Another process may already be logged in
+            if self.session_store:
+                token = await asyncio.to_thread(self.session_store.get, SESSION_KEY)
+                if token:
+                    self.session_token = token
+                    self.headers["Session-Token"] = token
+                    glpi_session_reuse_total.inc()
+                    return True
+            return await self.init_session()
+
+    async def _invalidate(self, token: str):
+        """Drop a session token GLPI rejected, unless it was already replaced"""
+        if self.session_token == token:
+            self.session_token = None
+            self.headers.pop("Session-Token", None)
+        if self.session_store:
+            await asyncio.to_thread(self.session_store.delete, SESSION_KEY, token)
+
+    async def _request(self, method: str, endpoint: str, stage: str, **kwargs) -> Optional[httpx.Response]:
+        """Send an authenticated request, re-authenticating once on 401
+
+        The time spent talking to GLPI (rate limit, retries included) is
+        recorded under ``stage``; a login it triggers counts as session_init.
+        """
+        url = f"{self.base_url}/apirest.php/{endpoint}"
+
+        for attempt in range(2):
+            if not await self.ensure_session():
+                return None
+
+            token = self.session_token
+            headers = {**self.headers, "Session-Token": token}
+            with glpi_stage_duration_seconds.labels(stage=stage).time():
+                response = await self._send(method, url, headers=headers, **kwargs)
+
+            if response.status_code != 401 or attempt:
+                return response
+
+            glpi_session_reauth_total.inc()
+            logger.warning("GLPI session expired or invalid, re-authenticating")
+            await self._invalidate(token)
+
+        return response
+
+    async def create_ticket(self, title: str, description: str, urgency: int = 3, priority: int = 3) -> Optional[Dict[str, Any]]:
+        """Create a ticket in GLPI"""
+        results = await self.create_tickets([ticket_input(title, description, urgency, priority)])
+        return results[0]
+
+    async def create_tickets(self, batch: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Create several tickets with a single POST using GLPI's array input
+
+        Results come back in the order of ``batch``; items GLPI rejected are None.
+        """
+        if not batch:
+            return []
+
+        payload = {"input": batch if len(batch) > 1 else batch[0]}
+
+        try:
+            response = await self._request("POST", "Ticket", 'ticket_create', json=payload)
+            if response is None:
+                logger.error("No active GLPI session. Cannot create ticket.")
+                return [None] * len(batch)
+            response.raise_for_status()
+            result = response.json()
+
+        except httpx.HTTPError as e:
+            logger.error("Error creating GLPI ticket: %s", e)
+            return [None] * len(batch)
+        except json.JSONDecodeError as e:
+            logger.error("Invalid JSON response from GLPI: %s", e)
+            return [None] * len(batch)
+
+        items = result if isinstance(result, list) else [result]
+        results = []
+        for ticket, item in zip(batch, items + [None] * (len(batch) - len(items))):
+            if isinstance(item, dict) and item.get("id"):
+                logger.info("GLPI ticket created successfully: ID #%s", item['id'], extra={"ticket_id": item['id']})
+                results.append(item)
+            else:
+                logger.error("Failed to create ticket '%s' - no ID in response: %s", ticket.get('name'), item)
+                results.append(None)
+        return results
+
+    async def add_followup(self, ticket_id: int, content: str) -> bool:
+        """Append a followup to an existing ticket"""
+        payload = {
+            "input": {
+                "itemtype": "Ticket",
+                "items_id": ticket_id,
+                "content": content,
+            }
+        }
+
+        try:
+            response = await self._request("POST", "ITILFollowup", 'followup', json=payload)
+            if response is None:
+                logger.error("No active GLPI session. Cannot add followup.")
+                return False
+            response.raise_for_status()
+            logger.info("Followup added to GLPI ticket #%s", ticket_id, extra={"ticket_id": ticket_id})
+            return True
+
+        except httpx.HTTPError as e:
+            logger.error("Error adding followup to GLPI ticket #%s: %s", ticket_id, e, extra={"ticket_id": ticket_id})
+            return False
+
+    async def close_ticket(self, ticket_id: int, status: int = 6) -> bool:
+        """Move a ticket to a final status (5 = Solved, 6 = Closed)"""
+        payload = {"input": {"id": ticket_id, "status": status}}
+
+        try:
+            response = await self._request("PUT", f"Ticket/{ticket_id}", 'ticket_close', json=payload)
+            if response is None:
+                logger.error("No active GLPI session. Cannot close ticket.")
+                return False
+            response.raise_for_status()
+            logger.info("GLPI ticket #%s closed", ticket_id, extra={"ticket_id": ticket_id})
+            return True
+
+        except httpx.HTTPError as e:
+            logger.error("Error closing GLPI ticket #%s: %s", ticket_id, e, extra={"ticket_id": ticket_id})
+            return False
+
+    async def warm_up(self, connections: int = 1) -> int:
+        """Log in and open up to ``connections`` keep-alive connections to GLPI
+
+        Meant for startup, before the receiver reports ready, so that the
+        first alerts pay neither the login nor the TCP/TLS handshakes. The
+        read-only requests used to open connections are sent concurrently,
+        bypassing the rate and concurrency limits. Returns how many answered.
+        """
+        if not await self.ensure_session():
+            return 0
+        url = f"{self.base_url}/apirest.php/getActiveProfile"
+        headers = {**self.headers, "Session-Token": self.session_token}
+
+        async def touch() -> bool:
+            try:
+                response = await self.http.get(url, headers=headers)
+            except httpx.HTTPError:
+                return False
+            return response.status_code < 500
+
+        return sum(await asyncio.gather(*(touch() for _ in range(max(1, connections)))))
+
+    async def find_item_id(self, itemtype: str, field: str, value: str) -> Optional[int]:
+        """ID of the ``itemtype`` item whose ``field`` equals ``value``, None when there is none
+
+        GLPI's searchText is a substring match, so candidates are filtered
+        for an exact (case-insensitive) match here. HTTP errors and a missing
+        session are raised, so that callers can tell "not found" from "GLPI
+        unavailable".
+        """
+        params = {f"searchText[{field}]": value, "range": "0-49"}
+        response = await self._request("GET", itemtype, 'lookup', params=params)
+        if response is None:
+            raise httpx.HTTPError("No active GLPI session")
+        response.raise_for_status()
+        items = response.json() if response.status_code != 204 else []
+        wanted = value.casefold()
+        for item in items if isinstance(items, list) else []:
+            if str(item.get(field, "")).casefold() == wanted:
+                return int(item["id"])
+        return None
+
+    async def ping(self) -> bool:
+        """Check that GLPI answers an authenticated request, without changing anything
+
+        Returns False when no session could be opened; HTTP errors are raised
+        so that callers can report them.
+        """
+        response = await self._request("GET", "getActiveProfile", 'health_probe')
+        if response is None:
+            return False
+        response.raise_for_status()
+        return True
+
+    async def close_session(self):
+        """Close GLPI session"""
+        if not self.session_token:
+            return
+        if self.session_store:
+            await asyncio.to_thread(self.session_store.delete, SESSION_KEY, self.session_token)
+
+        url = f"{self.base_url}/apirest.php/killSession"
+        try:
+            with glpi_stage_duration_seconds.labels(stage='session_close').time():
+                response = await self.http.get(url, headers=self.headers)
+            if response.status_code == 200:
+                logger.info("GLPI session closed")
+        except httpx.HTTPError:
+            pass  # Ignore errors when closing session
+        finally:
+            self.session_token = None
+            self.headers.pop("Session-Token", None)
@@ -0,0 +1,103 @@
+"""
+Background GLPI health probe for the Axity Webhook Receiver
+Checks GLPI reachability on a timer so that /ready and /metrics answer from a
+cached result instead of calling GLPI on every request
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from glpi import AsyncGLPIClient
+from metrics import glpi_probe_failures_total, glpi_probe_last_success, glpi_probe_latency_seconds, glpi_up
+
+logger = logging.getLogger(__name__)
+
+
+class GLPIHealthProber:
+    """Periodically checks that GLPI accepts an authenticated, read-only request
+
+    The probe reuses the shared GLPI session (logging in only when there is
+    none) and never creates anything. Its result is cached: readers such as
+    Kubernetes readiness probes cost no GLPI call, however often they come.
+    A result older than ``stale_after`` seconds counts as not ready, so a
+    stuck prober cannot keep reporting a stale success.
+    """
+
+    def __init__(self, client: AsyncGLPIClient, interval: float = 15.0, timeout: float = 5.0,
+                 stale_after: float = 60.0):
+        self.client = client
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.ok: Optional[bool] = None
+        self.checked_at: Optional[float] = None
+        self.last_success_at: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.error: Optional[str] = None
+        self.consecutive_failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="glpi-health-probe")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def probe(self) -> bool:
+        """Check GLPI now and cache the result"""
+        started = time.monotonic()
+        error = None
+        try:
+            ok = await asyncio.wait_for(self.client.ping(), self.timeout)
+            if not ok:
+                error = "GLPI login failed"
+        except asyncio.TimeoutError:
+            ok, error = False, f"no answer within {self.timeout:.1f}s"
+        except Exception as e:
+            ok, error = False, str(e) or type(e).__name__
+
+        self.latency = time.monotonic() - started
+        self.checked_at = time.time()
+        glpi_probe_latency_seconds.set(self.latency)
+        glpi_up.set(1 if ok else 0)
+        if ok:
+            if self.ok is False:
+                logger.info("GLPI reachable again after %s failed probes", self.consecutive_failures)
+            self.last_success_at = self.checked_at
+            self.consecutive_failures = 0
+            glpi_probe_last_success.set(self.checked_at)
+        else:
+            if self.ok is not False:
+                logger.warning("GLPI health probe failed: %s", error)
+            self.consecutive_failures += 1
+            glpi_probe_failures_total.inc()
+        self.ok = ok
+        self.error = error
+        return ok
+
+    @property
+    def ready(self) -> bool:
+        """Whether the last probe succeeded and is recent enough to trust"""
+        return bool(self.ok) and self.checked_at is not None and time.time() - self.checked_at <= self.stale_after
+
+    def status(self) -> Dict[str, Any]:
+        """Cached probe result, for /ready and /health"""
+        return {
+            "reachable": self.ok,
+            "checked_at": self.checked_at,
+            "age_seconds": round(time.time() - self.checked_at, 3) if self.checked_at else None,
+            "last_success_at": self.last_success_at,
+            "latency_seconds": round(self.latency, 4) if self.latency is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "error": self.error,
+        }
+
+    async def _run(self):
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,181 @@
+"""
+Fast-path Alertmanager payload and host event ingestion for the Axity Webhook Receiver
+Parses the raw request body and validates only the fields the receiver uses
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, json is the fallback
+    orjson = None
+
+
+class AlertPayload(BaseModel):
+    """Alertmanager webhook payload structure"""
+    receiver: str
+    status: str
+    alerts: List[Dict[str, Any]]
+    groupKey: Optional[str] = None
+    truncatedAlerts: Optional[int] = 0
+    groupLabels: Optional[Dict[str, str]] = {}
+    commonLabels: Optional[Dict[str, str]] = {}
+    commonAnnotations: Optional[Dict[str, str]] = {}
+    externalURL: Optional[str] = None
+    version: Optional[str] = "4"
+
+
+class PayloadError(ValueError):
+    """The request body is not a usable Alertmanager notification"""
+
+
+def loads(data: bytes) -> Any:
+    """Decode JSON with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def parse_alertmanager_payload(body: bytes) -> Dict[str, Any]:
+    """Decode and validate an Alertmanager webhook body
+
+    Unlike ``AlertPayload`` this does not build models or copy the alerts: it
+    only checks the fields the receiver reads (receiver, status, alerts and,
+    per alert, status, fingerprint, labels and annotations) and returns the
+    decoded dict as-is.
+    """
+    try:
+        payload = loads(body)
+    except ValueError as e:
+        raise PayloadError(f"Invalid JSON body: {e}") from None
+
+    if not isinstance(payload, dict):
+        raise PayloadError("Payload must be a JSON object")
+    for field in ("receiver", "status"):
+        if not isinstance(payload.get(field), str):
+            raise PayloadError(f"Field '{field}' is required and must be a string")
+
+    alerts = payload.get("alerts")
+    if not isinstance(alerts, list):
+        raise PayloadError("Field 'alerts' is required and must be a list")
+
+    for index, alert in enumerate(alerts):
+        if not isinstance(alert, dict):
+            raise PayloadError(f"alerts[{index}] must be an object")
+        if not isinstance(alert.get("status", ""), str):
+            raise PayloadError(f"alerts[{index}].status must be a string")
+        if not isinstance(alert.get("fingerprint", ""), str):
+            raise PayloadError(f"alerts[{index}].fingerprint must be a string")
+        for field in ("labels", "annotations"):
+            values = alert.get(field, {})
+            if not isinstance(values, dict) or not all(isinstance(v, str) for v in values.values()):
+                raise PayloadError(f"alerts[{index}].{field} must map strings to strings")
+
+    return payload
+
+
+# Host event status -> Alertmanager alert status
+HOST_EVENT_STATUS = {
+    "firing": "firing", "problem": "firing", "critical": "firing", "warning": "firing",
+    "resolved": "resolved", "ok": "resolved", "recovered": "resolved",
+}
+
+
+# Optional host event fields that end up in the fingerprint, labels or annotations
+HOST_EVENT_SCALARS = ("status", "severity", "mount_point", "message", "value", "usage_percent", "threshold",
+                      "timestamp")
+
+
+def parse_host_events(body: bytes, max_events: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Decode an NDJSON batch of host agent events
+
+    Each non-empty line is one event object with at least a host
+    (``host``/``hostname``) and a check name (``check``/``alert``/
+    ``alert_type``). The flat objects monitor_disk.sh used to POST to
+    /alert are valid events. A bad line only rejects that line: the valid
+    events and one error message per bad line are returned. Raises
+    PayloadError when the batch holds more than ``max_events`` lines.
+    """
+    events: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    for line_no, line in enumerate(body.splitlines(), 1):
+        if not line.strip():
+            continue
+        if len(events) + len(errors) >= max_events:
+            raise PayloadError(f"Batch exceeds {max_events} events")
+        try:
+            event = loads(line)
+        except ValueError:
+            errors.append(f"line {line_no}: invalid JSON")
+            continue
+        if not isinstance(event, dict):
+            errors.append(f"line {line_no}: event must be an object")
+            continue
+
+        host = event.get("host", event.get("hostname"))
+        check = event.get("check", event.get("alert", event.get("alert_type")))
+        status = HOST_EVENT_STATUS.get(str(event.get("status", "firing")).lower())
+        labels = event.get("labels", {})
+        nested = [field for field in HOST_EVENT_SCALARS if isinstance(event.get(field), (dict, list))]
+        if nested:
+            errors.append(f"line {line_no}: '{nested[0]}' must be a string or a number")
+        elif not isinstance(host, str) or not host:
+            errors.append(f"line {line_no}: 'host' is required and must be a string")
+        elif not isinstance(check, str) or not check:
+            errors.append(f"line {line_no}: 'check' is required and must be a string")
+        elif status is None:
+            errors.append(f"line {line_no}: unknown status {event.get('status')!r}")
+        elif not isinstance(labels, dict) or not all(isinstance(v, str) for v in labels.values()):
+            errors.append(f"line {line_no}: 'labels' must map strings to strings")
+        else:
+            events.append(event)
+    return events, errors
+
+
+def host_event_key(event: Dict[str, Any]) -> Tuple:
+    """Events with the same key describe the same host/check and coalesce"""
+    labels = event.get("labels", {})
+    return (
+        event.get("host", event.get("hostname")),
+        event.get("check", event.get("alert", event.get("alert_type"))),
+        event.get("mount_point", ""),
+        tuple(sorted(labels.items())),
+    )
+
+
+def host_event_alert(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Alertmanager-style alert for a host event
+
+    The fingerprint comes from ``host_event_key``, so every report of a
+    host/check maps to one ticket whatever its severity; measurements go to
+    annotations, never to labels.
+    """
+    host = event.get("host", event.get("hostname"))
+    check = event.get("check", event.get("alert", event.get("alert_type")))
+    severity = str(event.get("severity", "warning")).lower()
+    labels = {
+        "alertname": check,
+        "severity": severity,
+        "service": "host-agent",
+        "instance": host,
+        **event.get("labels", {}),
+    }
+    if event.get("mount_point"):
+        labels["mountpoint"] = str(event["mount_point"])
+
+    summary = event.get("message") or f"{check} on {host}"
+    details = [f"{field}: {event[field]}" for field in ("value", "usage_percent", "threshold") if field in event]
+    return {
+        "status": HOST_EVENT_STATUS[str(event.get("status", "firing")).lower()],
+        "labels": labels,
+        "annotations": {
+            "summary": str(summary),
+            "description": "; ".join(details) or str(summary),
+        },
+        "startsAt": str(event.get("timestamp", "unknown")),
+        "fingerprint": hashlib.sha256(json.dumps(host_event_key(event)).encode()).hexdigest()[:16],
+    }
@@ -0,0 +1,152 @@
+"""
+Non-blocking logging for the Axity Webhook Receiver
+Request handlers only put log records on a queue; a dedicated thread formats
+and writes them, as JSON lines or text, with repeated messages rate-limited
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from metrics import log_records_dropped_total
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed with extra=
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with extra= fields (fingerprint, ticket_id...) as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most ``burst`` records per message template through every ``window`` seconds
+
+    Records are keyed by logger and unformatted message (``record.msg``), so
+    the same error about different tickets shares one budget as long as it
+    is logged lazily (``logger.error("... %s", ticket_id)``). The first
+    record let through after some were dropped carries a ``suppressed``
+    count. Records below ``min_level`` are never limited.
+    """
+
+    def __init__(self, burst: int = 10, window: float = 60.0, min_level: int = logging.WARNING):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.min_level = min_level
+        self._budgets: Dict[Tuple[str, object], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno < self.min_level:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            budget = self._budgets.get(key)
+            if budget is None or now - budget[0] >= self.window:
+                suppressed = budget[2] if budget else 0
+                budget = self._budgets[key] = [now, 0, 0]
+                if len(self._budgets) > 10000:
+                    self._prune(now)
+            else:
+                suppressed = 0
+            if budget[1] >= self.burst:
+                budget[2] += 1
+                log_records_dropped_total.labels(reason='rate_limited').inc()
+                return False
+            budget[1] += 1
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _prune(self, now: float):
+        for key in [k for k, b in self._budgets.items() if now - b[0] >= self.window]:
+            del self._budgets[key]
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks nor formats in the caller's thread
+
+    The stock handler formats the message and traceback before enqueueing;
+    here the record is enqueued as-is and the listener thread does all the
+    formatting. When the queue is full the record is dropped and counted
+    instead of stalling the event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.labels(reason='queue_full').inc()
+
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener whose stop waits for room in a full queue instead of failing"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel, timeout=5)
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", queue_size: int = 10000,
+                  rate_limit_burst: int = 10, rate_limit_window: float = 60.0,
+                  stream=None) -> QueueListener:
+    """Route every log record through a bounded queue to a writer thread
+
+    Replaces the handlers of the root logger; returns the started listener,
+    which is also stopped (and flushed) at interpreter exit.
+    """
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(RateLimitFilter(rate_limit_burst, rate_limit_window))
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    listener = DrainingQueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_listener, listener)
+    return listener
+
+
+def stop_listener(listener: Optional[QueueListener]):
+    """Write out the queued records and stop the writer thread"""
+    if listener is not None and listener._thread is not None:
+        try:
+            listener.stop()
+        except queue.Full:
+            pass
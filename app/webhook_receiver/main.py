@@ -5,30 +5,59 @@ Receives alerts from Prometheus Alertmanager and creates GLPI tickets
 """
 
 import os
-import json
+import secrets
+import signal
+import threading
+import gzip
+import math
+import time
+import asyncio
 import logging
-import traceback
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
-import requests
 import uvicorn
-from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
-from fastapi.responses import Response
-from pydantic import BaseModel, Field
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
-
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper()),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from batching import TicketBatcher
+from capture import TrafficCapture
+from correlation import StormCorrelator, StormDetector
+from dead_letter import DeadLetterSpool
+from glpi import AsyncGLPIClient, build_http_client, ticket_input
+from health import GLPIHealthProber
+from log_pipeline import setup_logging
+from ingest import (
+    AlertPayload, PayloadError, host_event_alert, host_event_key, parse_alertmanager_payload, parse_host_events,
 )
-logger = logging.getLogger(__name__)
+from profiling import (
+    LoopLagMonitor, MemoryTracker, ProfilerBusyError, SamplingProfiler, collapsed_stacks, profile_summary,
+)
+from rendering import DEFAULT_TEMPLATES_DIR, TicketRenderer
+from routing import TicketRouter
+from fingerprints import FingerprintIndex, alert_fingerprint
+from metrics import (
+    BoundedLabel, alerts_received_total, alerts_rejected_total, alerts_deduplicated_total, alerts_by_name_total,
+    tickets_created_total, tickets_closed_total, request_duration_seconds, queue_depth, queue_lane_depth,
+    dead_letters_total, alert_to_ticket_seconds, host_events_total, warmup_duration_seconds, mark_process_dead,
+    render_metrics,
+)
+from resilience import AdaptiveConcurrencyLimiter, CircuitBreaker, CircuitOpenError, RetryPolicy, TokenBucket
+from shared_state import LeaderLock, SharedState
+from ticket_queue import Job, TicketQueue, TicketWorkerPool
 
-# Prometheus metrics
-alerts_received_total = Counter('webhook_alerts_received_total', 'Total alerts received', ['status', 'severity'])
-tickets_created_total = Counter('webhook_tickets_created_total', 'Total tickets created', ['success'])
-request_duration_seconds = Histogram('webhook_request_duration_seconds', 'Time spent processing requests')
+# Configure logging: records go through a queue to a writer thread, so a slow
+# log sink never blocks request handling; repeated warnings/errors are rate-limited
+log_listener = setup_logging(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    fmt=os.getenv('LOG_FORMAT', 'json'),
+    queue_size=int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+    rate_limit_burst=int(os.getenv('LOG_RATE_LIMIT_BURST', '10')),
+    rate_limit_window=float(os.getenv('LOG_RATE_LIMIT_WINDOW', '60')),
+)
+logger = logging.getLogger(__name__)
 
 # Configuration
 GLPI_URL = os.getenv("GLPI_URL", "http://localhost:8080")
@@ -37,197 +66,493 @@ GLPI_USER_TOKEN = os.getenv("GLPI_USER_TOKEN", "admin_token")
 GLPI_USERNAME = os.getenv("GLPI_USERNAME", "glpi")
 GLPI_PASSWORD = os.getenv("GLPI_PASSWORD", "glpi")
 
+def cgroup_cpu_limit(root: str = "/sys/fs/cgroup") -> Optional[float]:
+    """CPUs allowed by the container's CFS quota (cgroup v2 or v1), None when unlimited"""
+    try:
+        with open(os.path.join(root, "cpu.max")) as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        quota = period = None
+        for directory in ("cpu", "cpu,cpuacct", ""):
+            try:
+                with open(os.path.join(root, directory, "cpu.cfs_quota_us")) as f:
+                    quota = f.read().strip()
+                with open(os.path.join(root, directory, "cpu.cfs_period_us")) as f:
+                    period = f.read().strip()
+                break
+            except OSError:
+                continue
+    try:
+        quota_us, period_us = float(quota), float(period)
+    except (TypeError, ValueError):
+        return None  # "max", or no cgroup CPU controller
+    if quota_us <= 0 or period_us <= 0:
+        return None
+    return quota_us / period_us
+
+def default_web_workers() -> int:
+    """One uvicorn worker process per CPU this process may use (affinity and container quota)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+# Server processes: all of them receive alerts, a single leader drains the ticket queue
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(default_web_workers())))
+LEADER_RETRY_INTERVAL = float(os.getenv("LEADER_RETRY_INTERVAL", "5"))
+
+# GLPI HTTP connection pool
+GLPI_POOL_SIZE = int(os.getenv("GLPI_POOL_SIZE", "20"))
+GLPI_POOL_KEEPALIVE = int(os.getenv("GLPI_POOL_KEEPALIVE", "10"))
+GLPI_TIMEOUT = float(os.getenv("GLPI_TIMEOUT", "10"))
+GLPI_CONNECT_TIMEOUT = float(os.getenv("GLPI_CONNECT_TIMEOUT", "5"))
+
+# GLPI outbound protection
+GLPI_RATE_LIMIT = float(os.getenv("GLPI_RATE_LIMIT", "50"))
+GLPI_RATE_BURST = int(os.getenv("GLPI_RATE_BURST", "20"))
+GLPI_BREAKER_FAILURES = int(os.getenv("GLPI_BREAKER_FAILURES", "5"))
+GLPI_BREAKER_RESET = float(os.getenv("GLPI_BREAKER_RESET", "30"))
+GLPI_CONCURRENCY_MIN = int(os.getenv("GLPI_CONCURRENCY_MIN", "1"))
+GLPI_CONCURRENCY_MAX = int(os.getenv("GLPI_CONCURRENCY_MAX", str(GLPI_POOL_SIZE)))
+GLPI_TARGET_LATENCY = float(os.getenv("GLPI_TARGET_LATENCY", "1.0"))
+GLPI_RETRY_ATTEMPTS = int(os.getenv("GLPI_RETRY_ATTEMPTS", "3"))
+GLPI_RETRY_BASE_DELAY = float(os.getenv("GLPI_RETRY_BASE_DELAY", "0.5"))
+GLPI_RETRY_MAX_DELAY = float(os.getenv("GLPI_RETRY_MAX_DELAY", "10"))
+
+# Micro-batched ticket creation
+TICKET_BATCH_MAX = int(os.getenv("TICKET_BATCH_MAX", "20"))
+TICKET_BATCH_WINDOW = float(os.getenv("TICKET_BATCH_WINDOW", "0.2"))
+
+# Durable ticket queue (each worker waits for its own ticket, so fewer workers
+# than TICKET_BATCH_MAX could never fill a batch)
+QUEUE_PATH = os.getenv("QUEUE_PATH", "data/ticket_queue.db")
+QUEUE_WORKERS = int(os.getenv("QUEUE_WORKERS", str(max(16, TICKET_BATCH_MAX))))
+QUEUE_HIGH_WATER = int(os.getenv("QUEUE_HIGH_WATER", "10000"))
+QUEUE_RETRY_AFTER = int(os.getenv("QUEUE_RETRY_AFTER", "30"))
+QUEUE_LEASE_SECONDS = float(os.getenv("QUEUE_LEASE_SECONDS", "60"))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "5"))
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "1"))
+QUEUE_RESERVED_WORKERS = int(os.getenv("QUEUE_RESERVED_WORKERS", "2"))
+QUEUE_RESERVED_PRIORITY = int(os.getenv("QUEUE_RESERVED_PRIORITY", "5"))
+QUEUE_MAX_WAIT = float(os.getenv("QUEUE_MAX_WAIT", "300"))
+DEAD_LETTER_PATH = os.getenv("DEAD_LETTER_PATH", "data/dead_letter.jsonl")
+
+# Alert deduplication
+FINGERPRINT_TTL_SECONDS = float(os.getenv("FINGERPRINT_TTL_SECONDS", "21600"))
+DEDUP_FOLLOWUPS = os.getenv("DEDUP_FOLLOWUPS", "false").lower() == "true"
+
+# Alert storm correlation (STORM_THRESHOLD=0 disables it)
+STORM_THRESHOLD = int(os.getenv("STORM_THRESHOLD", "50"))
+STORM_WINDOW = float(os.getenv("STORM_WINDOW", "60"))
+STORM_MIN_GROUPS = int(os.getenv("STORM_MIN_GROUPS", "2"))
+STORM_FOLLOWUP_INTERVAL = float(os.getenv("STORM_FOLLOWUP_INTERVAL", "30"))
+
+# Background GLPI health probe, reported by /health and the metrics. Alerts queue
+# durably while GLPI is down, so /ready ignores it unless READY_REQUIRES_GLPI=true
+# (only for receivers in front of their own GLPI, where failing over helps)
+GLPI_PROBE_INTERVAL = float(os.getenv("GLPI_PROBE_INTERVAL", "15"))
+GLPI_PROBE_TIMEOUT = float(os.getenv("GLPI_PROBE_TIMEOUT", "5"))
+GLPI_PROBE_STALE_AFTER = float(os.getenv("GLPI_PROBE_STALE_AFTER", str(4 * GLPI_PROBE_INTERVAL)))
+READY_REQUIRES_GLPI = os.getenv("READY_REQUIRES_GLPI", "false").lower() == "true"
+
+# Startup warm-up and graceful shutdown
+GLPI_WARM_CONNECTIONS = int(os.getenv("GLPI_WARM_CONNECTIONS", str(min(4, GLPI_POOL_KEEPALIVE))))
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "15"))
+# SHUTDOWN_DRAIN_TIMEOUT is the whole budget from SIGTERM: the ready delay, the
+# HTTP grace for open requests and the ticket drain all come out of it
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20"))
+# Time between SIGTERM and closing the listeners, for load balancers to see /ready fail
+SHUTDOWN_READY_DELAY = float(os.getenv("SHUTDOWN_READY_DELAY", "3"))
+SHUTDOWN_HTTP_GRACE = float(os.getenv("SHUTDOWN_HTTP_GRACE", "5"))
+
+# Diagnostics: /debug/* endpoints are 404 unless enabled, and need X-Debug-Token
+DEBUG_ENDPOINTS = os.getenv("DEBUG_ENDPOINTS", "false").lower() == "true"
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+DEBUG_PROFILE_MAX_SECONDS = float(os.getenv("DEBUG_PROFILE_MAX_SECONDS", "30"))
+DEBUG_PROFILE_INTERVAL = float(os.getenv("DEBUG_PROFILE_INTERVAL", "0.01"))
+DEBUG_LOOP_LAG_INTERVAL = float(os.getenv("DEBUG_LOOP_LAG_INTERVAL", "0.1"))
+
+# Host agent event ingestion (/ingest/events)
+INGEST_MAX_EVENTS = int(os.getenv("INGEST_MAX_EVENTS", "10000"))
+INGEST_MAX_ERRORS = int(os.getenv("INGEST_MAX_ERRORS", "20"))
+
+# Traffic capture for replay (disabled unless CAPTURE_DIR is set)
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "")
+CAPTURE_MAX_BYTES = int(os.getenv("CAPTURE_MAX_BYTES", str(64 * 1024 * 1024)))
+CAPTURE_MAX_FILES = int(os.getenv("CAPTURE_MAX_FILES", "20"))
+CAPTURE_QUEUE_SIZE = int(os.getenv("CAPTURE_QUEUE_SIZE", "10000"))
+
+# Ticket templates (TICKET_TEMPLATES_RELOAD < 0 disables hot reload)
+TICKET_TEMPLATES_DIR = os.getenv("TICKET_TEMPLATES_DIR", DEFAULT_TEMPLATES_DIR)
+TICKET_TEMPLATES_RELOAD = float(os.getenv("TICKET_TEMPLATES_RELOAD", "5"))
+
+# Ticket routing to GLPI entity/category/group/requester by alert labels
+ROUTING_RULES_PATH = os.getenv("ROUTING_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "routing.json"))
+ROUTING_REFRESH_INTERVAL = float(os.getenv("ROUTING_REFRESH_INTERVAL", "300"))
+ROUTING_CACHE_TTL = float(os.getenv("ROUTING_CACHE_TTL", "3600"))
+
+# Alert severity -> GLPI urgency, also the alert's priority lane in the ticket queue
+SEVERITY_URGENCY = {
+    'critical': 5,
+    'high': 4,
+    'warning': 3,
+    'info': 2,
+    'low': 1
+}
+
+# Metric label cardinality
+METRICS_MAX_ALERTNAMES = int(os.getenv("METRICS_MAX_ALERTNAMES", "200"))
+METRICS_MAX_SEVERITIES = int(os.getenv("METRICS_MAX_SEVERITIES", "10"))
+alertname_label = BoundedLabel(METRICS_MAX_ALERTNAMES)
+severity_label = BoundedLabel(METRICS_MAX_SEVERITIES)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Share one GLPI session and drain the ticket queue for the lifetime of the app"""
+    app.state.shared = SharedState(QUEUE_PATH)
+    glpi_http = build_http_client(
+        pool_size=GLPI_POOL_SIZE,
+        keepalive=GLPI_POOL_KEEPALIVE,
+        timeout=GLPI_TIMEOUT,
+        connect_timeout=GLPI_CONNECT_TIMEOUT,
+    )
+    app.state.glpi = AsyncGLPIClient(
+        glpi_http,
+        base_url=GLPI_URL,
+        app_token=GLPI_APP_TOKEN,
+        user_token=GLPI_USER_TOKEN,
+        username=GLPI_USERNAME,
+        password=GLPI_PASSWORD,
+        breaker=CircuitBreaker(failure_threshold=GLPI_BREAKER_FAILURES, reset_timeout=GLPI_BREAKER_RESET),
+        rate_limiter=TokenBucket(rate=GLPI_RATE_LIMIT, burst=GLPI_RATE_BURST),
+        concurrency=AdaptiveConcurrencyLimiter(
+            initial=GLPI_CONCURRENCY_MIN,
+            min_limit=GLPI_CONCURRENCY_MIN,
+            max_limit=GLPI_CONCURRENCY_MAX,
+            target_latency=GLPI_TARGET_LATENCY,
+        ),
+        retry=RetryPolicy(
+            max_attempts=GLPI_RETRY_ATTEMPTS,
+            base_delay=GLPI_RETRY_BASE_DELAY,
+            max_delay=GLPI_RETRY_MAX_DELAY,
+        ),
+        session_store=app.state.shared,
+    )
+    app.state.renderer = TicketRenderer(TICKET_TEMPLATES_DIR, reload_interval=TICKET_TEMPLATES_RELOAD)
+    app.state.router = TicketRouter(
+        app.state.glpi, ROUTING_RULES_PATH, ttl=ROUTING_CACHE_TTL, refresh_interval=ROUTING_REFRESH_INTERVAL,
+    )
+    app.state.batcher = TicketBatcher(
+        app.state.glpi, max_items=TICKET_BATCH_MAX, window=TICKET_BATCH_WINDOW,
+        waiters=lambda: app.state.workers.busy,
+    )
+    app.state.dead_letter = DeadLetterSpool(DEAD_LETTER_PATH)
+    app.state.queue = TicketQueue(QUEUE_PATH, lease_seconds=QUEUE_LEASE_SECONDS, max_wait=QUEUE_MAX_WAIT)
+    app.state.fingerprints = FingerprintIndex(
+        QUEUE_PATH,
+        ttl=FINGERPRINT_TTL_SECONDS,
+        pending_timeout=QUEUE_LEASE_SECONDS,
+    )
+    app.state.storms = StormCorrelator(
+        app.state.glpi,
+        StormDetector(STORM_THRESHOLD, QUEUE_PATH, window=STORM_WINDOW, min_groups=STORM_MIN_GROUPS),
+        QUEUE_PATH,
+        followup_interval=STORM_FOLLOWUP_INTERVAL,
+    )
+    app.state.workers = TicketWorkerPool(
+        app.state.queue,
+        process_alert_background,
+        workers=QUEUE_WORKERS,
+        poll_interval=QUEUE_POLL_INTERVAL,
+        max_attempts=QUEUE_MAX_ATTEMPTS,
+        on_exhausted=dead_letter_job,
+        reserved_workers=QUEUE_RESERVED_WORKERS,
+        reserved_priority=QUEUE_RESERVED_PRIORITY,
+        on_idle=lambda: app.state.batcher.wake(),
+    )
+    app.state.health = GLPIHealthProber(
+        app.state.glpi,
+        interval=GLPI_PROBE_INTERVAL,
+        timeout=GLPI_PROBE_TIMEOUT,
+        stale_after=GLPI_PROBE_STALE_AFTER,
+    )
+    app.state.health.start()
+    app.state.profiler = SamplingProfiler(interval=DEBUG_PROFILE_INTERVAL, max_duration=DEBUG_PROFILE_MAX_SECONDS)
+    app.state.memory = MemoryTracker()
+    app.state.loop_lag = LoopLagMonitor(interval=DEBUG_LOOP_LAG_INTERVAL)
+    if DEBUG_ENDPOINTS:
+        app.state.loop_lag.start()
+        if not DEBUG_TOKEN:
+            logger.warning("DEBUG_ENDPOINTS is enabled without DEBUG_TOKEN; /debug endpoints will refuse every request")
+    app.state.warm = False
+    app.state.draining = False
+    app.state.shutdown_deadline = None
+    install_drain_signal(app)
+    warmup = asyncio.create_task(warm_up(app))
+    app.state.capture = None
+    if CAPTURE_DIR:
+        app.state.capture = TrafficCapture(
+            CAPTURE_DIR, max_bytes=CAPTURE_MAX_BYTES, max_files=CAPTURE_MAX_FILES, queue_size=CAPTURE_QUEUE_SIZE,
+        )
+        app.state.capture.start()
+    app.state.leader = LeaderLock(f"{QUEUE_PATH}.leader")
+    if app.state.leader.acquire():
+        leading = asyncio.create_task(start_ticket_workers(app))
+    else:
+        leading = asyncio.create_task(wait_for_leadership(app))
+    try:
+        yield
+    finally:
+        # Stop taking alerts (already done on SIGTERM under uvicorn), then let in-flight
+        # tickets finish within the deadline; whatever is left stays in the durable queue
+        start_draining(app)
+        warmup.cancel()
+        leading.cancel()
+        await app.state.health.stop()
+        await app.state.router.stop()
+        if app.state.capture:
+            await asyncio.to_thread(app.state.capture.stop)
+        await app.state.loop_lag.stop()
+        if app.state.memory.tracing:
+            app.state.memory.stop()
+        drained = await app.state.workers.drain(app.state.shutdown_deadline - time.monotonic())
+        if app.state.leader.held:
+            logger.info("Drained ticket workers in %.2fs (%s interrupted jobs released), %s jobs left in the queue",
+                        drained["seconds"], drained["abandoned"], await asyncio.to_thread(app.state.queue.depth))
+        # Tickets and followups still unsent get what is left of the deadline: the
+        # jobs behind them are released and the followups stay buffered in SQLite
+        try:
+            await asyncio.wait_for(app.state.batcher.flush(), max(0.0, app.state.shutdown_deadline - time.monotonic()))
+            # Storm followups are buffered in SQLite: only the leader posts them
+            if app.state.leader.held:
+                await asyncio.wait_for(app.state.storms.flush(),
+                                       max(0.0, app.state.shutdown_deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            logger.warning("Shutdown deadline reached before pending tickets and followups were sent")
+        app.state.storms.close()
+        app.state.queue.close()
+        app.state.fingerprints.close()
+        app.state.dead_letter.close()
+        # The shared session is only killed once, by the leader at shutdown
+        if app.state.leader.held:
+            await app.state.glpi.close_session()
+        app.state.leader.release()
+        await glpi_http.aclose()
+        app.state.shared.close()
+        mark_process_dead(os.getpid())
+
+def start_draining(app: FastAPI):
+    """Turn new alerts away and start the shutdown deadline (once)"""
+    app.state.draining = True
+    if app.state.shutdown_deadline is None:
+        app.state.shutdown_deadline = time.monotonic() + SHUTDOWN_DRAIN_TIMEOUT
+
+def install_drain_signal(app: FastAPI):
+    """Start draining on SIGTERM, SHUTDOWN_READY_DELAY seconds before uvicorn stops listening
+
+    uvicorn closes its sockets as soon as it handles the signal, so a flag set
+    in the lifespan shutdown is never seen by a client. SIGTERM is taken over
+    here and, after the delay during which /ready and /alert answer 503 while
+    load balancers still route here, handed to the server as SIGINT, which
+    uvicorn handles (through the event loop or ``signal.signal``) as the same
+    graceful shutdown. A second SIGTERM skips the rest of the delay.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    # Nothing but Python's KeyboardInterrupt handles SIGINT: not running under a server
+    if signal.getsignal(signal.SIGINT) in (signal.default_int_handler, signal.SIG_DFL, signal.SIG_IGN, None):
+        return
+    loop = asyncio.get_running_loop()
+    handover: List[Optional[asyncio.TimerHandle]] = [None]
+
+    def stop_server():
+        handover[0] = None
+        signal.raise_signal(signal.SIGINT)
+
+    def on_sigterm():
+        if app.state.draining:
+            if handover[0] is not None:
+                handover[0].cancel()
+                stop_server()
+            return
+        start_draining(app)
+        logger.info("SIGTERM received, draining; closing listeners in %.1fs", SHUTDOWN_READY_DELAY)
+        handover[0] = loop.call_later(SHUTDOWN_READY_DELAY, stop_server)
+
+    loop.add_signal_handler(signal.SIGTERM, on_sigterm)
+
+async def warm_up(app: FastAPI):
+    """Log in to GLPI and fill the connection pool before /ready reports ready"""
+    started = time.monotonic()
+    try:
+        opened = await asyncio.wait_for(app.state.glpi.warm_up(GLPI_WARM_CONNECTIONS), WARMUP_TIMEOUT)
+        logger.info("GLPI warm-up done in %.2fs: %s/%s pooled connections open",
+                    time.monotonic() - started, opened, GLPI_WARM_CONNECTIONS)
+    except asyncio.TimeoutError:
+        logger.warning("GLPI warm-up did not finish within %.0fs", WARMUP_TIMEOUT)
+    except Exception as e:
+        logger.warning("GLPI warm-up failed: %s", e)
+    finally:
+        warmup_duration_seconds.set(time.monotonic() - started)
+        app.state.warm = True
+
+async def start_ticket_workers(app: FastAPI):
+    """Start the ticket workers and the routing cache they read, in the leader only
+
+    The routing names are resolved once (within WARMUP_TIMEOUT) before the
+    first job is claimed, so tickets queued before a restart are not all
+    created without their entity, category and group.
+    """
+    try:
+        await asyncio.wait_for(app.state.router.refresh(), WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Ticket routing not resolved within %.0fs, starting workers anyway", WARMUP_TIMEOUT)
+    except Exception as e:
+        logger.warning("Ticket routing refresh failed, starting workers anyway: %s", e)
+    app.state.router.start()
+    app.state.storms.start()
+    app.state.workers.start()
+
+async def wait_for_leadership(app: FastAPI):
+    """Take over the ticket workers if the leader process exits"""
+    while True:
+        await asyncio.sleep(LEADER_RETRY_INTERVAL)
+        if app.state.leader.acquire():
+            await start_ticket_workers(app)
+            return
+
 app = FastAPI(
     title="Axity Webhook Receiver",
     description="Receives Prometheus alerts and creates GLPI tickets",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-class AlertPayload(BaseModel):
-    """Alertmanager webhook payload structure"""
-    receiver: str
-    status: str
-    alerts: List[Dict[str, Any]]
-    groupKey: Optional[str] = None
-    truncatedAlerts: Optional[int] = 0
-    groupLabels: Optional[Dict[str, str]] = {}
-    commonLabels: Optional[Dict[str, str]] = {}
-    commonAnnotations: Optional[Dict[str, str]] = {}
-    externalURL: Optional[str] = None
-    version: Optional[str] = "4"
-
-class GLPIClient:
-    """GLPI API Client"""
-    
-    def __init__(self):
-        self.base_url = GLPI_URL.rstrip('/')
-        self.session_token = None
-        self.headers = {
-            "Content-Type": "application/json",
-            "App-Token": GLPI_APP_TOKEN,
-        }
-    
-    def init_session(self) -> bool:
-        """Initialize GLPI session"""
-        url = f"{self.base_url}/apirest.php/initSession"
-        
-        # Try token-based authentication first
-        if GLPI_USER_TOKEN != "admin_token":
-            auth_headers = {**self.headers, "Authorization": f"user_token {GLPI_USER_TOKEN}"}
+async def process_alert_background(alert_data: Dict[str, Any]) -> bool:
+    """Handle a queued alert; False asks the queue to retry"""
+    index: FingerprintIndex = app.state.fingerprints
+    fingerprint = alert_fingerprint(alert_data)
+
+    if alert_data.get('status') == 'resolved':
+        return await close_alert_ticket(fingerprint, alert_data)
+
+    owner, ticket_id = await asyncio.to_thread(index.reserve, fingerprint)
+    if not owner:
+        return await handle_repeated_alert(alert_data, ticket_id)
+
+    ticket_id = None
+    try:
+        storms: StormCorrelator = app.state.storms
+        if await storms.active():
+            ticket_id = await storms.attach(alert_data)
         else:
-            # Fallback to username/password
-            auth_headers = {**self.headers, "Authorization": f"Basic {GLPI_USERNAME}:{GLPI_PASSWORD}"}
-        
-        try:
-            response = requests.get(url, headers=auth_headers, timeout=10)
-            response.raise_for_status()
-            
-            session_data = response.json()
-            self.session_token = session_data.get("session_token")
-            
-            if self.session_token:
-                self.headers["Session-Token"] = self.session_token
-                logger.info("GLPI session initialized successfully")
-                return True
-            else:
-                logger.error("Failed to get session token from GLPI response")
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error initializing GLPI session: {e}")
-            return False
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON response from GLPI: {e}")
-            return False
-    
-    def create_ticket(self, title: str, description: str, urgency: int = 3, priority: int = 3) -> Optional[Dict[str, Any]]:
-        """Create a ticket in GLPI"""
-        if not self.session_token:
-            logger.error("No active GLPI session. Cannot create ticket.")
-            return None
-        
-        url = f"{self.base_url}/apirest.php/Ticket"
-        
-        payload = {
-            "input": {
-                "name": title,
-                "content": description,
-                "type": 1,           # 1 = Incident
-                "status": 1,         # 1 = New
-                "urgency": urgency,
-                "priority": priority,
-                "source": 6,         # 6 = Other (automated)
-                "_users_id_requester": 2,  # Assuming user ID 2 exists
-            }
-        }
-        
-        try:
-            response = requests.post(url, headers=self.headers, json=payload, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            ticket_id = result.get("id")
-            
-            if ticket_id:
-                logger.info(f"GLPI ticket created successfully: ID #{ticket_id}")
-                return result
-            else:
-                logger.error(f"Failed to create ticket - no ID in response: {result}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error creating GLPI ticket: {e}")
-            return None
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON response from GLPI: {e}")
-            return None
+            ticket_id = await create_alert_ticket(alert_data)
+    finally:
+        if ticket_id:
+            await asyncio.to_thread(index.assign, fingerprint, ticket_id)
+        else:
+            await asyncio.to_thread(index.release, fingerprint)
+    return ticket_id is not None
+
+async def handle_repeated_alert(alert_data: Dict[str, Any], ticket_id: Optional[int]) -> bool:
+    """Repeat of an alert that already has a ticket: no-op or followup"""
+    if ticket_id is None or not DEDUP_FOLLOWUPS:
+        alerts_deduplicated_total.labels(action='skipped').inc()
+        return True
+
+    alerts_deduplicated_total.labels(action='followup').inc()
+    client: AsyncGLPIClient = app.state.glpi
+    content = f"Alert still firing (started {alert_data.get('startsAt', 'unknown')}), notified again at {datetime.utcnow().isoformat()}"
+    return await client.add_followup(ticket_id, content)
+
+async def close_alert_ticket(fingerprint: str, alert_data: Dict[str, Any]) -> bool:
+    """Close the ticket of a resolved alert"""
+    index: FingerprintIndex = app.state.fingerprints
+    tracked = await asyncio.to_thread(index.lookup, [fingerprint])
+
+    if fingerprint not in tracked:
+        # Its firing alert is still queued: close the ticket once that one created it
+        return not await asyncio.to_thread(app.state.queue.queued_fingerprints, [fingerprint])
+    ticket_id = tracked[fingerprint]
+    if ticket_id is None:
+        # The ticket is still being created; try again once it exists
+        return False
+
+    # A storm parent is only closed once all of its alerts resolved
+    handled = await app.state.storms.resolve(ticket_id, alert_data)
+    if handled is not None:
+        if handled:
+            await asyncio.to_thread(index.forget, fingerprint)
+        return handled
+
+    client: AsyncGLPIClient = app.state.glpi
+    await client.add_followup(ticket_id, f"Alert resolved at {datetime.utcnow().isoformat()}")
+    closed = await client.close_ticket(ticket_id)
+    tickets_closed_total.labels(success=str(closed).lower()).inc()
+    if closed:
+        await asyncio.to_thread(index.forget, fingerprint)
+    return closed
+
+def alert_urgency(alert_data: Dict[str, Any]) -> int:
+    """GLPI urgency (1-5) of an alert, from its severity label"""
+    return SEVERITY_URGENCY.get(alert_data.get('labels', {}).get('severity', 'unknown').lower(), 3)
+
+def build_alert_ticket(alert_data: Dict[str, Any]) -> Dict[str, Any]:
+    """GLPI Ticket input describing a firing alert"""
+    renderer: TicketRenderer = app.state.renderer
+    title, description = renderer.render(alert_data)
+    urgency = alert_urgency(alert_data)
     
-    def close_session(self):
-        """Close GLPI session"""
-        if not self.session_token:
-            return
-        
-        url = f"{self.base_url}/apirest.php/killSession"
-        try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                logger.info("GLPI session closed")
-        except requests.exceptions.RequestException:
-            pass  # Ignore errors when closing session
-
-async def process_alert_background(alert_data: Dict[str, Any]):
-    """Process alert in background task"""
+    ticket = ticket_input(title, description, urgency=urgency, priority=urgency)
+    # Entity, category, group and requester from the cached routing rules (no GLPI call)
+    ticket.update(app.state.router.route(alert_data.get('labels', {})))
+    return ticket
+
+async def create_alert_ticket(alert_data: Dict[str, Any]) -> Optional[int]:
+    """Create the GLPI ticket for a firing alert, returning its ID"""
+    alertname = alert_data.get('labels', {}).get('alertname', 'Unknown Alert')
+    context = {"fingerprint": alert_data.get('fingerprint'), "alertname": alertname}
     try:
-        client = GLPIClient()
-        
-        if not client.init_session():
-            tickets_created_total.labels(success='false').inc()
-            return
-        
-        # Extract alert information
-        labels = alert_data.get('labels', {})
-        annotations = alert_data.get('annotations', {})
-        
-        severity = labels.get('severity', 'unknown')
-        service = labels.get('service', 'unknown')
-        alertname = labels.get('alertname', 'Unknown Alert')
-        
-        title = f"[{severity.upper()}] {alertname} - {service}"
-        
-        # Build detailed description
-        description = f"""
-ALERT DETAILS:
-==============
-Alert: {alertname}
-Service: {service}
-Severity: {severity}
-Status: {alert_data.get('status', 'unknown')}
-Started: {alert_data.get('startsAt', 'unknown')}
-
-SUMMARY:
-{annotations.get('summary', 'No summary available')}
-
-DESCRIPTION:
-{annotations.get('description', 'No description available')}
-
-LABELS:
-{json.dumps(labels, indent=2)}
-
-ANNOTATIONS:
-{json.dumps(annotations, indent=2)}
-
-This ticket was automatically created by the Axity Infrastructure Monitoring System.
-For more information, check the Prometheus AlertManager at: http://localhost:9093
-"""
-        
-        # Map severity to urgency
-        urgency_map = {
-            'critical': 5,
-            'high': 4, 
-            'warning': 3,
-            'info': 2,
-            'low': 1
-        }
-        urgency = urgency_map.get(severity.lower(), 3)
-        
-        result = client.create_ticket(title, description, urgency=urgency, priority=urgency)
+        result = await app.state.batcher.submit(build_alert_ticket(alert_data))
         
         if result:
             tickets_created_total.labels(success='true').inc()
-            logger.info(f"Successfully processed alert: {alertname}")
+            if 'receivedAt' in alert_data:
+                alert_to_ticket_seconds.observe(max(0.0, time.time() - alert_data['receivedAt']))
+            logger.info("Successfully processed alert: %s", alertname, extra={**context, "ticket_id": result["id"]})
+            return result["id"]
         else:
             tickets_created_total.labels(success='false').inc()
-            logger.error(f"Failed to create ticket for alert: {alertname}")
+            logger.error("Failed to create ticket for alert: %s", alertname, extra=context)
+            return None
             
+    except CircuitOpenError:
+        raise
     except Exception as e:
-        logger.error(f"Error processing alert: {e}")
-        logger.error(traceback.format_exc())
+        logger.error("Error processing alert: %s", e, exc_info=True, extra=context)
         tickets_created_total.labels(success='false').inc()
-    finally:
-        try:
-            client.close_session()
-        except:
-            pass
+        return None
+
+async def dead_letter_job(job: Job):
+    """Spool the GLPI action of an alert that exhausted its retries"""
+    alert_data = job.payload
+    spool: DeadLetterSpool = app.state.dead_letter
+
+    if alert_data.get('status') == 'resolved':
+        ticket_id = (await asyncio.to_thread(app.state.fingerprints.lookup, [alert_data['fingerprint']])).get(alert_data['fingerprint'])
+        if ticket_id is None:
+            return
+        record = {"action": "close", "ticket_id": ticket_id}
+    else:
+        record = {"action": "create", "input": build_alert_ticket(alert_data)}
+
+    record.update(fingerprint=alert_data.get('fingerprint'), attempts=job.attempts)
+    await asyncio.to_thread(spool.append, record)
+    dead_letters_total.labels(action=record["action"]).inc()
 
 @app.get("/")
 async def root():
@@ -240,65 +565,298 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    """Liveness: the receiver itself is up (GLPI state is informational only)"""
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "glpi": app.state.health.status(),
+        "routing": app.state.router.status(),
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness from the cached GLPI health probe; never calls GLPI itself
+
+    Not ready until the GLPI warm-up finished, nor once shutdown started.
+    """
+    prober: GLPIHealthProber = app.state.health
+    ready = app.state.warm and not app.state.draining and (prober.ready or not READY_REQUIRES_GLPI)
+    if app.state.draining:
+        status = "draining"
+    elif not app.state.warm:
+        status = "warming up"
+    else:
+        status = "ready" if ready else "not ready"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": status, "glpi": prober.status()},
+    )
 
 @app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint"""
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    lanes = await asyncio.to_thread(app.state.queue.depth_by_priority)
+    queue_depth.set(sum(lanes.values()))
+    for lane in range(1, 6):
+        queue_lane_depth.labels(lane=str(lane)).set(lanes.get(lane, 0))
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
-@app.post("/alert")
-async def receive_alert(payload: AlertPayload, background_tasks: BackgroundTasks):
+async def check_backpressure(count: int):
+    """Answer 503 with Retry-After when shutting down or when the queue is past QUEUE_HIGH_WATER"""
+    if app.state.draining:
+        raise HTTPException(
+            status_code=503,
+            detail="Receiver is shutting down, retry later",
+            headers={"Retry-After": str(QUEUE_RETRY_AFTER)},
+        )
+    depth = await asyncio.to_thread(app.state.queue.depth)
+    queue_depth.set(depth)
+    if depth >= QUEUE_HIGH_WATER:
+        alerts_rejected_total.inc(count)
+        logger.warning("Ticket queue is full (%s pending), rejecting %s alerts", depth, count)
+        raise HTTPException(
+            status_code=503,
+            detail="Ticket queue is full, retry later",
+            headers={"Retry-After": str(QUEUE_RETRY_AFTER)},
+        )
+
+async def enqueue_alerts(alerts: List[Dict[str, Any]], group_key: Optional[str], received_at: float) -> Dict[str, int]:
+    """Count, deduplicate and queue Alertmanager-style alerts, returning what was done"""
+    queue: TicketQueue = app.state.queue
+    firing = []
+    resolved = []
+    
+    for alert in alerts:
+        status = alert.get('status', 'unknown')
+        labels = alert.get('labels', {})
+        severity = severity_label(labels.get('severity', 'unknown'))
+        
+        # Count all received alerts
+        alerts_received_total.labels(status=status, severity=severity).inc()
+        alerts_by_name_total.labels(
+            alertname=alertname_label(labels.get('alertname', 'unknown')), severity=severity
+        ).inc()
+        
+        # Only firing and resolved alerts affect tickets
+        if status == 'firing':
+            firing.append(alert)
+        elif status == 'resolved':
+            resolved.append(alert)
+        else:
+            logger.info("Ignoring %s alert", status)
+    
+    # Repeats of tracked alerts are dropped here, before touching the queue; being
+    # seen again keeps their fingerprint alive for another FINGERPRINT_TTL_SECONDS
+    for alert in firing + resolved:
+        alert['fingerprint'] = alert_fingerprint(alert)
+        alert['receivedAt'] = received_at
+    tracked = await asyncio.to_thread(
+        app.state.fingerprints.lookup, [alert['fingerprint'] for alert in firing + resolved], True
+    )
+    
+    # A resolve also goes through when its firing alert is still queued: that ticket
+    # does not exist yet, but it will and must be closed
+    untracked = [alert['fingerprint'] for alert in resolved if alert['fingerprint'] not in tracked]
+    queued = await asyncio.to_thread(queue.queued_fingerprints, untracked) if untracked else set()
+    jobs = [alert for alert in resolved if alert['fingerprint'] in tracked or alert['fingerprint'] in queued]
+    deduplicated = 0
+    for alert in firing:
+        if alert['fingerprint'] in tracked and not DEDUP_FOLLOWUPS:
+            deduplicated += 1
+        else:
+            jobs.append(alert)
+    if deduplicated:
+        alerts_deduplicated_total.labels(action='skipped').inc(deduplicated)
+    await asyncio.to_thread(app.state.storms.detector.observe, len(firing) - deduplicated, group_key)
+    
+    # One batched write for the whole notification
+    if jobs:
+        await asyncio.to_thread(queue.put_many, jobs, [alert_urgency(alert) for alert in jobs])
+        app.state.workers.notify()
+    processed_count = len(firing) - deduplicated
+    
+    return {
+        "alerts_processed": processed_count,
+        "alerts_deduplicated": deduplicated,
+        "alerts_resolved": len(jobs) - processed_count,
+        "alerts_total": len(alerts)
+    }
+
+@app.post("/alert", openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": AlertPayload.model_json_schema()}},
+    },
+})
+async def receive_alert(request: Request):
     """Receive alerts from Alertmanager"""
     with request_duration_seconds.time():
+        received_at = time.time()
+
+        # Fast path: parse the raw body and check only the fields we use
+        body = await request.body()
+        if app.state.capture:
+            app.state.capture.record("/alert", body, received_at)
         try:
-            logger.info(f"Received alert payload with {len(payload.alerts)} alerts")
-            logger.debug(f"Full payload: {payload.model_dump()}")
-            
-            processed_count = 0
-            
-            for alert in payload.alerts:
-                status = alert.get('status', 'unknown')
-                severity = alert.get('labels', {}).get('severity', 'unknown')
-                
-                # Count all received alerts
-                alerts_received_total.labels(status=status, severity=severity).inc()
-                
-                # Only process firing alerts
-                if status == 'firing':
-                    background_tasks.add_task(process_alert_background, alert)
-                    processed_count += 1
-                else:
-                    logger.info(f"Ignoring {status} alert")
+            payload = parse_alertmanager_payload(body)
+        except PayloadError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        alerts = payload['alerts']
+
+        # Backpressure: let Alertmanager retry later instead of growing the queue forever
+        await check_backpressure(len(alerts))
+
+        try:
+            logger.info("Received alert payload with %s alerts", len(alerts))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Full payload: %s", body.decode(errors='replace'))
             
+            result = await enqueue_alerts(alerts, payload.get('groupKey'), received_at)
             return {
                 "status": "success",
-                "message": f"Processed {processed_count} firing alerts out of {len(payload.alerts)} total alerts",
-                "alerts_processed": processed_count,
-                "alerts_total": len(payload.alerts)
+                "message": f"Processed {result['alerts_processed']} firing alerts out of {len(alerts)} total alerts",
+                **result,
             }
             
         except Exception as e:
-            logger.error(f"Error processing webhook: {e}")
-            logger.error(traceback.format_exc())
+            logger.error("Error processing webhook: %s", e, exc_info=True)
             raise HTTPException(status_code=500, detail=f"Error processing alert: {str(e)}")
 
+@app.post("/ingest/events", openapi_extra={
+    "requestBody": {"required": True, "content": {"application/x-ndjson": {"schema": {"type": "string"}}}},
+})
+async def ingest_events(request: Request):
+    """Receive NDJSON batches of host agent events (one JSON object per line)"""
+    with request_duration_seconds.time():
+        received_at = time.time()
+        body = await request.body()
+        if request.headers.get("content-encoding", "").lower() == "gzip":
+            try:
+                body = await asyncio.to_thread(gzip.decompress, body)
+            except (OSError, EOFError) as e:
+                raise HTTPException(status_code=400, detail=f"Invalid gzip body: {e}")
+        if app.state.capture:
+            app.state.capture.record("/ingest/events", body, received_at, "application/x-ndjson")
+
+        try:
+            events, errors = parse_host_events(body, INGEST_MAX_EVENTS)
+        except PayloadError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        if errors:
+            host_events_total.labels(result='invalid').inc(len(errors))
+        if not events:
+            raise HTTPException(status_code=422, detail={"message": "No valid events", "errors": errors[:INGEST_MAX_ERRORS]})
+
+        # Several reports of the same host/check in one batch: only the latest counts
+        latest: Dict[tuple, Dict[str, Any]] = {}
+        for event in events:
+            key = host_event_key(event)
+            latest.pop(key, None)
+            latest[key] = event
+        coalesced = len(events) - len(latest)
+        if coalesced:
+            host_events_total.labels(result='coalesced').inc(coalesced)
+        host_events_total.labels(result='accepted').inc(len(latest))
+
+        await check_backpressure(len(latest))
+        try:
+            alerts = [host_event_alert(event) for event in latest.values()]
+            result = await enqueue_alerts(alerts, "host-events", received_at)
+        except Exception as e:
+            logger.error("Error processing host events: %s", e, exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Error processing events: {str(e)}")
+
+        return {
+            "status": "success",
+            "events_total": len(events) + len(errors),
+            "events_invalid": len(errors),
+            "events_coalesced": coalesced,
+            "errors": errors[:INGEST_MAX_ERRORS],
+            **result,
+        }
+
+def check_debug_access(request: Request):
+    """Hide /debug endpoints unless DEBUG_ENDPOINTS is on, and require the DEBUG_TOKEN"""
+    if not DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("x-debug-token", "")
+    if not DEBUG_TOKEN or not secrets.compare_digest(token.encode(), DEBUG_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Missing or invalid X-Debug-Token")
+
+def check_key_type(key_type: str):
+    if key_type not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=422, detail="key_type must be lineno, filename or traceback")
+
+@app.get("/debug/profile", include_in_schema=False)
+async def debug_profile(request: Request, seconds: float = 5.0, format: str = "json", top: int = 30):
+    """Sampling CPU profile of this process (all threads) over ``seconds``
+
+    ``format=collapsed`` returns folded stacks for flamegraph.pl / speedscope.
+    """
+    check_debug_access(request)
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise HTTPException(status_code=422, detail="seconds must be a positive number")
+    try:
+        result = await asyncio.to_thread(app.state.profiler.profile, seconds)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return PlainTextResponse(collapsed_stacks(result))
+    return profile_summary(result, top=top)
+
+@app.post("/debug/memory/start", include_in_schema=False)
+async def debug_memory_start(request: Request, frames: int = 1):
+    """Start tracemalloc, keeping ``frames`` frames per allocation"""
+    check_debug_access(request)
+    app.state.memory.start(max(1, min(frames, 25)))
+    return {"tracing": True, "frames": max(1, min(frames, 25))}
+
+@app.post("/debug/memory/stop", include_in_schema=False)
+async def debug_memory_stop(request: Request):
+    """Stop tracemalloc and free its traces"""
+    check_debug_access(request)
+    app.state.memory.stop()
+    return {"tracing": False}
+
+@app.get("/debug/memory/snapshot", include_in_schema=False)
+async def debug_memory_snapshot(request: Request, top: int = 20, key_type: str = "lineno"):
+    """Top allocations since tracing started; becomes the baseline of the next diff"""
+    check_debug_access(request)
+    check_key_type(key_type)
+    try:
+        return await asyncio.to_thread(app.state.memory.snapshot, top, key_type)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/debug/memory/diff", include_in_schema=False)
+async def debug_memory_diff(request: Request, top: int = 20, key_type: str = "lineno"):
+    """Allocation growth since the previous snapshot or diff"""
+    check_debug_access(request)
+    check_key_type(key_type)
+    try:
+        return await asyncio.to_thread(app.state.memory.diff, top, key_type)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/debug/loop", include_in_schema=False)
+async def debug_loop(request: Request):
+    """Recent event-loop lag of this process"""
+    check_debug_access(request)
+    return app.state.loop_lag.status()
+
 @app.post("/test")
 async def test_glpi():
     """Test GLPI connection and ticket creation"""
     try:
-        client = GLPIClient()
+        client: AsyncGLPIClient = app.state.glpi
         
-        if not client.init_session():
+        if not await client.ensure_session():
             return {"status": "error", "message": "Failed to initialize GLPI session"}
         
         test_title = f"Test Ticket - {datetime.utcnow().isoformat()}"
         test_description = "This is a test ticket created by the Axity Webhook Receiver to verify GLPI connectivity."
         
-        result = client.create_ticket(test_title, test_description)
-        
-        client.close_session()
+        result = await client.create_ticket(test_title, test_description)
         
         if result:
             return {"status": "success", "message": "Test ticket created successfully", "ticket": result}
@@ -306,14 +864,29 @@ async def test_glpi():
             return {"status": "error", "message": "Failed to create test ticket"}
             
     except Exception as e:
-        logger.error(f"Error in test endpoint: {e}")
+        logger.error("Error in test endpoint: %s", e)
         raise HTTPException(status_code=500, detail=f"Test failed: {str(e)}")
 
+def prepare_multiprocess_metrics() -> str:
+    """Point prometheus_client at a clean directory shared by the worker processes"""
+    directory = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR", os.path.join(os.path.dirname(QUEUE_PATH) or ".", "prometheus")
+    )
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+    return directory
+
 if __name__ == "__main__":
+    if WEB_WORKERS > 1:
+        logger.info("Starting %s worker processes, metrics in %s", WEB_WORKERS, prepare_multiprocess_metrics())
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=5000,
         log_level=os.getenv('LOG_LEVEL', 'info').lower(),
-        reload=False
+        reload=False,
+        workers=WEB_WORKERS,
+        timeout_graceful_shutdown=max(1, int(min(SHUTDOWN_HTTP_GRACE, SHUTDOWN_DRAIN_TIMEOUT))),
     )
\ No newline at end of file
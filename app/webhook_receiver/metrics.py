@@ -0,0 +1,127 @@
+"""
+Prometheus metrics for the Axity Webhook Receiver
+With PROMETHEUS_MULTIPROC_DIR set, values are shared by all worker processes;
+each gauge declares how the per-process values are aggregated
+"""
+
+import os
+import threading
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# Seconds buckets covering fast GLPI calls up to alerts stuck behind retries
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+PIPELINE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 3600)
+
+
+class BoundedLabel:
+    """Caps the distinct values a metric label may take
+
+    The first ``max_values`` values seen are kept as-is; anything new after
+    that is reported as ``other`` so a noisy label cannot blow up the series.
+    """
+
+    OTHER = "other"
+
+    def __init__(self, max_values: int):
+        self.max_values = max_values
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, value: str) -> str:
+        if value in self._seen:
+            return value
+        with self._lock:
+            if len(self._seen) < self.max_values:
+                self._seen.add(value)
+                return value
+        return self.OTHER
+
+
+def render_metrics() -> bytes:
+    """Exposition of every metric, aggregated over processes in multiprocess mode"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_process_dead(pid: int):
+    """Drop the live gauges of an exiting worker process"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+# Alert intake
+alerts_received_total = Counter('webhook_alerts_received_total', 'Total alerts received', ['status', 'severity'])
+tickets_created_total = Counter('webhook_tickets_created_total', 'Total tickets created', ['success'])
+request_duration_seconds = Histogram('webhook_request_duration_seconds', 'Time spent processing requests')
+alerts_by_name_total = Counter('webhook_alerts_by_name_total', 'Alerts received per alertname (bounded cardinality)', ['alertname', 'severity'])
+host_events_total = Counter('webhook_host_events_total', 'Host agent events received on /ingest/events', ['result'])
+
+# GLPI session reuse
+glpi_session_logins_total = Counter('webhook_glpi_session_logins_total', 'GLPI initSession logins performed')
+glpi_session_reuse_total = Counter('webhook_glpi_session_reuse_total', 'GLPI calls served by an already open session')
+glpi_session_reauth_total = Counter('webhook_glpi_session_reauth_total', 'GLPI re-authentications after a rejected session')
+
+# Durable ticket queue
+queue_depth = Gauge('webhook_queue_depth', 'Alerts waiting in the durable ticket queue', multiprocess_mode='mostrecent')
+queue_lane_depth = Gauge('webhook_queue_lane_depth', 'Alerts waiting in the ticket queue per priority lane (GLPI urgency)', ['lane'], multiprocess_mode='mostrecent')
+alerts_rejected_total = Counter('webhook_alerts_rejected_total', 'Alerts rejected with 503 because the ticket queue was full')
+
+# Alert deduplication and auto-close
+alerts_deduplicated_total = Counter('webhook_alerts_deduplicated_total', 'Repeated alerts that did not open a new ticket', ['action'])
+tickets_closed_total = Counter('webhook_tickets_closed_total', 'Tickets closed after their alert resolved', ['success'])
+
+# Micro-batched ticket creation
+glpi_batch_size = Histogram('webhook_glpi_batch_size', 'Tickets sent per GLPI POST', buckets=(1, 2, 5, 10, 20, 50, 100))
+glpi_batch_fallbacks_total = Counter('webhook_glpi_batch_fallbacks_total', 'Batched tickets retried individually after GLPI rejected them')
+
+# GLPI rate limiting, circuit breaker and adaptive concurrency
+glpi_circuit_state = Gauge('webhook_glpi_circuit_state', 'GLPI circuit breaker state (0=closed, 1=half-open, 2=open)', multiprocess_mode='livemax')
+glpi_circuit_trips_total = Counter('webhook_glpi_circuit_trips_total', 'Times the GLPI circuit breaker opened')
+glpi_concurrency_limit = Gauge('webhook_glpi_concurrency_limit', 'Current adaptive limit on concurrent GLPI calls', multiprocess_mode='livesum')
+jobs_parked_total = Counter('webhook_jobs_parked_total', 'Queued alerts postponed because the GLPI circuit was open')
+
+# Retries and dead letters
+glpi_retries_total = Counter('webhook_glpi_retries_total', 'GLPI calls retried after a transient error')
+dead_letters_total = Counter('webhook_dead_letters_total', 'Ticket actions written to the dead-letter spool', ['action'])
+
+# Alert-to-ticket pipeline stages
+glpi_stage_duration_seconds = Histogram('webhook_glpi_stage_duration_seconds', 'Time spent in each GLPI call stage', ['stage'], buckets=STAGE_BUCKETS)
+glpi_responses_total = Counter('webhook_glpi_responses_total', 'GLPI HTTP responses by method and status code', ['method', 'code'])
+glpi_requests_in_flight = Gauge('webhook_glpi_requests_in_flight', 'GLPI HTTP requests currently in flight', multiprocess_mode='livesum')
+queue_wait_seconds = Histogram('webhook_queue_wait_seconds', 'Time alerts wait in the ticket queue before first being picked up, per priority lane', ['lane'], buckets=PIPELINE_BUCKETS)
+alert_to_ticket_seconds = Histogram('webhook_alert_to_ticket_seconds', 'Time from receiving an alert to its GLPI ticket being created', buckets=PIPELINE_BUCKETS)
+jobs_in_flight = Gauge('webhook_jobs_in_flight', 'Queued alerts currently being handled by a worker', multiprocess_mode='livesum')
+batch_pending = Gauge('webhook_glpi_batch_pending', 'Tickets waiting for the next GLPI batch', multiprocess_mode='livesum')
+
+# Alert storm correlation
+storm_active = Gauge('webhook_storm_active', 'Whether an alert storm is being correlated into one ticket (0/1)', multiprocess_mode='livemax')
+storm_incidents_total = Counter('webhook_storm_incidents_total', 'Parent tickets opened for alert storms')
+alerts_correlated_total = Counter('webhook_alerts_correlated_total', 'Firing alerts attached to a storm parent instead of opening a ticket')
+
+# Background GLPI health probe (one prober per receiver process)
+glpi_up = Gauge('webhook_glpi_up', 'Whether the last GLPI health probe succeeded (0/1)', multiprocess_mode='livemin')
+glpi_probe_latency_seconds = Gauge('webhook_glpi_probe_latency_seconds', 'Duration of the last GLPI health probe', multiprocess_mode='livemax')
+glpi_probe_last_success = Gauge('webhook_glpi_probe_last_success_timestamp_seconds', 'Unix time of the last successful GLPI health probe', multiprocess_mode='livemin')
+glpi_probe_failures_total = Counter('webhook_glpi_probe_failures_total', 'GLPI health probes that failed')
+
+# Logging pipeline
+log_records_dropped_total = Counter('webhook_log_records_dropped_total', 'Log records dropped instead of written', ['reason'])
+
+# Traffic capture
+capture_records_total = Counter('webhook_capture_records_total', 'Webhook requests recorded by the traffic capture', ['result'])
+
+# Ticket routing (GLPI IDs resolved in the background)
+glpi_lookups_total = Counter('webhook_glpi_lookups_total', 'GLPI name -> ID lookups made to refresh the routing cache', ['itemtype', 'result'])
+routing_unresolved_total = Counter('webhook_routing_unresolved_total', 'Ticket routing targets not in the cache (unknown or expired) at ticket time', ['field'])
+
+# Graceful shutdown of the ticket workers
+drain_duration_seconds = Gauge('webhook_drain_duration_seconds', 'Time the last shutdown spent draining in-flight ticket work', multiprocess_mode='mostrecent')
+drain_abandoned_jobs_total = Counter('webhook_drain_abandoned_jobs_total', 'In-flight ticket jobs released back to the queue because the drain deadline passed')
+warmup_duration_seconds = Gauge('webhook_warmup_duration_seconds', 'Time spent pre-warming the GLPI session and connection pool at startup', multiprocess_mode='livemax')
+
+# Event loop responsiveness (measured while DEBUG_ENDPOINTS is enabled)
+event_loop_lag_seconds = Histogram('webhook_event_loop_lag_seconds', 'How late the event loop ran a timer, i.e. time spent blocked by other work', buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
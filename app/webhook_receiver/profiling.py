@@ -0,0 +1,259 @@
+"""
+On-demand diagnostics for the Axity Webhook Receiver
+Sampling CPU profiler, tracemalloc snapshots/diffs and event-loop lag
+monitoring behind the /debug endpoints (disabled unless DEBUG_ENDPOINTS=true)
+"""
+
+import asyncio
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from metrics import event_loop_lag_seconds
+
+# Frames of the diagnostics themselves are left out of profiles and snapshots
+IGNORED_FILES = (os.path.abspath(__file__), tracemalloc.__file__, linecache.__file__)
+STDLIB_DIR = os.path.dirname(os.__file__) + os.sep
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running"""
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling the stacks of every thread of the process
+
+    ``profile()`` runs in a thread of its own (``asyncio.to_thread``) and
+    every ``interval`` seconds records the current stack of every other
+    thread (``sys._current_frames``), so the event loop (the coroutine
+    running at that instant, or the selector when idle), the ticket
+    workers' ``to_thread`` calls and the background threads all show up, at
+    a cost independent of the request rate. Only one profile runs at a time
+    and each is capped at ``max_duration`` seconds.
+    """
+
+    def __init__(self, interval: float = 0.01, max_duration: float = 30.0, max_depth: int = 64):
+        self.interval = interval
+        self.max_duration = max_duration
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    def profile(self, duration: float) -> Dict[str, Any]:
+        """Sample for ``duration`` seconds (blocking) and return the aggregated stacks"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            return self._sample(min(max(duration, self.interval), self.max_duration))
+        finally:
+            self._lock.release()
+
+    def _sample(self, duration: float) -> Dict[str, Any]:
+        me = threading.get_ident()
+        raw: Counter = Counter()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + duration
+        next_sample = started
+        # Sampling holds the GIL, so it only collects (code, line) pairs; naming happens afterwards
+        while True:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append((frame.f_code, frame.f_lineno))
+                    frame = frame.f_back
+                raw[(ident, tuple(stack))] += 1
+            samples += 1
+            next_sample += self.interval
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            time.sleep(max(0.0, min(next_sample, deadline) - now))
+        elapsed = time.monotonic() - started
+
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        labels: Dict[Any, str] = {}
+        stacks: Counter = Counter()
+        for (ident, stack), count in raw.items():
+            frames = []
+            for code, lineno in reversed(stack):
+                if code.co_filename in IGNORED_FILES:
+                    continue
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = f"{code.co_name} ({short_path(code.co_filename)}"
+                frames.append(f"{label}:{lineno})")
+            stacks[(names.get(ident, str(ident)), tuple(frames))] += count
+        return {"duration": elapsed, "samples": samples, "interval": self.interval, "stacks": stacks}
+
+
+def short_path(filename: str) -> str:
+    """File name relative to site-packages or the stdlib, for readable profiles"""
+    position = filename.rfind("site-packages" + os.sep)
+    if position >= 0:
+        return filename[position + len("site-packages") + 1:]
+    if filename.startswith(STDLIB_DIR):
+        return filename[len(STDLIB_DIR):]
+    return os.path.basename(filename)
+
+
+def collapsed_stacks(result: Dict[str, Any]) -> str:
+    """Profile in collapsed-stack format (``thread;outer;...;inner count``) for flame graph tools"""
+    lines = [
+        ";".join((thread,) + stack) + f" {count}"
+        for (thread, stack), count in sorted(result["stacks"].items(), key=lambda item: -item[1])
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def profile_summary(result: Dict[str, Any], top: int = 30) -> Dict[str, Any]:
+    """Hottest functions of a profile, by own samples and including callees"""
+    own: Counter = Counter()
+    total: Counter = Counter()
+    threads: Counter = Counter()
+    for (thread, stack), count in result["stacks"].items():
+        threads[thread] += count
+        if stack:
+            own[stack[-1]] += count
+        for function in set(stack):
+            total[function] += count
+    samples = max(1, result["samples"])
+
+    def ranked(counter: Counter) -> List[Dict[str, Any]]:
+        return [{"function": function, "samples": count, "percent": round(100 * count / samples, 1)}
+                for function, count in counter.most_common(top)]
+
+    return {
+        "pid": os.getpid(),
+        "duration_seconds": round(result["duration"], 3),
+        "samples": result["samples"],
+        "interval_seconds": result["interval"],
+        "threads": dict(threads.most_common()),
+        "self": ranked(own),
+        "cumulative": ranked(total),
+    }
+
+
+class MemoryTracker:
+    """tracemalloc snapshots on demand
+
+    Tracing slows allocations down noticeably, so it only runs between
+    ``start()`` and ``stop()``. Each ``snapshot()`` becomes the baseline that
+    the next ``diff()`` compares against.
+    """
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._baseline = None
+
+    def stop(self):
+        tracemalloc.stop()
+        self._baseline = None
+
+    def _take(self) -> tracemalloc.Snapshot:
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces([tracemalloc.Filter(False, path) for path in IGNORED_FILES])
+
+    def snapshot(self, top: int = 20, key_type: str = "lineno") -> Dict[str, Any]:
+        """Top allocations right now; also stored as the baseline for diff()"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing is not started")
+        with self._lock:
+            snapshot = self._baseline = self._take()
+        stats = snapshot.statistics(key_type)
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "pid": os.getpid(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [{"location": format_trace(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                    for stat in stats[:top]],
+        }
+
+    def diff(self, top: int = 20, key_type: str = "lineno") -> Dict[str, Any]:
+        """Allocation growth since the previous snapshot() (or diff()), largest first"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing is not started")
+        with self._lock:
+            previous = self._baseline
+            snapshot = self._baseline = self._take()
+        if previous is None:
+            raise RuntimeError("No baseline snapshot yet, take one first")
+        stats = snapshot.compare_to(previous, key_type)
+        return {
+            "pid": os.getpid(),
+            "traced_bytes": tracemalloc.get_traced_memory()[0],
+            "top": [{"location": format_trace(stat.traceback), "size_diff_bytes": stat.size_diff,
+                     "size_bytes": stat.size, "count_diff": stat.count_diff}
+                    for stat in stats[:top]],
+        }
+
+
+def format_trace(traceback: tracemalloc.Traceback) -> str:
+    return " <- ".join(f"{short_path(frame.filename)}:{frame.lineno}" for frame in traceback)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a task that sleeps ``interval``
+
+    Lag is the time other callbacks kept the loop busy (blocking calls,
+    long synchronous work); it delays every request and ticket worker alike.
+    Keeps the last ``window`` measurements and feeds webhook_event_loop_lag_seconds.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="event-loop-lag-monitor")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - started - self.interval)
+            self.samples.append((time.time(), lag))
+            event_loop_lag_seconds.observe(lag)
+
+    def status(self) -> Dict[str, Any]:
+        lags = sorted(lag for _, lag in self.samples)
+        if not lags:
+            return {"pid": os.getpid(), "interval_seconds": self.interval, "samples": 0}
+
+        def pct(value: float) -> float:
+            return round(lags[min(len(lags) - 1, int(value / 100 * len(lags)))], 6)
+
+        return {
+            "pid": os.getpid(),
+            "interval_seconds": self.interval,
+            "samples": len(lags),
+            "window_seconds": round(self.samples[-1][0] - self.samples[0][0], 1),
+            "current_seconds": round(self.samples[-1][1], 6),
+            "p50_seconds": pct(50),
+            "p99_seconds": pct(99),
+            "max_seconds": round(lags[-1], 6),
+        }
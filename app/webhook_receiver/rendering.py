@@ -0,0 +1,197 @@
+"""
+Ticket text rendering for the Axity Webhook Receiver and scripts/open_alert.py
+Title/description templates are loaded from disk once, compiled, cached and
+reloaded when their files change
+
+Template files live in ``ticket_templates/``; the first line is the title and
+the rest the description. Lookup order for an alert is
+``alertname/<alertname>.tmpl``, ``service/<service>.tmpl`` and then the
+default template. Placeholders use str.format syntax; any label or
+annotation can be referenced by name, plus the DERIVED_FIELDS below.
+"""
+
+import json
+import logging
+import os
+import string
+import threading
+import time
+from collections import OrderedDict
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ticket_templates")
+TEMPLATE_SUFFIX = ".tmpl"
+
+
+def pretty_json(value: Any) -> str:
+    """json.dumps(value, indent=2), fast for the flat string maps alerts carry
+
+    With ``indent`` json.dumps falls back to the pure-Python encoder; labels
+    and annotations are flat str -> str dicts, which are laid out here with
+    the C string encoder instead (same output).
+    """
+    if isinstance(value, dict) and all(type(k) is str and type(v) is str for k, v in value.items()):
+        if not value:
+            return "{}"
+        items = ",\n".join(f"  {encode_basestring_ascii(k)}: {encode_basestring_ascii(v)}" for k, v in value.items())
+        return "{\n" + items + "\n}"
+    return json.dumps(value, indent=2)
+
+
+# Fields derived from the alert, on top of its labels and annotations
+DERIVED_FIELDS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    'alertname': lambda a: a.get('labels', {}).get('alertname', 'Unknown Alert'),
+    'service': lambda a: a.get('labels', {}).get('service', 'unknown'),
+    'severity': lambda a: a.get('labels', {}).get('severity', 'unknown'),
+    'SEVERITY': lambda a: a.get('labels', {}).get('severity', 'unknown').upper(),
+    'status': lambda a: a.get('status', 'unknown'),
+    'startsAt': lambda a: a.get('startsAt', 'unknown'),
+    'summary': lambda a: a.get('annotations', {}).get('summary', 'No summary available'),
+    'description': lambda a: a.get('annotations', {}).get('description', 'No description available'),
+    'labels_json': lambda a: pretty_json(a.get('labels', {})),
+    'annotations_json': lambda a: pretty_json(a.get('annotations', {})),
+}
+
+
+def field_getter(name: str) -> Callable[[Dict[str, Any]], Any]:
+    """Getter for a placeholder: a derived field, else a label, else an annotation"""
+    if name in DERIVED_FIELDS:
+        return DERIVED_FIELDS[name]
+    return lambda a: a.get('labels', {}).get(name, a.get('annotations', {}).get(name, 'unknown'))
+
+
+class TicketTemplate:
+    """A title/description template pair, compiled once
+
+    Parsing collects the placeholders so that rendering computes only the
+    fields the template uses (no JSON dumps for templates without them).
+    """
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        title, _, body = source.partition("\n")
+        self.title = title.strip()
+        self.body = body
+        formatter = string.Formatter()
+        fields = {
+            field.split(".")[0].split("[")[0]
+            for text in (self.title, self.body)
+            for _, field, _, _ in formatter.parse(text)
+            if field
+        }
+        self._getters = [(field, field_getter(field)) for field in sorted(fields)]
+
+    def render(self, alert: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        extra = extra or {}
+        context = {field: get(alert) for field, get in self._getters if field not in extra}
+        context.update(extra)
+        return self.title.format_map(context), self.body.format_map(context)
+
+
+class TicketRenderer:
+    """Renders ticket title and description from the templates in ``directory``
+
+    Templates are reloaded when a file is added, changed or removed (checked
+    at most every ``reload_interval`` seconds). Results are memoized per
+    template and alert content in a bounded LRU, so repeats of an alert with
+    identical labels and annotations are rendered only once.
+    """
+
+    def __init__(self, directory: str = DEFAULT_TEMPLATES_DIR, reload_interval: float = 5.0,
+                 cache_size: int = 1024):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.cache_size = cache_size
+        self.templates: Dict[str, TicketTemplate] = {}
+        self._signature: Tuple = ()
+        self._checked_at = 0.0
+        self._cache: "OrderedDict[Hashable, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> bool:
+        """Load the templates again if their files changed"""
+        signature = self._scan()
+        if signature == self._signature:
+            return False
+
+        templates = {}
+        for name, path, _ in signature:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    templates[name] = TicketTemplate(name, f.read())
+            except (OSError, ValueError) as e:
+                logger.error("Skipping ticket template %s: %s", path, e)
+
+        with self._lock:
+            self.templates = templates
+            self._signature = signature
+            self._cache.clear()
+        logger.info("Loaded %s ticket templates from %s", len(templates), self.directory)
+        return True
+
+    def render(self, alert: Dict[str, Any], default: str = "default",
+               extra: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        """Title and description for an Alertmanager-style alert"""
+        self._maybe_reload()
+        template = self.select(alert, default)
+
+        try:
+            key = (
+                template.name,
+                alert.get('status'),
+                alert.get('startsAt'),
+                tuple(sorted(alert.get('labels', {}).items())),
+                tuple(sorted(alert.get('annotations', {}).items())),
+                tuple(sorted(extra.items())) if extra else (),
+            )
+            hash(key)
+        except TypeError:
+            # Non-scalar label or annotation values: render without memoizing
+            return template.render(alert, extra)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        rendered = template.render(alert, extra)
+        with self._lock:
+            self._cache[key] = rendered
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return rendered
+
+    def select(self, alert: Dict[str, Any], default: str = "default") -> TicketTemplate:
+        """Most specific template for an alert"""
+        labels = alert.get('labels', {})
+        templates = self.templates
+        for name in (f"alertname/{labels.get('alertname')}", f"service/{labels.get('service')}", default):
+            if name in templates:
+                return templates[name]
+        raise LookupError(f"No ticket template '{default}' in {self.directory}")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self.reload_interval >= 0 and now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            self.reload()
+
+    def _scan(self) -> Tuple:
+        """(name, path, mtime) of every template file, sorted"""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if not filename.endswith(TEMPLATE_SUFFIX):
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.directory)[:-len(TEMPLATE_SUFFIX)].replace(os.sep, "/")
+                try:
+                    found.append((name, path, os.stat(path).st_mtime_ns))
+                except OSError:
+                    continue
+        return tuple(sorted(found))
@@ -0,0 +1,167 @@
+"""
+Outbound protection for GLPI calls in the Axity Webhook Receiver
+Retries, token-bucket rate limit, circuit breaker and AIMD adaptive concurrency
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+from metrics import glpi_circuit_state, glpi_circuit_trips_total, glpi_concurrency_limit
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling GLPI while the circuit breaker is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"GLPI circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient GLPI errors"""
+
+    RETRYABLE_STATUS = {429, 502, 503, 504}
+    # A 502/504 may come back after GLPI applied the request: only these are safe for POST
+    NOT_APPLIED_STATUS = {429, 503}
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before retry number ``attempt`` (1-based)"""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class TokenBucket:
+    """Allows ``rate`` calls per second on average with bursts of ``burst``"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker around GLPI
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    every call fails fast for ``reset_timeout`` seconds. Then a single trial
+    call is let through (half-open): success closes the circuit, failure
+    opens it again.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+    STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half-open", OPEN: "open"}
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        glpi_circuit_state.set(self.state)
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(remaining)
+            self._set_state(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                raise CircuitOpenError(self.reset_timeout)
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                glpi_circuit_trips_total.inc()
+                self._set_state(self.OPEN)
+
+    def record_cancelled(self):
+        """A call ended without telling us anything about GLPI's health"""
+        self._trial_in_flight = False
+
+    def _set_state(self, state: int):
+        logger.warning("GLPI circuit breaker %s -> %s", self.STATE_NAMES[self.state], self.STATE_NAMES[state])
+        self.state = state
+        glpi_circuit_state.set(state)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on concurrent GLPI calls
+
+    The limit grows by one per ``limit`` fast successes (additive increase)
+    and is multiplied by ``backoff`` when a call fails or is slower than
+    ``target_latency`` (multiplicative decrease, at most once per latency
+    period so a burst of slow responses counts as one signal).
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 20,
+                 target_latency: float = 1.0, backoff: float = 0.5):
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+        glpi_concurrency_limit.set(self.limit)
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def record(self, latency: float, success: bool):
+        now = time.monotonic()
+        if success and latency <= self.target_latency:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        elif now - self._last_decrease >= max(latency, self.target_latency):
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        glpi_concurrency_limit.set(self.limit)
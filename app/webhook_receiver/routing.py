@@ -0,0 +1,233 @@
+"""
+Label-driven ticket routing for the Axity Webhook Receiver
+Maps alert labels (service, team...) to the GLPI entity, ITIL category,
+assigned group and requester of the ticket. GLPI items are referenced by
+name in the rules file and resolved to IDs in the background, so routing a
+ticket never calls GLPI
+
+Rules file (JSON, ROUTING_RULES_PATH)::
+
+    {
+      "defaults": {"requester": 2},
+      "rules": [
+        {"match": {"service": "payments"}, "entity": "Root entity > Payments",
+         "category": "Applications > Payments", "group": "Payments On-call"},
+        {"match": {"team": ["noc", "infra"]}, "group": "NOC", "requester": "alertmanager"}
+      ]
+    }
+
+Rules are checked in order and each field is taken from the first matching
+rule that sets it, then from ``defaults``. A value is either a GLPI ID or
+the item's full name (``completename``; login name for users).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from glpi import AsyncGLPIClient
+from metrics import glpi_lookups_total, routing_unresolved_total
+from resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Rule field -> (GLPI itemtype, field matched against the name, Ticket input key)
+ROUTING_FIELDS: Dict[str, Tuple[str, str, str]] = {
+    'entity': ('Entity', 'completename', 'entities_id'),
+    'category': ('ITILCategory', 'completename', 'itilcategories_id'),
+    'group': ('Group', 'completename', '_groups_id_assign'),
+    'requester': ('User', 'name', '_users_id_requester'),
+}
+
+
+class RoutingError(ValueError):
+    """Raised for a malformed routing rules file"""
+
+
+class RoutingTable:
+    """Parsed routing rules; pure label matching, no GLPI access"""
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None, defaults: Optional[Dict[str, Any]] = None):
+        self.defaults = self._targets(defaults or {}, "defaults")
+        self.rules: List[Tuple[Dict[str, frozenset], Dict[str, Any]]] = []
+        for position, rule in enumerate(rules or [], 1):
+            match = rule.get('match')
+            if not isinstance(match, dict) or not match:
+                raise RoutingError(f"rule {position}: 'match' must be a non-empty object")
+            labels = {
+                label: frozenset(str(v) for v in (values if isinstance(values, list) else [values]))
+                for label, values in match.items()
+            }
+            self.rules.append((labels, self._targets(rule, f"rule {position}")))
+
+    @staticmethod
+    def _targets(source: Dict[str, Any], where: str) -> Dict[str, Any]:
+        targets = {}
+        for field in ROUTING_FIELDS:
+            value = source.get(field)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, str)) or value == "":
+                raise RoutingError(f"{where}: '{field}' must be a GLPI ID or name")
+            targets[field] = value
+        return targets
+
+    @classmethod
+    def load(cls, path: str) -> "RoutingTable":
+        """Rules from a JSON file; a missing file means no routing"""
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+        except ValueError as e:
+            raise RoutingError(f"{path}: invalid JSON: {e}") from e
+        if not isinstance(config, dict):
+            raise RoutingError(f"{path}: expected an object with 'rules' and 'defaults'")
+        return cls(config.get('rules'), config.get('defaults'))
+
+    def select(self, labels: Dict[str, Any]) -> Dict[str, Any]:
+        """Target (GLPI ID or name) per routing field for an alert's labels"""
+        selected: Dict[str, Any] = {}
+        for match, targets in self.rules:
+            if len(selected) == len(ROUTING_FIELDS):
+                break
+            if all(str(labels.get(label)) in values for label, values in match.items()):
+                for field, value in targets.items():
+                    selected.setdefault(field, value)
+        for field, value in self.defaults.items():
+            selected.setdefault(field, value)
+        return selected
+
+    def names(self) -> List[Tuple[str, str]]:
+        """Every (field, name) the rules reference, i.e. what must be resolved"""
+        refs = {
+            (field, value)
+            for targets in [self.defaults] + [targets for _, targets in self.rules]
+            for field, value in targets.items() if isinstance(value, str)
+        }
+        return sorted(refs)
+
+
+class TicketRouter:
+    """Routes tickets with GLPI IDs held in a TTL-bounded in-memory cache
+
+    A background task resolves every name the rules reference once per
+    ``refresh_interval`` (and reloads the rules file when it changes).
+    ``route()`` only reads the cache, so it adds no GLPI call per ticket.
+    When GLPI is unavailable, resolved IDs stay usable until they are
+    ``ttl`` seconds old; a field whose name is unknown or expired falls back
+    to the default target, and otherwise is left to GLPI.
+    """
+
+    def __init__(self, client: AsyncGLPIClient, path: str, ttl: float = 3600.0, refresh_interval: float = 300.0):
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.table = RoutingTable()
+        self.refreshed_at: Optional[float] = None
+        self._ids: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self._missing: Dict[Tuple[str, str], str] = {}
+        self._mtime: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self.reload()
+
+    def reload(self) -> bool:
+        """Load the rules file if it changed; a broken file keeps the current rules"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        try:
+            self.table = RoutingTable.load(self.path)
+        except (OSError, RoutingError) as e:
+            logger.error("Keeping previous ticket routing rules: %s", e)
+            return False
+        self._mtime = mtime
+        logger.info("Loaded %s ticket routing rules from %s", len(self.table.rules), self.path)
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="ticket-routing-refresh")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self):
+        """Resolve every referenced name through GLPI, keeping old IDs on errors"""
+        await asyncio.to_thread(self.reload)
+        for field, name in self.table.names():
+            itemtype, name_field, _ = ROUTING_FIELDS[field]
+            key = (field, name)
+            try:
+                item_id = await self.client.find_item_id(itemtype, name_field, name)
+            except (httpx.HTTPError, CircuitOpenError, ValueError) as e:
+                glpi_lookups_total.labels(itemtype=itemtype, result='error').inc()
+                self._missing[key] = f"lookup failed: {e}"
+                logger.warning("Could not resolve GLPI %s '%s': %s", itemtype, name, e)
+                continue
+            if item_id is None:
+                glpi_lookups_total.labels(itemtype=itemtype, result='not_found').inc()
+                self._ids.pop(key, None)
+                self._missing[key] = "not found"
+                logger.warning("GLPI %s '%s' referenced by the routing rules does not exist", itemtype, name)
+            else:
+                glpi_lookups_total.labels(itemtype=itemtype, result='ok').inc()
+                self._ids[key] = (item_id, time.time())
+                self._missing.pop(key, None)
+        self.refreshed_at = time.time()
+
+    def resolve(self, field: str, target: Any) -> Optional[int]:
+        """GLPI ID for a rule target, from the cache only"""
+        if isinstance(target, int):
+            return target
+        cached = self._ids.get((field, target))
+        if cached is None or time.time() - cached[1] > self.ttl:
+            return None
+        return cached[0]
+
+    def route(self, labels: Dict[str, Any]) -> Dict[str, int]:
+        """Ticket input fields (entities_id, itilcategories_id...) for an alert's labels"""
+        fields = {}
+        for field, target in self.table.select(labels).items():
+            item_id = self.resolve(field, target)
+            if item_id is None:
+                routing_unresolved_total.labels(field=field).inc()
+                default = self.table.defaults.get(field)
+                if default is not None and default != target:
+                    item_id = self.resolve(field, default)
+            if item_id is not None:
+                fields[ROUTING_FIELDS[field][2]] = item_id
+        return fields
+
+    def status(self) -> Dict[str, Any]:
+        """Rules and cache state, for /health"""
+        return {
+            "rules": len(self.table.rules),
+            "resolved": len(self._ids),
+            "unresolved": {f"{field}:{name}": reason for (field, name), reason in sorted(self._missing.items())},
+            "refreshed_at": self.refreshed_at,
+        }
+
+    async def _run(self):
+        # A refresh awaited before start() counts as the first one
+        if self.refreshed_at is not None:
+            await asyncio.sleep(self.refresh_interval)
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Ticket routing refresh failed: %s", e, exc_info=True)
+            await asyncio.sleep(self.refresh_interval)
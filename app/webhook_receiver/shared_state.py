@@ -0,0 +1,103 @@
+"""
+State shared between receiver worker processes
+A small SQLite key/value store (GLPI session token) and the leader lock that
+decides which process drains the ticket queue
+"""
+
+import fcntl
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from ticket_queue import connect
+
+logger = logging.getLogger(__name__)
+
+
+class SharedState:
+    """Key/value pairs with optional expiry, visible to every process using ``path``"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS shared_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL
+                )
+            """)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+
+    def delete(self, key: str, value: Optional[str] = None):
+        """Remove a key, only if it still holds ``value`` when one is given"""
+        with self._lock, self._conn:
+            if value is None:
+                self._conn.execute("DELETE FROM shared_state WHERE key = ?", (key,))
+            else:
+                self._conn.execute("DELETE FROM shared_state WHERE key = ? AND value = ?", (key, value))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LeaderLock:
+    """Exclusive flock on ``path``: at most one process holds it at a time
+
+    The kernel releases the lock when its holder exits, so another process
+    can take over by calling ``acquire`` again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Try to take the lock without blocking"""
+        if self._fd is not None:
+            return True
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o640)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        logger.info("Process %s is the ticket queue leader", os.getpid())
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,322 @@
+"""
+Durable ticket queue for the Axity Webhook Receiver
+Alerts are persisted in SQLite (WAL mode) and drained by a pool of async workers
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from metrics import drain_abandoned_jobs_total, drain_duration_seconds, jobs_in_flight, jobs_parked_total, queue_wait_seconds
+from resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open a SQLite database in WAL mode, shareable between threads"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+@dataclass
+class Job:
+    """A queued alert waiting for its GLPI ticket"""
+    id: int
+    payload: Dict[str, Any]
+    enqueued_at: float
+    attempts: int
+    priority: int = 3
+
+
+class TicketQueue:
+    """Persistent priority queue of alerts with lease-based, at-least-once delivery
+
+    Jobs are claimed highest ``priority`` first (the GLPI urgency, 1-5), FIFO
+    within a priority. A job that has waited more than ``max_wait`` seconds
+    is claimed before any other, so low priorities cannot starve.
+
+    A claimed job is leased for ``lease_seconds``; if the worker dies before
+    acknowledging it, the lease expires and the job is delivered again.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60.0, max_wait: float = 300.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ticket_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    available_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    leased_until REAL NOT NULL DEFAULT 0,
+                    priority INTEGER NOT NULL DEFAULT 3
+                )
+            """)
+            # Queues created before priority lanes existed
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(ticket_jobs)")}
+            if "priority" not in columns:
+                self._conn.execute("ALTER TABLE ticket_jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 3")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ticket_jobs_available ON ticket_jobs (available_at)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ticket_jobs_priority ON ticket_jobs (priority DESC, id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ticket_jobs_fingerprint "
+                "ON ticket_jobs (json_extract(payload, '$.fingerprint'))"
+            )
+
+    def put_many(self, payloads: List[Dict[str, Any]], priorities: Optional[List[int]] = None) -> int:
+        """Append alerts to the queue in a single transaction"""
+        now = time.time()
+        priorities = priorities or [3] * len(payloads)
+        rows = [(json.dumps(payload), now, now, priority) for payload, priority in zip(payloads, priorities)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO ticket_jobs (payload, enqueued_at, available_at, priority) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def claim(self, min_priority: int = 0) -> Optional[Job]:
+        """Lease the next available job of at least ``min_priority``, or return None"""
+        now = time.time()
+        with self._lock, self._conn:
+            # Jobs waiting longer than max_wait first, oldest first; then by priority
+            for order, extra in (("id", "AND enqueued_at <= ?"), ("priority DESC, id", "")):
+                params = (now + self.lease_seconds, now, now, min_priority)
+                if extra:
+                    params += (now - self.max_wait,)
+                row = self._conn.execute(f"""
+                    UPDATE ticket_jobs
+                    SET leased_until = ?, attempts = attempts + 1
+                    WHERE id = (
+                        SELECT id FROM ticket_jobs
+                        WHERE available_at <= ? AND leased_until <= ? AND priority >= ? {extra}
+                        ORDER BY {order}
+                        LIMIT 1
+                    )
+                    RETURNING id, payload, enqueued_at, attempts, priority
+                """, params).fetchone()
+                if row is not None:
+                    break
+
+        if row is None:
+            return None
+        return Job(id=row[0], payload=json.loads(row[1]), enqueued_at=row[2], attempts=row[3], priority=row[4])
+
+    def ack(self, job_id: int):
+        """Remove a job once its ticket has been handled"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM ticket_jobs WHERE id = ?", (job_id,))
+
+    def retry(self, job_id: int, delay: float, count_attempt: bool = True):
+        """Release a job so it becomes available again after ``delay`` seconds
+
+        With ``count_attempt=False`` the delivery does not count towards the
+        job's attempts (the job was parked without being tried).
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE ticket_jobs SET leased_until = 0, available_at = ?, "
+                "attempts = attempts - ? WHERE id = ?",
+                (time.time() + delay, 0 if count_attempt else 1, job_id),
+            )
+
+    def queued_fingerprints(self, fingerprints: Iterable[str], status: str = "firing") -> Set[str]:
+        """The given fingerprints that still have a ``status`` alert waiting or in flight"""
+        fingerprints = list(fingerprints)
+        if not fingerprints:
+            return set()
+        placeholders = ",".join("?" * len(fingerprints))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT json_extract(payload, '$.fingerprint') FROM ticket_jobs "
+                f"WHERE json_extract(payload, '$.fingerprint') IN ({placeholders}) "
+                f"AND json_extract(payload, '$.status') = ?",
+                (*fingerprints, status),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def depth(self) -> int:
+        """Number of jobs not yet acknowledged"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ticket_jobs").fetchone()[0]
+
+    def depth_by_priority(self) -> Dict[int, int]:
+        """Number of jobs not yet acknowledged per priority"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT priority, COUNT(*) FROM ticket_jobs GROUP BY priority"))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TicketWorkerPool:
+    """Fixed pool of async workers draining a TicketQueue
+
+    The number of workers bounds how many tickets are in flight at once.
+    ``reserved_workers`` of them only take jobs of at least
+    ``reserved_priority``, so critical alerts always find a free worker even
+    when a flood of lower priority jobs keeps the others busy.
+    Failed jobs are retried with exponential delay up to ``max_attempts``, then
+    handed to ``on_exhausted`` (e.g. a dead-letter spool) and removed; jobs
+    hitting an open GLPI circuit are parked until it may close again.
+
+    ``drain()`` stops claiming and lets the jobs in flight finish; a job cut
+    short by shutdown is released at once rather than when its lease
+    expires, so the next leader picks it up without delay.
+
+    ``busy`` counts the workers inside ``handler``; ``on_idle`` is called
+    each time one of them leaves it (e.g. so a batcher can stop waiting
+    for a worker that will not join its batch).
+    """
+
+    def __init__(self, queue: TicketQueue, handler: Callable[[Dict[str, Any]], Awaitable[bool]],
+                 workers: int = 4, poll_interval: float = 1.0,
+                 max_attempts: int = 5, retry_delay: float = 5.0, max_retry_delay: float = 300.0,
+                 on_exhausted: Optional[Callable[[Job], Awaitable[None]]] = None,
+                 reserved_workers: int = 0, reserved_priority: int = 5,
+                 on_idle: Optional[Callable[[], None]] = None):
+        self.queue = queue
+        self.handler = handler
+        self.on_exhausted = on_exhausted
+        self.on_idle = on_idle
+        self.workers = workers
+        self.reserved_workers = min(reserved_workers, workers)
+        self.reserved_priority = reserved_priority
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._draining = False
+        self.abandoned = 0
+        self.busy = 0
+
+    def start(self):
+        self._draining = False
+        self._tasks = [
+            asyncio.create_task(
+                self._worker(self.reserved_priority if i < self.reserved_workers else 0),
+                name=f"ticket-worker-{i}",
+            )
+            for i in range(self.workers)
+        ]
+        logger.info("Started %s ticket workers on %s (%s reserved for priority >= %s)",
+                    self.workers, self.queue.path, self.reserved_workers, self.reserved_priority)
+
+    def notify(self):
+        """Wake idle workers after new jobs were queued"""
+        self._wakeup.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def drain(self, timeout: float) -> Dict[str, Any]:
+        """Stop claiming jobs and wait up to ``timeout`` seconds for those in flight
+
+        Workers still busy at the deadline are cancelled and their jobs
+        released back to the queue. Returns how long draining took and how
+        many jobs were abandoned.
+        """
+        started = time.monotonic()
+        self._draining = True
+        self._wakeup.set()
+        if not self._tasks:
+            return {"seconds": 0.0, "abandoned": 0}
+
+        abandoned_before = self.abandoned
+        _, busy = await asyncio.wait(self._tasks, timeout=max(0.0, timeout))
+        for task in busy:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        result = {"seconds": time.monotonic() - started, "abandoned": self.abandoned - abandoned_before}
+        drain_duration_seconds.set(result["seconds"])
+        drain_abandoned_jobs_total.inc(result["abandoned"])
+        return result
+
+    async def _worker(self, min_priority: int = 0):
+        while not self._draining:
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self.queue.claim, min_priority)
+
+            if job is not None and self._draining:
+                await asyncio.to_thread(self.queue.retry, job.id, 0, False)
+                return
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if job.attempts == 1:
+                queue_wait_seconds.labels(lane=str(job.priority)).observe(max(0.0, time.time() - job.enqueued_at))
+
+            self.busy += 1
+            try:
+                with jobs_in_flight.track_inprogress():
+                    success = await self.handler(job.payload)
+            except asyncio.CancelledError:
+                # Shutdown overtook the job: hand it back now instead of at lease expiry
+                self.abandoned += 1
+                self.queue.retry(job.id, 0, False)
+                logger.warning("Released queued job %s interrupted by shutdown", job.id,
+                               extra={"job_id": job.id, "fingerprint": job.payload.get('fingerprint')})
+                raise
+            except CircuitOpenError as e:
+                # GLPI is known to be down: park the job without burning an attempt
+                jobs_parked_total.inc()
+                await asyncio.to_thread(self.queue.retry, job.id, e.retry_after, False)
+                continue
+            except Exception as e:
+                logger.error("Unhandled error processing queued job %s: %s", job.id, e, exc_info=True,
+                             extra={"job_id": job.id, "fingerprint": job.payload.get('fingerprint')})
+                success = False
+            finally:
+                self.busy -= 1
+                if self.on_idle:
+                    self.on_idle()
+
+            if success:
+                await asyncio.to_thread(self.queue.ack, job.id)
+            elif job.attempts >= self.max_attempts:
+                logger.error("Giving up on queued job %s after %s attempts", job.id, job.attempts,
+                             extra={"job_id": job.id, "fingerprint": job.payload.get('fingerprint')})
+                if self.on_exhausted:
+                    try:
+                        await self.on_exhausted(job)
+                    except Exception as e:
+                        logger.error("Error dead-lettering queued job %s: %s", job.id, e)
+                await asyncio.to_thread(self.queue.ack, job.id)
+            else:
+                delay = min(self.retry_delay * 2 ** (job.attempts - 1), self.max_retry_delay)
+                await asyncio.to_thread(self.queue.retry, job.id, delay)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+HTTP instrumentation overhead benchmark for the Axity Infra Ops Lab app
+Drives the ASGI app in-process (no sockets, so the middleware is not hidden
+behind network noise) with and without the PrometheusMiddleware from
+infra/docker/app/app/metrics.py, and with an equivalent BaseHTTPMiddleware
+for comparison
+
+Usage:
+  python3 benchmarks/bench_http_metrics.py [--requests 5000] [--concurrency 50]
+                                           [--max-overhead-us N]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "infra", "docker", "app"))
+
+from fastapi import FastAPI  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app.metrics import PrometheusMiddleware, http_request_duration_seconds, http_requests_total  # noqa: E402
+
+
+async def base_http_metrics(request, call_next):
+    """The usual BaseHTTPMiddleware instrumentation, for comparison"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route is not None else "<unmatched>"
+    http_requests_total.labels(request.method, path, str(response.status_code)).inc()
+    http_request_duration_seconds.labels(request.method, path).observe(time.perf_counter() - start)
+    return response
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    if variant == "asgi":
+        app.add_middleware(PrometheusMiddleware)
+    elif variant == "base":
+        app.add_middleware(BaseHTTPMiddleware, dispatch=base_http_metrics)
+    return app
+
+
+async def drive(app, requests: int, concurrency: int) -> float:
+    """Seconds to serve ``requests`` GETs, ``concurrency`` at a time"""
+    request = {"type": "http.request", "body": b"", "more_body": False}
+    never = asyncio.Event()
+
+    async def send(message):
+        pass
+
+    async def client(count: int):
+        for i in range(count):
+            messages = [request]
+
+            async def receive():
+                # The body once, then nothing until the server gives up listening
+                if messages:
+                    return messages.pop()
+                await never.wait()
+
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+                "method": "GET", "scheme": "http", "path": f"/items/{i}", "raw_path": f"/items/{i}".encode(),
+                "query_string": b"", "root_path": "", "headers": [(b"host", b"bench")],
+                "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 8000),
+            }
+            await app(scope, receive, send)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(requests // concurrency) for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def per_request(variants, requests: int, concurrency: int, rounds: int = 5):
+    """Best-of-``rounds`` microseconds per request for each variant
+
+    Rounds alternate between variants so that drift (CPU frequency, other
+    load) affects them all alike.
+    """
+    apps = {variant: build_app(variant) for variant in variants}
+    best = {variant: float("inf") for variant in variants}
+    for app in apps.values():
+        asyncio.run(drive(app, requests // 10, concurrency))
+    for _ in range(rounds):
+        for variant, app in apps.items():
+            best[variant] = min(best[variant], asyncio.run(drive(app, requests, concurrency)))
+    return {variant: seconds / requests * 1e6 for variant, seconds in best.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="requests per round")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight")
+    parser.add_argument("--max-overhead-us", type=float, help="fail if the middleware adds more than this per request")
+    args = parser.parse_args()
+
+    micros = per_request(("none", "asgi", "base"), args.requests, args.concurrency)
+    baseline = micros["none"]
+    results = [
+        ("no instrumentation", baseline),
+        ("PrometheusMiddleware (pure ASGI)", micros["asgi"]),
+        ("BaseHTTPMiddleware equivalent", micros["base"]),
+    ]
+
+    print(f"{'variant':<34} {'µs/req':>8} {'overhead':>9} {'max req/s':>10}")
+    for name, micros in results:
+        print(f"{name:<34} {micros:>8.1f} {micros - baseline:>8.1f}µ {1e6 / micros:>10.0f}")
+
+    overhead = results[1][1] - baseline
+    if args.max_overhead_us is not None and overhead > args.max_overhead_us:
+        sys.exit(f"FAILED: instrumentation adds {overhead:.1f}µs per request > {args.max_overhead_us}µs")
+
+
+if __name__ == "__main__":
+    main()
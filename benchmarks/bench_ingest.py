@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Alertmanager payload ingestion benchmark for the Axity Webhook Receiver
+Compares the previous Pydantic path (json + AlertPayload + model_dump for the
+debug log) with the fast path in app/webhook_receiver/ingest.py
+
+Usage:
+  python3 benchmarks/bench_ingest.py [--sizes 1,10,100,1000] [--labels 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app", "webhook_receiver"))
+
+from ingest import AlertPayload, orjson, parse_alertmanager_payload  # noqa: E402
+
+
+def build_payload(alerts: int, labels: int) -> bytes:
+    """Grouped Alertmanager notification with ``alerts`` alerts of ``labels`` labels each"""
+    return json.dumps({
+        "receiver": "critical-alerts",
+        "status": "firing",
+        "groupKey": '{}:{alertname="HighCPU"}',
+        "groupLabels": {"alertname": "HighCPU"},
+        "commonLabels": {"alertname": "HighCPU", "severity": "critical"},
+        "commonAnnotations": {},
+        "externalURL": "http://alertmanager:9093",
+        "version": "4",
+        "alerts": [
+            {
+                "status": "firing",
+                "fingerprint": f"{i:016x}",
+                "startsAt": "2024-01-01T00:00:00Z",
+                "endsAt": "0001-01-01T00:00:00Z",
+                "generatorURL": "http://prometheus:9090/graph",
+                "labels": {
+                    "alertname": "HighCPU",
+                    "severity": "critical",
+                    "instance": f"node-{i}:9100",
+                    **{f"label_{n}": f"value-{i}-{n}" for n in range(labels)},
+                },
+                "annotations": {
+                    "summary": f"CPU above 90% on node-{i}",
+                    "description": "CPU usage has been above 90% for 5 minutes " * 3,
+                },
+            }
+            for i in range(alerts)
+        ],
+    }).encode()
+
+
+def pydantic_path(body: bytes):
+    """What FastAPI did before: json.loads, model validation, eager model_dump"""
+    payload = AlertPayload(**json.loads(body))
+    f"Full payload: {payload.model_dump()}"
+    return payload.alerts
+
+
+def fast_path(body: bytes):
+    return parse_alertmanager_payload(body)["alerts"]
+
+
+def measure(func, body: bytes) -> float:
+    """Best-of-5 seconds per call"""
+    timer = timeit.Timer(lambda: func(body))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10,100,1000", help="comma separated alert counts")
+    parser.add_argument("--labels", type=int, default=20, help="extra labels per alert")
+    args = parser.parse_args()
+
+    print(f"JSON decoder for fast path: {'orjson' if orjson else 'json'}")
+    print(f"{'alerts':>8} {'body KiB':>9} {'pydantic µs':>12} {'fast µs':>10} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        body = build_payload(size, args.labels)
+        assert len(pydantic_path(body)) == len(fast_path(body)) == size
+        slow = measure(pydantic_path, body)
+        fast = measure(fast_path, body)
+        print(f"{size:>8} {len(body) / 1024:>9.1f} {slow * 1e6:>12.1f} {fast * 1e6:>10.1f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
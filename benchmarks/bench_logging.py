@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Logging overhead benchmark for the Axity Webhook Receiver
+Simulates request handlers that each log an error with its traceback (as
+during a GLPI outage) and measures their latency with the previous
+synchronous logging (basicConfig stream handler, f-strings,
+traceback.format_exc()) and with the queue-backed pipeline from
+app/webhook_receiver/log_pipeline.py, against a log sink that takes
+``--sink-latency`` seconds per write (a busy pipe or container log driver)
+
+Usage:
+  python3 benchmarks/bench_logging.py [--requests 2000] [--concurrency 50] [--sink-latency 0.0002]
+"""
+
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app", "webhook_receiver"))
+
+from log_pipeline import TEXT_FORMAT, setup_logging, stop_listener  # noqa: E402
+
+
+class SlowSink(io.TextIOBase):
+    """Discards output, taking ``latency`` seconds per write"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text):
+        time.sleep(self.latency)
+        self.writes += 1
+        return len(text)
+
+
+def glpi_call(ticket_id: int):
+    raise ConnectionError(f"All connection attempts failed (ticket {ticket_id})")
+
+
+async def handler_before(logger: logging.Logger, ticket_id: int):
+    try:
+        glpi_call(ticket_id)
+    except Exception as e:
+        logger.error(f"Error closing GLPI ticket #{ticket_id}: {e}")
+        logger.error(traceback.format_exc())
+
+
+async def handler_after(logger: logging.Logger, ticket_id: int):
+    try:
+        glpi_call(ticket_id)
+    except Exception as e:
+        logger.error("Error closing GLPI ticket #%s: %s", ticket_id, e, exc_info=True, extra={"ticket_id": ticket_id})
+
+
+async def drive(handler, logger, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(i):
+        async with semaphore:
+            started = time.perf_counter()
+            await asyncio.sleep(0)
+            await handler(logger, i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(requests)))
+    return sorted(latencies), time.perf_counter() - started
+
+
+def configure(variant: str, sink: SlowSink):
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    if variant == "sync":
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        return None
+    burst = 10 if variant == "pipeline" else 0
+    return setup_logging(fmt="json", rate_limit_burst=burst, rate_limit_window=60, stream=sink)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="simulated failing requests")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight")
+    parser.add_argument("--sink-latency", type=float, default=0.0002, help="seconds per write to the log sink")
+    args = parser.parse_args()
+
+    variants = [
+        ("sync", handler_before, "basicConfig + f-string + format_exc"),
+        ("pipeline-unlimited", handler_after, "queue pipeline, JSON, no rate limit"),
+        ("pipeline", handler_after, "queue pipeline, JSON, rate-limited"),
+    ]
+    logger = logging.getLogger("bench")
+    print(f"{'variant':<38} {'p50 µs':>9} {'p99 µs':>9} {'req/s':>9} {'lines':>7}")
+    for name, handler, label in variants:
+        sink = SlowSink(args.sink_latency)
+        listener = configure(name, sink)
+        latencies, elapsed = asyncio.run(drive(handler, logger, args.requests, args.concurrency))
+        stop_listener(listener)
+        p50 = latencies[len(latencies) // 2] * 1e6
+        p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+        print(f"{label:<38} {p50:>9.0f} {p99:>9.0f} {args.requests / elapsed:>9.0f} {sink.writes:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Ticket rendering benchmark for the Axity Webhook Receiver
+Compares the previous hard-coded f-string in build_alert_ticket with the
+template renderer in app/webhook_receiver/rendering.py
+
+Usage:
+  python3 benchmarks/bench_rendering.py [--alerts 1000] [--labels 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app", "webhook_receiver"))
+
+from rendering import DEFAULT_TEMPLATES_DIR, TicketRenderer  # noqa: E402
+
+
+def fstring_ticket(alert_data):
+    """Ticket text as build_alert_ticket produced it before templates"""
+    labels = alert_data.get('labels', {})
+    annotations = alert_data.get('annotations', {})
+    severity = labels.get('severity', 'unknown')
+    service = labels.get('service', 'unknown')
+    alertname = labels.get('alertname', 'Unknown Alert')
+    title = f"[{severity.upper()}] {alertname} - {service}"
+    description = f"""
+ALERT DETAILS:
+==============
+Alert: {alertname}
+Service: {service}
+Severity: {severity}
+Status: {alert_data.get('status', 'unknown')}
+Started: {alert_data.get('startsAt', 'unknown')}
+
+SUMMARY:
+{annotations.get('summary', 'No summary available')}
+
+DESCRIPTION:
+{annotations.get('description', 'No description available')}
+
+LABELS:
+{json.dumps(labels, indent=2)}
+
+ANNOTATIONS:
+{json.dumps(annotations, indent=2)}
+
+This ticket was automatically created by the Axity Infrastructure Monitoring System.
+For more information, check the Prometheus AlertManager at: http://localhost:9093
+"""
+    return title, description
+
+
+def build_alerts(count: int, labels: int):
+    return [
+        {
+            "status": "firing",
+            "startsAt": "2024-01-01T00:00:00Z",
+            "labels": {
+                "alertname": "HighCPU", "severity": "critical", "service": "api",
+                "instance": f"node-{i}:9100",
+                **{f"label_{n}": f"value-{n}" for n in range(labels)},
+            },
+            "annotations": {"summary": f"CPU above 90% on node-{i}", "description": "CPU usage above 90% for 5 minutes"},
+        }
+        for i in range(count)
+    ]
+
+
+def per_ticket(func, alerts) -> float:
+    """Best-of-5 microseconds per rendered ticket"""
+    timer = timeit.Timer(lambda: [func(alert) for alert in alerts])
+    return min(timer.repeat(repeat=5, number=1)) / len(alerts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=1000, help="distinct alerts rendered per round")
+    parser.add_argument("--labels", type=int, default=10, help="extra labels per alert")
+    args = parser.parse_args()
+
+    alerts = build_alerts(args.alerts, args.labels)
+    renderer = TicketRenderer(DEFAULT_TEMPLATES_DIR, reload_interval=5, cache_size=0)
+    assert renderer.render(alerts[0]) == fstring_ticket(alerts[0])
+
+    cold = per_ticket(renderer.render, alerts)
+    renderer.cache_size = len(alerts)
+    [renderer.render(alert) for alert in alerts]
+    warm = per_ticket(renderer.render, alerts)
+    baseline = per_ticket(fstring_ticket, alerts)
+
+    print(f"{'variant':<34} {'µs/ticket':>10}")
+    print(f"{'f-string (previous code)':<34} {baseline:>10.1f}")
+    print(f"{'template, distinct alerts':<34} {cold:>10.1f}")
+    print(f"{'template, repeated alerts (memo)':<34} {warm:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
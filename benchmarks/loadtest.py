@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the Axity Webhook Receiver
+Starts a fake GLPI REST server in-process and the receiver as a uvicorn
+subprocess, fires grouped Alertmanager notifications at a target rate and
+reports throughput, alert-to-ticket latency and GLPI calls per ticket
+
+Usage:
+  python3 benchmarks/loadtest.py [--rate 200] [--duration 10] [--group-size 10]
+                                 [--glpi-latency 0.05] [--glpi-error-rate 0.0]
+                                 [--min-rate N] [--max-p99 S]
+
+Receiver settings (QUEUE_WORKERS, TICKET_BATCH_MAX, GLPI_RATE_LIMIT...) are
+taken from the environment like in production.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+import uvicorn
+
+RECEIVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "webhook_receiver")
+LOADTEST_ID = re.compile(r'"loadtest_id": "([^"]+)"')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeGLPI:
+    """Minimal GLPI REST API (ASGI) with configurable latency and error rate
+
+    Records when the ticket of every load-test alert was created, keyed by the
+    ``loadtest_id`` label found in the ticket content.
+    """
+
+    def __init__(self, latency: float = 0.05, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self.created: Dict[str, float] = {}
+        self._next_id = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        more = True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+
+        endpoint = scope["path"].split("/apirest.php/", 1)[-1]
+        self.calls[(scope["method"], endpoint.split("/")[0])] += 1
+        await asyncio.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            status, result = 503, ["ERROR", "GLPI stub failure"]
+        elif endpoint == "initSession":
+            status, result = 200, {"session_token": "loadtest"}
+        elif scope["method"] == "POST" and endpoint == "Ticket":
+            status, result = 201, self._create(json.loads(body)["input"])
+        else:
+            status, result = 200, {}
+
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(result).encode()})
+
+    def _create(self, items):
+        batch = items if isinstance(items, list) else [items]
+        now = time.monotonic()
+        results = []
+        for item in batch:
+            self._next_id += 1
+            match = LOADTEST_ID.search(item.get("content", ""))
+            if match:
+                self.created.setdefault(match.group(1), now)
+            results.append({"id": self._next_id, "message": ""})
+        return results if isinstance(items, list) else results[0]
+
+    def glpi_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+def serve_in_thread(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def start_receiver(port: int, glpi_port: int, workdir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "GLPI_URL": f"http://127.0.0.1:{glpi_port}",
+        "QUEUE_PATH": os.path.join(workdir, "ticket_queue.db"),
+        "DEAD_LETTER_PATH": os.path.join(workdir, "dead_letter.jsonl"),
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", RECEIVER_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+
+
+def build_notification(ids: List[str]) -> Dict:
+    """Grouped Alertmanager notification, one alert per load-test id"""
+    return {
+        "receiver": "critical-alerts",
+        "status": "firing",
+        "groupKey": '{}:{alertname="LoadTest"}',
+        "groupLabels": {"alertname": "LoadTest"},
+        "commonLabels": {"alertname": "LoadTest", "severity": "critical"},
+        "version": "4",
+        "alerts": [
+            {
+                "status": "firing",
+                "fingerprint": alert_id,
+                "startsAt": "2024-01-01T00:00:00Z",
+                "labels": {
+                    "alertname": random.choice(["HighCPU", "DiskFull", "AppDown", "HighLatency"]),
+                    "severity": random.choice(["critical", "warning"]),
+                    "service": "loadtest",
+                    "instance": f"node-{random.randint(1, 50)}:9100",
+                    "loadtest_id": alert_id,
+                },
+                "annotations": {"summary": "Load test alert", "description": "Generated by benchmarks/loadtest.py"},
+            }
+            for alert_id in ids
+        ],
+    }
+
+
+async def fire(url: str, rate: float, duration: float, group_size: int) -> Dict:
+    """Post notifications so that ``rate`` alerts/s reach the receiver"""
+    sent: Dict[str, float] = {}
+    statuses = Counter()
+    interval = group_size / rate
+    counter = 0
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def post(ids):
+            notification = build_notification(ids)
+            started = time.monotonic()
+            try:
+                response = await client.post(f"{url}/alert", json=notification)
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    sent.update((alert_id, started) for alert_id in ids)
+            except httpx.HTTPError:
+                statuses["error"] += 1
+
+        tasks = []
+        start = time.monotonic()
+        while time.monotonic() - start < duration:
+            ids = [f"lt-{counter + i:08d}" for i in range(group_size)]
+            counter += group_size
+            tasks.append(asyncio.create_task(post(ids)))
+            next_send = start + len(tasks) * interval
+            await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+        await asyncio.gather(*tasks)
+
+    return {"sent": sent, "statuses": statuses, "offered": counter, "elapsed": time.monotonic() - start}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=200, help="alerts per second offered")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load")
+    parser.add_argument("--group-size", type=int, default=10, help="alerts per Alertmanager notification")
+    parser.add_argument("--glpi-latency", type=float, default=0.05, help="seconds the fake GLPI takes per call")
+    parser.add_argument("--glpi-error-rate", type=float, default=0.0, help="fraction of GLPI calls answered 503")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="seconds to wait for pending tickets")
+    parser.add_argument("--min-rate", type=float, help="fail if sustained alerts/s is below this")
+    parser.add_argument("--max-p99", type=float, help="fail if p99 alert-to-ticket latency exceeds this")
+    args = parser.parse_args()
+
+    glpi = FakeGLPI(latency=args.glpi_latency, error_rate=args.glpi_error_rate)
+    glpi_server = serve_in_thread(glpi, free_port())
+    receiver_port = free_port()
+
+    with tempfile.TemporaryDirectory(prefix="webhook-loadtest-") as workdir:
+        receiver = start_receiver(receiver_port, glpi_server.config.port, workdir)
+        url = f"http://127.0.0.1:{receiver_port}"
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if httpx.get(f"{url}/health").status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline or receiver.poll() is not None:
+                    sys.exit("Webhook receiver did not start")
+                time.sleep(0.1)
+
+            result = asyncio.run(fire(url, args.rate, args.duration, args.group_size))
+            sent = result["sent"]
+
+            deadline = time.monotonic() + args.drain_timeout
+            while len(set(sent) & set(glpi.created)) < len(sent) and time.monotonic() < deadline:
+                time.sleep(0.1)
+        finally:
+            receiver.terminate()
+            receiver.wait(timeout=30)
+            glpi_server.should_exit = True
+
+    ticketed = [alert_id for alert_id in sent if alert_id in glpi.created]
+    latencies = [glpi.created[alert_id] - sent[alert_id] for alert_id in ticketed]
+    if ticketed:
+        span = max(glpi.created[a] for a in ticketed) - min(sent[a] for a in ticketed)
+        sustained = len(ticketed) / span if span > 0 else float("inf")
+    else:
+        sustained = 0.0
+    p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+    ticket_posts = glpi.calls[("POST", "Ticket")]
+
+    print(f"Offered:            {result['offered']} alerts in {result['elapsed']:.1f}s "
+          f"({result['offered'] / result['elapsed']:.0f} alerts/s, groups of {args.group_size})")
+    print(f"Responses:          {dict(result['statuses'])}")
+    print(f"Accepted:           {len(sent)} alerts")
+    print(f"Tickets created:    {len(ticketed)} (dropped {len(sent) - len(ticketed)})")
+    print(f"Sustained:          {sustained:.1f} alerts/s")
+    print(f"Alert-to-ticket:    p50 {p50 * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms")
+    print(f"GLPI calls:         {glpi.glpi_calls()} total, {ticket_posts} ticket POSTs, "
+          f"{glpi.glpi_calls() / max(1, len(ticketed)):.2f} calls/ticket")
+    print(f"GLPI calls by type: {dict((f'{m} {e}', n) for (m, e), n in glpi.calls.items())}")
+
+    failures = []
+    if len(ticketed) < len(sent):
+        failures.append(f"{len(sent) - len(ticketed)} accepted alerts never became tickets")
+    if args.min_rate is not None and sustained < args.min_rate:
+        failures.append(f"sustained {sustained:.1f} alerts/s < {args.min_rate}")
+    if args.max_p99 is not None and not p99 <= args.max_p99:
+        failures.append(f"p99 latency {p99:.2f}s > {args.max_p99}s")
+    if failures:
+        sys.exit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
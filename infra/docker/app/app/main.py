@@ -1,6 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+
+from .metrics import PrometheusMiddleware, metrics_response
 
 app = FastAPI(title="Axity Infra Ops Lab", version="1.0.0")
+app.add_middleware(PrometheusMiddleware)
 
 @app.get("/")
 async def root():
@@ -8,4 +11,9 @@ async def root():
 
 @app.get("/healthz")
 async def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = metrics_response()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,94 @@
+"""
+Prometheus instrumentation for the Axity Infra Ops Lab app
+A pure ASGI middleware (no BaseHTTPMiddleware, no per-request objects beyond a
+send wrapper) that counts requests and records their latency per route template
+"""
+
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Label values for requests no route matched and for unusual methods, so that
+# scanners hitting random URLs cannot grow the series count
+UNMATCHED_ROUTE = "<unmatched>"
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+http_requests_total = Counter(
+    'http_requests_total',
+    'HTTP requests handled',
+    ['method', 'route', 'status']
+)
+
+http_request_duration_seconds = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency from the first ASGI call to the last response byte',
+    ['method', 'route'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+http_requests_in_progress = Gauge(
+    'http_requests_in_progress',
+    'HTTP requests currently being handled',
+    ['method']
+)
+
+
+class PrometheusMiddleware:
+    """Records http_requests_total, http_request_duration_seconds and in-progress requests
+
+    The route label is the matched route's path template (``/items/{id}``),
+    never the raw URL. Labelled children are resolved once per
+    (method, route, status) and cached, which keeps the per-request cost to
+    a few dictionary lookups and the metric updates themselves.
+    """
+
+    def __init__(self, app, exclude: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.exclude = frozenset(exclude)
+        self._children: Dict[Tuple[str, str, int], Tuple] = {}
+        self._in_progress: Dict[str, Gauge] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in KNOWN_METHODS else "OTHER"
+        in_progress = self._in_progress.get(method)
+        if in_progress is None:
+            in_progress = self._in_progress[method] = http_requests_in_progress.labels(method)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            route = scope.get("route")
+            self._observe(method, route.path if route is not None else UNMATCHED_ROUTE, status, elapsed)
+
+    def _observe(self, method: str, route: str, status: int, elapsed: float):
+        children = self._children.get((method, route, status))
+        if children is None:
+            children = self._children[(method, route, status)] = (
+                http_requests_total.labels(method, route, str(status)),
+                http_request_duration_seconds.labels(method, route),
+            )
+        counter, histogram = children
+        counter.inc()
+        histogram.observe(elapsed)
+
+
+def metrics_response() -> Tuple[bytes, str]:
+    """Body and content type of the Prometheus exposition"""
+    return generate_latest(), CONTENT_TYPE_LATEST
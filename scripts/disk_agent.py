@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+"""
+Disk Monitor Agent for Axity Infrastructure
+Samples disk and inode usage of many mounts with statvfs, exports it in
+Prometheus format, alerts the webhook receiver with hysteresis and keeps an
+incrementally refreshed index of directory sizes for the "top N" report
+
+Replaces the df/du pipelines of monitor_disk.sh, which now runs it with --once.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+# Mounts: comma-separated mount points, or "auto" for every local filesystem
+DISK_MOUNTS = os.getenv("DISK_MOUNTS", os.getenv("MOUNT_POINT", "/"))
+DISK_INTERVAL = float(os.getenv("DISK_INTERVAL", "30"))
+
+# Alerting: usage percent thresholds; an alert clears only once usage falls
+# DISK_HYSTERESIS points below the level that raised it
+DISK_THRESHOLD = float(os.getenv("DISK_THRESHOLD", "85"))
+DISK_WARNING = float(os.getenv("DISK_WARNING", str(DISK_THRESHOLD - 10)))
+DISK_INODE_THRESHOLD = float(os.getenv("DISK_INODE_THRESHOLD", "90"))
+DISK_HYSTERESIS = float(os.getenv("DISK_HYSTERESIS", "5"))
+# Host events go to the receiver's /ingest/events in NDJSON batches, one request per sample.
+# GLPI_WEBHOOK_URL is the receiver's /alert URL the old monitor_disk.sh posted to: unless
+# HOST_EVENTS_URL is set, events go to /ingest/events on the same receiver (empty disables alerts)
+HOST_EVENTS_URL = os.getenv("HOST_EVENTS_URL")
+GLPI_WEBHOOK_URL = os.getenv("GLPI_WEBHOOK_URL", "http://localhost:5000/alert")
+SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL", "")
+
+# Prometheus exposition: HTTP port (0 disables) and/or a node_exporter textfile
+DISK_METRICS_PORT = int(os.getenv("DISK_METRICS_PORT", "9101"))
+DISK_TEXTFILE = os.getenv("DISK_TEXTFILE", "")
+
+# Directory size index for the top-N report
+DISK_TOP_N = int(os.getenv("DISK_TOP_N", "10"))
+DISK_INDEX_PATH = os.getenv("DISK_INDEX_PATH", os.path.expanduser("~/.cache/axity-disk-index.json"))
+DISK_INDEX_INTERVAL = float(os.getenv("DISK_INDEX_INTERVAL", "600"))
+DISK_INDEX_FULL_EVERY = int(os.getenv("DISK_INDEX_FULL_EVERY", "12"))
+DISK_INDEX_WORKERS = int(os.getenv("DISK_INDEX_WORKERS", "8"))
+
+# Alert levels and undelivered events carried from one --once run to the next
+DISK_STATE_PATH = os.getenv("DISK_STATE_PATH", os.path.join(os.path.dirname(DISK_INDEX_PATH), "axity-disk-state.json"))
+
+HOSTNAME = socket.gethostname()
+
+# Filesystem types that never hold user data
+PSEUDO_FILESYSTEMS = {
+    "autofs", "binfmt_misc", "bpf", "cgroup", "cgroup2", "configfs", "debugfs", "devpts", "devtmpfs",
+    "fusectl", "hugetlbfs", "mqueue", "nsfs", "overlay", "proc", "pstore", "ramfs", "rpc_pipefs",
+    "securityfs", "squashfs", "sysfs", "tmpfs", "tracefs",
+}
+
+LEVELS = ("ok", "warning", "critical")
+
+
+@dataclass
+class MountUsage:
+    """One statvfs sample of a mount point"""
+    mountpoint: str
+    device: str
+    fstype: str
+    size_bytes: int
+    free_bytes: int
+    avail_bytes: int
+    inodes: int
+    inodes_free: int
+
+    @property
+    def used_bytes(self) -> int:
+        return self.size_bytes - self.free_bytes
+
+    @property
+    def used_percent(self) -> float:
+        """Usage as df reports it: blocks reserved for root count as unavailable"""
+        usable = self.used_bytes + self.avail_bytes
+        return 100.0 * self.used_bytes / usable if usable else 0.0
+
+    @property
+    def inodes_percent(self) -> float:
+        return 100.0 * (self.inodes - self.inodes_free) / self.inodes if self.inodes else 0.0
+
+
+def discover_mounts(mounts_file: str = "/proc/mounts") -> Dict[str, Tuple[str, str]]:
+    """Mount point -> (device, fstype) for local filesystems, one mount point per device"""
+    found: Dict[str, Tuple[str, str]] = {}
+    devices = set()
+    try:
+        with open(mounts_file, encoding="utf-8") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                device, mountpoint, fstype = fields[0], fields[1].replace("\\040", " "), fields[2]
+                if fstype in PSEUDO_FILESYSTEMS or device in devices:
+                    continue
+                devices.add(device)
+                found[mountpoint] = (device, fstype)
+    except OSError:
+        pass
+    return found
+
+
+def configured_mounts(spec: str = DISK_MOUNTS) -> Dict[str, Tuple[str, str]]:
+    """Mount points named in DISK_MOUNTS, with device and fstype when known"""
+    known = discover_mounts()
+    if spec.strip() == "auto":
+        return known or {"/": ("unknown", "unknown")}
+    return {
+        path: known.get(path, ("unknown", "unknown"))
+        for path in (part.strip() for part in spec.split(","))
+        if path
+    }
+
+
+def sample_mount(mountpoint: str, device: str = "unknown", fstype: str = "unknown") -> MountUsage:
+    """statvfs of one mount point (no fork, no parsing of df output)"""
+    st = os.statvfs(mountpoint)
+    return MountUsage(
+        mountpoint=mountpoint,
+        device=device,
+        fstype=fstype,
+        size_bytes=st.f_blocks * st.f_frsize,
+        free_bytes=st.f_bfree * st.f_frsize,
+        avail_bytes=st.f_bavail * st.f_frsize,
+        inodes=st.f_files,
+        inodes_free=st.f_ffree,
+    )
+
+
+class Hysteresis:
+    """Alert levels per key that only change when a value clearly crosses a threshold
+
+    A key rises to a level as soon as the value reaches its threshold, and
+    falls back only once the value is ``margin`` below it, so a disk hovering
+    around the threshold raises one alert instead of one per sample.
+    """
+
+    def __init__(self, margin: float):
+        self.margin = margin
+        self.levels: Dict[Tuple[str, str], str] = {}
+
+    def update(self, key: Tuple[str, str], value: float, warning: float, critical: float) -> Tuple[str, str]:
+        """Record a sample, returning (previous level, new level)"""
+        previous = self.levels.get(key, "ok")
+        # The thresholds of the current level and those below it are lowered by the margin
+        if previous == "critical":
+            critical -= self.margin
+        if previous != "ok":
+            warning -= self.margin
+
+        if value >= critical:
+            level = "critical"
+        elif value >= warning:
+            level = "warning"
+        else:
+            level = "ok"
+
+        self.levels[key] = level
+        return previous, level
+
+
+class DirectoryIndex:
+    """Cached sizes of every directory under ``root``, refreshed incrementally
+
+    Each directory keeps its modification time, the bytes of the files
+    directly in it and its subdirectories. On refresh a directory whose
+    mtime is unchanged reuses that entry: only one stat is needed instead of
+    a scandir plus a stat per file. Files growing in place do not change
+    their directory's mtime, so every ``full_every`` refreshes all
+    directories are rescanned. Directories are scanned in parallel and the
+    traversal stays on ``root``'s filesystem (like ``du -x``).
+    """
+
+    def __init__(self, root: str, path: Optional[str] = None, workers: int = DISK_INDEX_WORKERS,
+                 full_every: int = DISK_INDEX_FULL_EVERY):
+        self.root = os.path.abspath(root)
+        self.path = path
+        self.workers = workers
+        self.full_every = full_every
+        self.entries: Dict[str, Dict] = {}
+        self._sizes: Optional[Dict[str, int]] = None
+        self.refreshes = 0
+        self.last_stats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def refresh(self) -> Dict[str, float]:
+        """Bring the index up to date, returning scan statistics"""
+        full = self.full_every > 0 and self.refreshes % self.full_every == 0
+        started = time.monotonic()
+        try:
+            root_dev = os.stat(self.root).st_dev
+        except OSError:
+            return {}
+
+        previous = {} if full else self.entries
+        entries: Dict[str, Dict] = {}
+        rescanned = 0
+        level = [self.root]
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            while level:
+                next_level = []
+                for path, entry, scanned in pool.map(lambda p: self._scan(p, root_dev, previous.get(p)), level):
+                    if entry is None:
+                        continue
+                    entries[path] = entry
+                    rescanned += scanned
+                    next_level.extend(os.path.join(path, name) for name in entry["dirs"])
+                level = next_level
+
+        sizes = self._totals(entries)
+        with self._lock:
+            self.entries = entries
+            self._sizes = sizes
+        self.refreshes += 1
+        self.last_stats = {
+            "directories": len(entries),
+            "rescanned": rescanned,
+            "seconds": time.monotonic() - started,
+            "full": int(full),
+        }
+        self._save()
+        return self.last_stats
+
+    def sizes(self) -> Dict[str, int]:
+        """Total bytes under every indexed directory, as of the last refresh"""
+        with self._lock:
+            if self._sizes is None:
+                self._sizes = self._totals(self.entries)
+            return self._sizes
+
+    def top(self, n: int = DISK_TOP_N) -> List[Tuple[str, int]]:
+        """The ``n`` largest directories, like ``du | sort -hr | head -n``"""
+        return sorted(self.sizes().items(), key=lambda item: (-item[1], item[0]))[:n]
+
+    @staticmethod
+    def _totals(entries: Dict[str, Dict]) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        # Deepest first, so children are summed before their parents
+        for path in sorted(entries, key=lambda p: p.count(os.sep), reverse=True):
+            entry = entries[path]
+            totals[path] = entry["bytes"] + sum(totals.get(os.path.join(path, name), 0) for name in entry["dirs"])
+        return totals
+
+    @staticmethod
+    def _scan(path: str, root_dev: int, cached: Optional[Dict]) -> Tuple[str, Optional[Dict], int]:
+        try:
+            st = os.stat(path, follow_symlinks=False)
+        except OSError:
+            return path, None, 0
+        if st.st_dev != root_dev:
+            return path, None, 0
+        if cached is not None and cached["mtime"] == st.st_mtime_ns:
+            return path, cached, 0
+
+        total = 0
+        dirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.append(entry.name)
+                        else:
+                            # Allocated size, as du reports it
+                            total += entry.stat(follow_symlinks=False).st_blocks * 512
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return path, {"mtime": st.st_mtime_ns, "bytes": total, "dirs": dirs}, 1
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("root") == self.root:
+            self.entries = data.get("entries", {})
+            # Trust a loaded index only until the next full rescan
+            self.refreshes = 1
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"root": self.root, "entries": self.entries}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠ Could not save directory index {self.path}: {e}")
+
+
+def index_path_for(mountpoint: str) -> str:
+    """Cache file of a mount point's directory index"""
+    if mountpoint == "/":
+        return DISK_INDEX_PATH
+    suffix = hashlib.sha1(mountpoint.encode()).hexdigest()[:8]
+    base, ext = os.path.splitext(DISK_INDEX_PATH)
+    return f"{base}-{suffix}{ext}"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_metrics(samples: Iterable[MountUsage], levels: Dict[Tuple[str, str], str],
+                   indexes: Dict[str, DirectoryIndex], sample_seconds: float, top_n: int = DISK_TOP_N) -> str:
+    """Prometheus text exposition of the latest samples"""
+    samples = list(samples)
+    lines = []
+
+    def family(name: str, kind: str, help_text: str, values: Iterable[Tuple[str, float]]):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{labels} {value}" for labels, value in values)
+
+    def fs_labels(s: MountUsage) -> str:
+        return (f'{{mountpoint="{escape_label(s.mountpoint)}",device="{escape_label(s.device)}",'
+                f'fstype="{escape_label(s.fstype)}"}}')
+
+    family("disk_agent_filesystem_size_bytes", "gauge", "Filesystem size in bytes",
+           ((fs_labels(s), s.size_bytes) for s in samples))
+    family("disk_agent_filesystem_avail_bytes", "gauge", "Bytes available to unprivileged users",
+           ((fs_labels(s), s.avail_bytes) for s in samples))
+    family("disk_agent_filesystem_used_ratio", "gauge", "Used fraction of the usable space (as df reports it)",
+           ((fs_labels(s), round(s.used_percent / 100, 6)) for s in samples))
+    family("disk_agent_filesystem_inodes", "gauge", "Total inodes",
+           ((fs_labels(s), s.inodes) for s in samples))
+    family("disk_agent_filesystem_inodes_free", "gauge", "Free inodes",
+           ((fs_labels(s), s.inodes_free) for s in samples))
+    family("disk_agent_alert_level", "gauge", "Alert level after hysteresis (0=ok, 1=warning, 2=critical)",
+           ((f'{{mountpoint="{escape_label(mount)}",kind="{kind}"}}', LEVELS.index(level))
+            for (mount, kind), level in sorted(levels.items())))
+    family("disk_agent_sample_duration_seconds", "gauge", "Time taken to sample every mount",
+           [("", round(sample_seconds, 6))])
+
+    top = [(mount, path, size) for mount, index in indexes.items() for path, size in index.top(top_n)]
+    family("disk_agent_directory_size_bytes", "gauge", f"Size of the {top_n} largest directories per mount",
+           ((f'{{mountpoint="{escape_label(mount)}",path="{escape_label(path)}"}}', size)
+            for mount, path, size in top))
+    family("disk_agent_index_refresh_seconds", "gauge", "Duration of the last directory index refresh",
+           ((f'{{mountpoint="{escape_label(mount)}"}}', round(index.last_stats.get("seconds", 0), 6))
+            for mount, index in indexes.items()))
+    family("disk_agent_index_rescanned_directories", "gauge", "Directories read again by the last index refresh",
+           ((f'{{mountpoint="{escape_label(mount)}"}}', index.last_stats.get("rescanned", 0))
+            for mount, index in indexes.items()))
+    return "\n".join(lines) + "\n"
+
+
+def host_events_url(events_url: Optional[str] = HOST_EVENTS_URL, webhook_url: str = GLPI_WEBHOOK_URL) -> str:
+    """Receiver endpoint for host events: HOST_EVENTS_URL, else derived from GLPI_WEBHOOK_URL"""
+    if events_url is not None:
+        return events_url
+    if not webhook_url:
+        return ""
+    return webhook_url.rstrip("/").removesuffix("/alert") + "/ingest/events"
+
+
+def build_event(usage: MountUsage, kind: str, status: str) -> Dict:
+    """Host event for the receiver's /ingest/events endpoint"""
+    if kind == "space":
+        check, threshold, value, what = "disk_space", DISK_THRESHOLD, usage.used_percent, "Disk usage"
+    else:
+        check, threshold, value, what = "disk_inodes", DISK_INODE_THRESHOLD, usage.inodes_percent, "Inode usage"
+    return {
+        "host": HOSTNAME,
+        "check": check,
+        "status": status,
+        "severity": "critical",
+        "mount_point": usage.mountpoint,
+        "value": round(value, 1),
+        "threshold": threshold,
+        "message": f"{what} on {HOSTNAME} ({usage.mountpoint}) is at {value:.0f}% (threshold: {threshold:.0f}%)",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+    }
+
+
+class DiskAgent:
+    """Samples the configured mounts, alerts on level changes and keeps the latest metrics"""
+
+    def __init__(self, mounts: Dict[str, Tuple[str, str]], webhook_url: Optional[str] = None,
+                 slack_url: str = SLACK_WEBHOOK_URL, index: bool = True, state_path: Optional[str] = None):
+        self.mounts = mounts
+        self.webhook_url = host_events_url() if webhook_url is None else webhook_url
+        self.slack_url = slack_url
+        self.hysteresis = Hysteresis(DISK_HYSTERESIS)
+        self.http = requests.Session()
+        self.samples: List[MountUsage] = []
+        self.metrics = ""
+        self.indexes: Dict[str, DirectoryIndex] = (
+            {mount: DirectoryIndex(mount, index_path_for(mount)) for mount in mounts} if index else {}
+        )
+        # Events not delivered yet, retried with the next sample
+        self._undelivered: Dict[Tuple[str, str], Dict] = {}
+        # Each --once run is a new process: without saved levels every run would be a first crossing
+        self.state_path = state_path
+        self._load_state()
+
+    def sample(self) -> List[MountUsage]:
+        """Sample every mount, send alerts for level changes and refresh the metrics text"""
+        started = time.monotonic()
+        samples = []
+        for mount, (device, fstype) in self.mounts.items():
+            try:
+                samples.append(sample_mount(mount, device, fstype))
+            except OSError as e:
+                print(f"✗ Could not sample {mount}: {e}")
+        elapsed = time.monotonic() - started
+
+        for usage in samples:
+            for kind, value, warning, critical in (
+                ("space", usage.used_percent, DISK_WARNING, DISK_THRESHOLD),
+                ("inodes", usage.inodes_percent, DISK_INODE_THRESHOLD - 10, DISK_INODE_THRESHOLD),
+            ):
+                key = (usage.mountpoint, kind)
+                previous, level = self.hysteresis.update(key, value, warning, critical)
+                if level != previous:
+                    print(f"{'✗' if level == 'critical' else '⚠' if level == 'warning' else '✓'} "
+                          f"{usage.mountpoint} {kind}: {value:.1f}% ({previous} -> {level})")
+                if (level == "critical") != (previous == "critical"):
+                    self._undelivered[key] = build_event(usage, kind, "firing" if level == "critical" else "ok")
+
+        if self._undelivered and self._notify(list(self._undelivered.values())):
+            self._undelivered.clear()
+
+        self._save_state()
+        self.samples = samples
+        self.metrics = render_metrics(samples, self.hysteresis.levels, self.indexes, elapsed)
+        if DISK_TEXTFILE:
+            self._write_textfile()
+        return samples
+
+    def refresh_indexes(self):
+        for mount, index in self.indexes.items():
+            stats = index.refresh()
+            if stats:
+                print(f"✓ Indexed {mount}: {stats['directories']} directories, "
+                      f"{stats['rescanned']} rescanned in {stats['seconds']:.1f}s")
+
+    def critical(self) -> bool:
+        return any(level == "critical" for level in self.hysteresis.levels.values())
+
+    def _load_state(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for mount, kind, level in data.get("levels", []):
+            if level in LEVELS:
+                self.hysteresis.levels[(mount, kind)] = level
+        for mount, kind, event in data.get("undelivered", []):
+            self._undelivered[(mount, kind)] = event
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        directory = os.path.dirname(self.state_path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.state_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({
+                    "levels": [[mount, kind, level] for (mount, kind), level in self.hysteresis.levels.items()],
+                    "undelivered": [[mount, kind, event] for (mount, kind), event in self._undelivered.items()],
+                }, f)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"⚠ Could not save agent state {self.state_path}: {e}")
+
+    def _notify(self, events: List[Dict]) -> bool:
+        """Send every pending event in one NDJSON request"""
+        delivered = True
+        if self.webhook_url:
+            body = "".join(json.dumps(event) + "\n" for event in events)
+            try:
+                response = self.http.post(self.webhook_url, data=body.encode(), timeout=10,
+                                          headers={"Content-Type": "application/x-ndjson"})
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                print(f"✗ Failed to send {len(events)} events to {self.webhook_url}: {e}")
+                delivered = False
+        if self.slack_url:
+            for event in events:
+                if event["status"] != "firing":
+                    continue
+                try:
+                    self.http.post(self.slack_url, json={"text": event["message"]}, timeout=10)
+                except requests.exceptions.RequestException as e:
+                    print(f"⚠ Failed to send alert to Slack: {e}")
+        return delivered
+
+    def _write_textfile(self):
+        tmp = f"{DISK_TEXTFILE}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.metrics)
+            os.replace(tmp, DISK_TEXTFILE)
+        except OSError as e:
+            print(f"⚠ Could not write {DISK_TEXTFILE}: {e}")
+
+
+def serve_metrics(agent: DiskAgent, port: int) -> ThreadingHTTPServer:
+    """Serve the agent's latest metrics on /metrics in a background thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = agent.metrics.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "K", "M", "G", "T"):
+        if size < 1024 or unit == "T":
+            return f"{size:.1f}{unit}" if unit != "B" else f"{size:.0f}B"
+        size /= 1024
+    return f"{size:.1f}T"
+
+
+def show_info(agent: DiskAgent, top_n: int):
+    """df-style table of the mounts and their largest directories"""
+    print(f"{'Mounted on':<24} {'Size':>8} {'Used':>8} {'Avail':>8} {'Use%':>5} {'IUse%':>6}")
+    for usage in agent.samples:
+        print(f"{usage.mountpoint:<24} {format_bytes(usage.size_bytes):>8} {format_bytes(usage.used_bytes):>8} "
+              f"{format_bytes(usage.avail_bytes):>8} {usage.used_percent:>4.0f}% {usage.inodes_percent:>5.0f}%")
+    agent.refresh_indexes()
+    for mount, index in agent.indexes.items():
+        print(f"\nTop {top_n} largest directories in {mount}:")
+        for path, size in index.top(top_n):
+            print(f"{format_bytes(size):>8}  {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="sample once and exit (1 if a mount is critical)")
+    parser.add_argument("--info", action="store_true", help="show usage and the largest directories, then exit")
+    parser.add_argument("--metrics", action="store_true", help="print the Prometheus metrics once and exit")
+    parser.add_argument("--mounts", default=DISK_MOUNTS, help='comma-separated mount points or "auto"')
+    parser.add_argument("--interval", type=float, default=DISK_INTERVAL, help="seconds between samples")
+    parser.add_argument("--port", type=int, default=DISK_METRICS_PORT, help="metrics port (0 disables)")
+    parser.add_argument("--top", type=int, default=DISK_TOP_N, help="directories in the top-N report")
+    args = parser.parse_args()
+
+    mounts = configured_mounts(args.mounts)
+    one_shot = args.once or args.info or args.metrics
+    # --info and --metrics only report; a one-shot run only needs the index for --info
+    reporting = args.info or args.metrics
+    agent = DiskAgent(mounts, webhook_url="" if reporting else None,
+                      slack_url="" if reporting else SLACK_WEBHOOK_URL, index=args.info or not one_shot,
+                      state_path=DISK_STATE_PATH if args.once else None)
+
+    if one_shot:
+        agent.sample()
+        if args.info:
+            show_info(agent, args.top)
+        elif args.metrics:
+            print(agent.metrics, end="")
+        else:
+            for usage in agent.samples:
+                print(f"{usage.mountpoint}: {usage.used_percent:.1f}% used, inodes {usage.inodes_percent:.1f}% "
+                      f"(threshold {DISK_THRESHOLD:.0f}%)")
+        sys.exit(1 if args.once and agent.critical() else 0)
+
+    print(f"🚀 Monitoring {', '.join(mounts)} every {args.interval:.0f}s "
+          f"(threshold {DISK_THRESHOLD:.0f}%, hysteresis {DISK_HYSTERESIS:.0f} points)")
+    agent.sample()
+    if args.port:
+        serve_metrics(agent, args.port)
+        print(f"📈 Metrics on :{args.port}/metrics")
+
+    stop = threading.Event()
+
+    def index_loop():
+        while not stop.is_set():
+            agent.refresh_indexes()
+            stop.wait(DISK_INDEX_INTERVAL)
+
+    if agent.indexes:
+        threading.Thread(target=index_loop, daemon=True).start()
+
+    try:
+        while not stop.wait(args.interval):
+            agent.sample()
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
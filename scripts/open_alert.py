@@ -7,9 +7,12 @@ Creates tickets in GLPI using REST API when alerts are triggered
 import os
 import sys
 import json
+import time
+import random
+import threading
 import requests
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 
 # GLPI Configuration
 GLPI_URL = os.getenv("GLPI_URL", "http://localhost:8080")
@@ -18,16 +21,105 @@ GLPI_USER_TOKEN = os.getenv("GLPI_USER_TOKEN", "admin_token")
 GLPI_USERNAME = os.getenv("GLPI_USERNAME", "glpi")
 GLPI_PASSWORD = os.getenv("GLPI_PASSWORD", "glpi")
 
+# Retry configuration (jittered exponential backoff)
+GLPI_RETRY_ATTEMPTS = int(os.getenv("GLPI_RETRY_ATTEMPTS", "3"))
+GLPI_RETRY_BASE_DELAY = float(os.getenv("GLPI_RETRY_BASE_DELAY", "0.5"))
+GLPI_RETRY_MAX_DELAY = float(os.getenv("GLPI_RETRY_MAX_DELAY", "10"))
+RETRYABLE_STATUS = {429, 502, 503, 504}
+# A 502/504 may come back after GLPI applied the request: only these are safe for POST
+NOT_APPLIED_STATUS = {429, 503}
+
+# Ticket templates shared with the webhook receiver
+RECEIVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "webhook_receiver")
+TICKET_TEMPLATES_DIR = os.getenv("TICKET_TEMPLATES_DIR", os.path.join(RECEIVER_DIR, "ticket_templates"))
+_renderer = None
+
+# Ticket routing: fixed GLPI IDs (the webhook receiver routes by alert labels, see its routing.json)
+GLPI_REQUESTER_ID = os.getenv("GLPI_REQUESTER_ID", "2")
+GLPI_ENTITY_ID = os.getenv("GLPI_ENTITY_ID", "")
+GLPI_CATEGORY_ID = os.getenv("GLPI_CATEGORY_ID", "")
+GLPI_GROUP_ID = os.getenv("GLPI_GROUP_ID", "")
+
+# Streaming mode (--jsonl / --file)
+STREAM_CONCURRENCY = int(os.getenv("GLPI_STREAM_CONCURRENCY", "8"))
+
+def routing_fields() -> Dict[str, int]:
+    """Entity, ITIL category, assigned group and requester set through GLPI_*_ID"""
+    configured = {
+        "entities_id": GLPI_ENTITY_ID,
+        "itilcategories_id": GLPI_CATEGORY_ID,
+        "_groups_id_assign": GLPI_GROUP_ID,
+        "_users_id_requester": GLPI_REQUESTER_ID,
+    }
+    return {field: int(value) for field, value in configured.items() if value}
+
 class GLPIClient:
-    """GLPI API Client for ticket management"""
+    """GLPI API Client for ticket management
+
+    Requests go through one keep-alive ``requests.Session`` whose connection
+    pool holds ``pool_size`` connections, so the client can be shared by
+    several threads. A request answered 401 (expired or killed session)
+    logs in again once and is retried, as the webhook receiver's client does.
+    """
     
-    def __init__(self):
+    def __init__(self, pool_size: int = 1, verbose: bool = True):
         self.base_url = GLPI_URL.rstrip('/')
         self.session_token = None
+        self.verbose = verbose
         self.headers = {
             "Content-Type": "application/json",
             "App-Token": GLPI_APP_TOKEN,
         }
+        self.session_lock = threading.Lock()
+        self.http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+    
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying transient errors with jittered exponential backoff
+
+        Connection failures and 429/503 are retried for every method; read
+        timeouts and 502/504 only for GET/PUT, since such a POST may have been applied.
+        """
+        retryable = (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout)
+        retryable_status = NOT_APPLIED_STATUS
+        if method in ("GET", "PUT"):
+            retryable += (requests.exceptions.Timeout,)
+            retryable_status = RETRYABLE_STATUS
+        
+        for attempt in range(1, GLPI_RETRY_ATTEMPTS + 1):
+            last_attempt = attempt == GLPI_RETRY_ATTEMPTS
+            delay = random.uniform(0, min(GLPI_RETRY_MAX_DELAY, GLPI_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+            try:
+                response = self.http.request(method, url, timeout=10, **kwargs)
+            except retryable as e:
+                if last_attempt:
+                    raise
+                print(f"⚠ GLPI request failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in retryable_status or last_attempt:
+                    return response
+                print(f"⚠ GLPI returned {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+    
+    def _session_request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request with the session token, logging in again once on 401"""
+        for attempt in range(2):
+            token = self.session_token
+            response = self._request(method, url, headers={**self.headers, "Session-Token": token}, **kwargs)
+            if response.status_code != 401 or attempt:
+                return response
+            
+            # Threads hitting the same expired token share a single new login
+            with self.session_lock:
+                if self.session_token == token:
+                    print("⚠ GLPI session expired or invalid, re-authenticating")
+                    self.session_token = None
+                    self.headers.pop("Session-Token", None)
+                    if not self.init_session():
+                        return response
+        return response
     
     def init_session(self) -> bool:
         """Initialize GLPI session"""
@@ -41,7 +133,7 @@ class GLPIClient:
             auth_headers = {**self.headers, "Authorization": f"Basic {GLPI_USERNAME}:{GLPI_PASSWORD}"}
         
         try:
-            response = requests.get(url, headers=auth_headers, timeout=10)
+            response = self._request("GET", url, headers=auth_headers)
             response.raise_for_status()
             
             session_data = response.json()
@@ -70,14 +162,6 @@ class GLPIClient:
         
         url = f"{self.base_url}/apirest.php/Ticket"
         
-        # Map urgency levels: 1=Very Low, 2=Low, 3=Medium, 4=High, 5=Very High
-        urgency_map = {
-            "low": 2,
-            "medium": 3,
-            "high": 4,
-            "critical": 5
-        }
-        
         payload = {
             "input": {
                 "name": title,
@@ -87,22 +171,22 @@ class GLPIClient:
                 "urgency": urgency,
                 "priority": priority,
                 "source": 6,         # 6 = Other (automated)
-                "category": 0,       # 0 = None (can be customized)
-                "_users_id_requester": 2,  # Assuming user ID 2 exists (usually admin)
+                **routing_fields(),
             }
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload, timeout=10)
+            response = self._session_request("POST", url, json=payload)
             response.raise_for_status()
             
             result = response.json()
             ticket_id = result.get("id")
             
             if ticket_id:
-                print(f"✓ GLPI ticket created successfully: ID #{ticket_id}")
-                print(f"  Title: {title}")
-                print(f"  URL: {self.base_url}/front/ticket.form.php?id={ticket_id}")
+                if self.verbose:
+                    print(f"✓ GLPI ticket created successfully: ID #{ticket_id}")
+                    print(f"  Title: {title}")
+                    print(f"  URL: {self.base_url}/front/ticket.form.php?id={ticket_id}")
                 return result
             else:
                 print("✗ Failed to create ticket - no ID in response")
@@ -116,6 +200,63 @@ class GLPIClient:
             print(f"✗ Invalid JSON response from GLPI: {e}")
             return None
     
+    def create_tickets(self, batch: List[Dict[str, Any]]) -> List[Optional[Dict[Any, Any]]]:
+        """Create several tickets in one request using GLPI's array input
+
+        ``batch`` holds Ticket input dicts; results keep the same order and
+        tickets GLPI rejected are returned as None.
+        """
+        if not self.session_token:
+            print("✗ No active GLPI session. Cannot create tickets.")
+            return [None] * len(batch)
+        
+        if not batch:
+            return []
+        
+        url = f"{self.base_url}/apirest.php/Ticket"
+        
+        try:
+            response = self._session_request("POST", url, json={"input": batch})
+            response.raise_for_status()
+            result = response.json()
+            
+        except requests.exceptions.RequestException as e:
+            print(f"✗ Error creating GLPI tickets: {e}")
+            return [None] * len(batch)
+        except json.JSONDecodeError as e:
+            print(f"✗ Invalid JSON response from GLPI: {e}")
+            return [None] * len(batch)
+        
+        items = result if isinstance(result, list) else [result]
+        results = []
+        for ticket, item in zip(batch, items + [None] * (len(batch) - len(items))):
+            if isinstance(item, dict) and item.get("id"):
+                print(f"✓ GLPI ticket created successfully: ID #{item['id']}")
+                print(f"  Title: {ticket.get('name')}")
+                results.append(item)
+            else:
+                print(f"✗ Failed to create ticket '{ticket.get('name')}': {item}")
+                results.append(None)
+        return results
+    
+    def close_ticket(self, ticket_id: int, status: int = 6) -> bool:
+        """Move a ticket to a final status (5 = Solved, 6 = Closed)"""
+        if not self.session_token:
+            print("✗ No active GLPI session. Cannot close ticket.")
+            return False
+        
+        url = f"{self.base_url}/apirest.php/Ticket/{ticket_id}"
+        
+        try:
+            response = self._session_request("PUT", url, json={"input": {"id": ticket_id, "status": status}})
+            response.raise_for_status()
+            print(f"✓ GLPI ticket #{ticket_id} closed")
+            return True
+            
+        except requests.exceptions.RequestException as e:
+            print(f"✗ Error closing GLPI ticket #{ticket_id}: {e}")
+            return False
+    
     def close_session(self):
         """Close GLPI session"""
         if not self.session_token:
@@ -123,47 +264,44 @@ class GLPIClient:
         
         url = f"{self.base_url}/apirest.php/killSession"
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code == 200:
+            response = self.http.get(url, headers=self.headers, timeout=10)
+            if response.status_code == 200 and self.verbose:
                 print("✓ GLPI session closed")
         except requests.exceptions.RequestException:
             pass  # Ignore errors when closing session
+        finally:
+            self.session_token = None
+            self.http.close()
 
-def create_alert_ticket(alert_type: str, severity: str, hostname: str, message: str, **kwargs) -> bool:
-    """Create an alert ticket with structured information"""
-    
-    # Generate detailed ticket content
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    title = f"[{severity.upper()}] {alert_type.replace('_', ' ').title()} Alert - {hostname}"
-    
-    description = f"""
-ALERT DETAILS:
-==============
-Type: {alert_type}
-Severity: {severity.upper()}
-Hostname: {hostname}
-Timestamp: {timestamp}
-Message: {message}
+def get_renderer():
+    """Ticket renderer of the webhook receiver, loaded on first use"""
+    global _renderer
+    if _renderer is None:
+        if RECEIVER_DIR not in sys.path:
+            sys.path.insert(0, RECEIVER_DIR)
+        from rendering import TicketRenderer
+        _renderer = TicketRenderer(TICKET_TEMPLATES_DIR, reload_interval=-1)
+    return _renderer
 
-ADDITIONAL INFORMATION:
-=====================
-"""
+def build_alert_ticket(alert_type: str, severity: str, hostname: str, message: str, **kwargs) -> Tuple[str, str, int]:
+    """Title, description and urgency of an alert ticket"""
     
-    # Add any additional information from kwargs
-    for key, value in kwargs.items():
-        description += f"{key.replace('_', ' ').title()}: {value}\n"
-    
-    description += f"""
-RECOMMENDED ACTIONS:
-===================
-1. Verify the alert condition on the affected system
-2. Check system resources and logs
-3. Take corrective action if needed
-4. Update this ticket with resolution details
-
-This ticket was automatically created by the Axity Infrastructure Monitoring System.
-"""
+    additional_info = "".join(f"{key.replace('_', ' ').title()}: {value}\n" for key, value in kwargs.items())
+    
+    # Same renderer and templates as the webhook receiver ("open_alert" template)
+    title, description = get_renderer().render(
+        {"labels": {"alertname": alert_type, "severity": severity, "service": hostname, **kwargs},
+         "annotations": {"summary": message}},
+        default="open_alert",
+        extra={
+            "alert_type": alert_type,
+            "alert_title": alert_type.replace('_', ' ').title(),
+            "hostname": hostname,
+            "message": message,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "additional_info": additional_info,
+        },
+    )
     
     # Map severity to urgency
     severity_urgency_map = {
@@ -175,6 +313,24 @@ This ticket was automatically created by the Axity Infrastructure Monitoring Sys
     
     urgency = severity_urgency_map.get(severity.lower(), 3)
     
+    return title, description, urgency
+
+def alert_error(alert: Any) -> Optional[str]:
+    """Why a streamed alert cannot become a ticket, or None when it is valid"""
+    if not isinstance(alert, dict):
+        return "alert must be a JSON object"
+    for field in ("alert_type", "severity", "hostname", "message"):
+        if not isinstance(alert.get(field), str):
+            return f"'{field}' is required and must be a string"
+    for field, value in alert.items():
+        if not isinstance(value, (str, int, float, bool)):
+            return f"'{field}' must be a string or a number"
+    return None
+
+def create_alert_ticket(alert_type: str, severity: str, hostname: str, message: str, **kwargs) -> bool:
+    """Create an alert ticket with structured information"""
+    title, description, urgency = build_alert_ticket(alert_type, severity, hostname, message, **kwargs)
+    
     # Create GLPI client and ticket
     client = GLPIClient()
     
@@ -188,6 +344,127 @@ This ticket was automatically created by the Axity Infrastructure Monitoring Sys
     finally:
         client.close_session()
 
+def stream_alerts(lines: Iterable[str], concurrency: int = STREAM_CONCURRENCY) -> bool:
+    """Create one ticket per JSON line through a single GLPI session
+
+    Lines are read lazily and at most ``concurrency`` tickets are in flight,
+    so arbitrarily large inputs run in constant memory. Each line gets a
+    result line as soon as its ticket is done, followed by a summary.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    
+    concurrency = max(1, concurrency)
+    client = GLPIClient(pool_size=concurrency, verbose=False)
+    if not client.init_session():
+        return False
+    
+    def create(line_no: int, line: str) -> Tuple[int, Optional[int], str]:
+        try:
+            alert = json.loads(line)
+        except json.JSONDecodeError as e:
+            return line_no, None, f"invalid alert: {e}"
+        error = alert_error(alert)
+        if error:
+            return line_no, None, f"invalid alert: {error}"
+        title, description, urgency = build_alert_ticket(**alert)
+        result = client.create_ticket(title, description, urgency=urgency, priority=urgency)
+        return line_no, result["id"] if result else None, title
+    
+    created = failed = 0
+    started = time.monotonic()
+    
+    def report(done):
+        nonlocal created, failed
+        for future in done:
+            line_no, ticket_id, detail = future.result()
+            if ticket_id:
+                created += 1
+                print(f"✓ line {line_no}: ticket #{ticket_id} {detail}", flush=True)
+            else:
+                failed += 1
+                print(f"✗ line {line_no}: {detail}", flush=True)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending = set()
+            for line_no, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                if len(pending) >= concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    report(done)
+                pending.add(pool.submit(create, line_no, line))
+            report(wait(pending).done)
+    finally:
+        client.close_session()
+    
+    elapsed = time.monotonic() - started
+    print(f"✓ {created} tickets created, {failed} failed in {elapsed:.1f}s "
+          f"({created / elapsed if elapsed > 0 else 0:.1f} tickets/s, concurrency {concurrency})")
+    return failed == 0
+
+def replay_record(client: GLPIClient, record: Dict[str, Any]) -> bool:
+    """Apply one dead-letter record written by the webhook receiver"""
+    action = record.get("action")
+    
+    if action == "create":
+        return client.create_tickets([record["input"]])[0] is not None
+    if action == "close":
+        return client.close_ticket(record["ticket_id"])
+    
+    print(f"✗ Unknown dead-letter action: {action}")
+    return False
+
+def replay_spool(path: str, rate: float = 5.0) -> bool:
+    """Replay a dead-letter spool through one GLPI session at ``rate`` actions per second
+
+    The spool is streamed line by line; records that fail again are appended
+    to ``<path>.retry`` so they can be replayed later.
+    """
+    client = GLPIClient()
+    if not client.init_session():
+        return False
+    
+    interval = 1.0 / rate if rate > 0 else 0.0
+    next_at = time.monotonic()
+    replayed = failed = 0
+    retry_file = None
+    
+    try:
+        with open(path, encoding="utf-8") as spool:
+            for line in spool:
+                if not line.strip():
+                    continue
+                
+                # Pace the replay so GLPI is not flooded
+                wait = next_at - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                next_at = max(next_at, time.monotonic()) + interval
+                
+                try:
+                    success = replay_record(client, json.loads(line))
+                except (json.JSONDecodeError, KeyError) as e:
+                    print(f"✗ Invalid dead-letter record: {e}")
+                    success = False
+                
+                if success:
+                    replayed += 1
+                else:
+                    failed += 1
+                    if retry_file is None:
+                        retry_file = open(f"{path}.retry", "a", encoding="utf-8")
+                    retry_file.write(line)
+    finally:
+        if retry_file is not None:
+            retry_file.close()
+        client.close_session()
+    
+    print(f"✓ Replayed {replayed} records, {failed} failed")
+    if failed:
+        print(f"  Failed records saved to {path}.retry")
+    return failed == 0
+
 def main():
     """Main function - handle command line arguments or JSON input"""
     
@@ -197,6 +474,12 @@ Usage:
   python3 open_alert.py <title> <description>  # Simple ticket creation
   python3 open_alert.py --json                 # Read JSON from stdin
   python3 open_alert.py --test                 # Create test ticket
+  python3 open_alert.py --replay <spool> [--rate N]
+                                               # Replay a dead-letter spool (N actions/s, default 5)
+  python3 open_alert.py --jsonl [--concurrency N]
+                                               # One JSON alert per line on stdin, one session
+  python3 open_alert.py --file <alerts.jsonl> [--concurrency N]
+                                               # Same, reading the alerts from a file
   
 Environment Variables:
   GLPI_URL        - GLPI base URL (default: http://localhost:8080)
@@ -204,6 +487,12 @@ Environment Variables:
   GLPI_USER_TOKEN - GLPI user token (preferred)
   GLPI_USERNAME   - GLPI username (fallback)
   GLPI_PASSWORD   - GLPI password (fallback)
+  GLPI_RETRY_ATTEMPTS, GLPI_RETRY_BASE_DELAY, GLPI_RETRY_MAX_DELAY
+                  - Retry policy for transient GLPI errors
+  GLPI_STREAM_CONCURRENCY
+                  - Tickets in flight in --jsonl/--file mode (default: 8)
+  TICKET_TEMPLATES_DIR
+                  - Ticket templates (default: app/webhook_receiver/ticket_templates)
 """)
         sys.exit(1)
     
@@ -231,6 +520,26 @@ Environment Variables:
             print(f"✗ Error processing alert: {e}")
             sys.exit(1)
     
+    elif sys.argv[1] == "--replay":
+        # Replay tickets the webhook receiver could not deliver
+        if len(sys.argv) < 3:
+            print("✗ Missing dead-letter spool path")
+            sys.exit(1)
+        rate = float(sys.argv[4]) if len(sys.argv) >= 5 and sys.argv[3] == "--rate" else 5.0
+        sys.exit(0 if replay_spool(sys.argv[2], rate) else 1)
+    
+    elif sys.argv[1] in ("--jsonl", "--file"):
+        # Stream many alerts through one session
+        args = sys.argv[1:]
+        concurrency = int(args[args.index("--concurrency") + 1]) if "--concurrency" in args else STREAM_CONCURRENCY
+        if sys.argv[1] == "--jsonl":
+            sys.exit(0 if stream_alerts(sys.stdin, concurrency) else 1)
+        if len(sys.argv) < 3:
+            print("✗ Missing alerts file path")
+            sys.exit(1)
+        with open(sys.argv[2], encoding="utf-8") as alerts:
+            sys.exit(0 if stream_alerts(alerts, concurrency) else 1)
+    
     elif len(sys.argv) >= 3:
         # Simple ticket creation with title and description
         title = sys.argv[1]
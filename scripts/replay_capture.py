@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Replay captured webhook traffic against an Axity Webhook Receiver
+Re-sends the requests recorded with CAPTURE_DIR, keeping their original
+inter-arrival gaps (optionally compressed N times), and reports how the
+receiver's throughput and latency held up
+
+Usage:
+  python3 scripts/replay_capture.py CAPTURE [CAPTURE...] [--url http://localhost:5000]
+                                    [--speed 1] [--limit N] [--max-in-flight 200]
+                                    [--max-p99 S] [--max-error-rate R]
+
+CAPTURE is a capture-*.ndjson.gz file or a directory of them; the files of
+several receiver workers are merged by arrival time. Requests are sent
+open-loop: a slow receiver does not slow the replay down, it shows up as
+latency, errors and schedule lag instead.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import httpx
+
+RECEIVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "webhook_receiver")
+sys.path.insert(0, RECEIVER_DIR)
+
+from capture import read_capture  # noqa: E402
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def replay(records, url: str, speed: float = 1.0, max_in_flight: int = 200, timeout: float = 30.0,
+                 limit: int = 0) -> Dict[str, Any]:
+    """Send captured records on their original schedule divided by ``speed``"""
+    url = url.rstrip("/")
+    statuses: Counter = Counter()
+    latencies: List[float] = []
+    lags: List[float] = []
+    completed: Counter = Counter()
+    slots = asyncio.Semaphore(max_in_flight)
+    pending = set()
+    first_t = last_t = None
+    start = time.monotonic()
+    sent = 0
+
+    async def send(client: httpx.AsyncClient, record: Dict[str, Any]):
+        headers = {"Content-Type": record.get("content_type", "application/json")}
+        started = time.monotonic()
+        try:
+            response = await client.post(url + record["path"], content=record["body"], headers=headers)
+            statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+        finally:
+            slots.release()
+        finished = time.monotonic()
+        latencies.append(finished - started)
+        completed[int(finished - start)] += 1
+
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        for record in records:
+            if limit and sent >= limit:
+                break
+            if first_t is None:
+                first_t = record["t"]
+                start = time.monotonic()
+            due = start + max(0.0, record["t"] - first_t) / speed
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            await slots.acquire()
+            lags.append(max(0.0, time.monotonic() - due))
+            task = asyncio.create_task(send(client, record))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            last_t = record["t"]
+            sent += 1
+        if pending:
+            await asyncio.gather(*pending)
+
+    return {
+        "sent": sent,
+        "captured_span": (last_t - first_t) if sent else 0.0,
+        "elapsed": time.monotonic() - start,
+        "statuses": statuses,
+        "latencies": latencies,
+        "lags": lags,
+        "peak_per_second": max(completed.values(), default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="capture files or directories")
+    parser.add_argument("--url", default=os.getenv("WEBHOOK_URL", "http://localhost:5000"), help="receiver base URL")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay N times faster than captured")
+    parser.add_argument("--limit", type=int, default=0, help="only replay the first N requests")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="cap on concurrent requests")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--max-p99", type=float, help="fail if p99 response latency exceeds this (seconds)")
+    parser.add_argument("--max-error-rate", type=float, help="fail if the share of non-2xx responses exceeds this")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    result = asyncio.run(replay(read_capture(args.captures), args.url, speed=args.speed,
+                                max_in_flight=args.max_in_flight, timeout=args.timeout, limit=args.limit))
+    sent = result["sent"]
+    if not sent:
+        sys.exit("No requests found in the capture")
+
+    latencies, lags = result["latencies"], result["lags"]
+    ok = sum(n for status, n in result["statuses"].items() if isinstance(status, int) and 200 <= status < 300)
+    error_rate = 1 - ok / sent
+    intended = result["captured_span"] / args.speed
+    p50, p95, p99 = (percentile(latencies, pct) for pct in (50, 95, 99))
+
+    print(f"Replayed:           {sent} requests at {args.speed:g}x "
+          f"({result['captured_span']:.1f}s captured, {intended:.1f}s intended, {result['elapsed']:.1f}s taken)")
+    print(f"Throughput:         {sent / result['elapsed']:.1f} req/s average, "
+          f"{result['peak_per_second']} req/s peak second")
+    print(f"Responses:          {dict(result['statuses'])} ({error_rate:.1%} errors)")
+    print(f"Latency:            p50 {p50 * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms, "
+          f"p99 {p99 * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+    print(f"Schedule lag:       p99 {percentile(lags, 99) * 1000:.1f} ms, max {max(lags) * 1000:.1f} ms")
+
+    failures = []
+    if args.max_p99 is not None and not p99 <= args.max_p99:
+        failures.append(f"p99 latency {p99:.3f}s > {args.max_p99}s")
+    if args.max_error_rate is not None and error_rate > args.max_error_rate:
+        failures.append(f"error rate {error_rate:.1%} > {args.max_error_rate:.1%}")
+    if failures:
+        sys.exit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
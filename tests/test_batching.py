@@ -0,0 +1,116 @@
+import asyncio
+
+from batching import TicketBatcher
+
+
+class FakeClient:
+    """Stands in for AsyncGLPIClient, rejecting tickets named 'bad' inside batches"""
+
+    def __init__(self):
+        self.posts = []
+
+    async def create_tickets(self, batch):
+        self.posts.append([ticket["name"] for ticket in batch])
+        if len(batch) > 1:
+            return [None if t["name"] == "bad" else {"id": i + 1} for i, t in enumerate(batch)]
+        return [{"id": 99}]
+
+
+def test_concurrent_tickets_share_one_post():
+    """
+    Tests that tickets submitted together are sent in max_items sized batches.
+    """
+    client = FakeClient()
+
+    async def scenario():
+        batcher = TicketBatcher(client, max_items=3, window=10)
+        submits = [batcher.submit({"name": f"t{i}"}) for i in range(3)]
+        return await asyncio.gather(*submits)
+
+    assert asyncio.run(scenario()) == [{"id": 1}, {"id": 2}, {"id": 3}]
+    assert client.posts == [["t0", "t1", "t2"]]
+
+
+def test_window_flushes_partial_batch_and_rejected_items_fall_back():
+    """
+    Tests the time window flush and per-item retry of rejected tickets.
+    """
+    client = FakeClient()
+
+    async def scenario():
+        batcher = TicketBatcher(client, max_items=10, window=0.01)
+        return await asyncio.gather(batcher.submit({"name": "ok"}), batcher.submit({"name": "bad"}))
+
+    assert asyncio.run(scenario()) == [{"id": 1}, {"id": 99}]
+    assert client.posts == [["ok", "bad"], ["bad"]]
+
+
+def test_failed_fallback_does_not_fail_tickets_already_created():
+    """
+    Tests that an error retrying one rejected ticket only fails that ticket, not those the batch created.
+    """
+    class FailingFallback(FakeClient):
+        async def create_tickets(self, batch):
+            if len(batch) == 1:
+                raise RuntimeError("GLPI circuit open")
+            return await super().create_tickets(batch)
+
+    async def scenario():
+        batcher = TicketBatcher(FailingFallback(), max_items=2, window=10)
+        return await asyncio.gather(batcher.submit({"name": "ok"}), batcher.submit({"name": "bad"}),
+                                    return_exceptions=True)
+
+    created, failed = asyncio.run(scenario())
+    assert created == {"id": 1}
+    assert isinstance(failed, RuntimeError)
+
+
+def test_batch_is_sent_once_every_possible_caller_is_waiting():
+    """
+    Tests that the batch goes out without waiting for the window when no other caller can join it.
+    """
+    client = FakeClient()
+
+    async def scenario():
+        batcher = TicketBatcher(client, max_items=10, window=10, waiters=lambda: 2)
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.submit({"name": "t0"}), batcher.submit({"name": "t1"})), timeout=1)
+
+    assert asyncio.run(scenario()) == [{"id": 1}, {"id": 2}]
+    assert client.posts == [["t0", "t1"]]
+
+
+def test_worker_pool_busy_count_drives_the_early_flush(tmp_path):
+    """
+    Tests that a real worker pool's busy count goes back to zero, so later batches still skip the window.
+    """
+    from ticket_queue import TicketQueue, TicketWorkerPool
+
+    client = FakeClient()
+    queue = TicketQueue(str(tmp_path / "queue.db"))
+    done = []
+
+    async def scenario():
+        pool = None
+        batcher = TicketBatcher(client, max_items=10, window=10, waiters=lambda: pool.busy)
+
+        async def handler(payload):
+            done.append(await batcher.submit(payload))
+            return True
+
+        pool = TicketWorkerPool(queue, handler, workers=2, poll_interval=0.01, on_idle=lambda: batcher.wake())
+        pool.start()
+        for round_no in range(3):
+            queue.put_many([{"name": f"r{round_no}a"}, {"name": f"r{round_no}b"}])
+            pool.notify()
+            await asyncio.wait_for(_until(lambda: len(done) == 2 * (round_no + 1)), timeout=2)
+            await asyncio.wait_for(_until(lambda: pool.busy == 0), timeout=2)
+        await pool.stop()
+
+    asyncio.run(scenario())
+    assert sorted(name for post in client.posts for name in post) == [f"r{n}{x}" for n in range(3) for x in "ab"]
+
+
+async def _until(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
@@ -0,0 +1,39 @@
+import os
+
+import capture
+
+
+def test_capture_rotates_and_keeps_the_newest_files(tmp_path):
+    """
+    Tests that capture files rotate at max_bytes, old ones are pruned and replay order is by arrival time.
+    """
+    recorder = capture.TrafficCapture(str(tmp_path), max_bytes=200, max_files=3)
+    recorder.start()
+    for i in range(20):
+        recorder.record("/alert", b'{"alerts": [%d]}' % i, received_at=1000.0 + i)
+    recorder.stop()
+
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) == 3 and all(name.endswith(".ndjson.gz") for name in files)
+    times = [record["t"] for record in capture.read_capture([str(tmp_path)])]
+    assert times == sorted(times) and times[-1] == 1019.0 and len(times) < 20
+
+
+def test_truncated_capture_file_is_read_up_to_the_damage(tmp_path):
+    """
+    Tests that a capture file cut short by a crash still yields the records before the cut.
+    """
+    recorder = capture.TrafficCapture(str(tmp_path), flush_interval=0.01)
+    recorder.start()
+    for i in range(50):
+        recorder.record("/alert", ("é%d" % i).encode() + b"\xff", received_at=float(i))
+    recorder.stop()
+
+    path = os.path.join(tmp_path, os.listdir(tmp_path)[0])
+    data = open(path, "rb").read()
+    with open(path, "wb") as f:
+        f.write(data[:-20])
+
+    records = list(capture.read_capture_file(path))
+    assert 0 < len(records) < 50
+    assert records[0]["body"] == "é0".encode() + b"\xff"
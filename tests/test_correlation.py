@@ -0,0 +1,132 @@
+import asyncio
+
+from correlation import StormCorrelator, StormDetector
+
+
+class FakeClient:
+    """Stands in for AsyncGLPIClient, recording every GLPI write"""
+
+    def __init__(self):
+        self.tickets = []
+        self.followups = []
+        self.closed = []
+
+    async def create_ticket(self, title, description, urgency=3, priority=3):
+        self.tickets.append(title)
+        return {"id": 100 + len(self.tickets)}
+
+    async def add_followup(self, ticket_id, content):
+        self.followups.append((ticket_id, content))
+        return True
+
+    async def close_ticket(self, ticket_id, status=6):
+        self.closed.append(ticket_id)
+        return True
+
+
+def alert(name):
+    return {"status": "firing", "labels": {"alertname": name, "severity": "critical", "service": "db"}}
+
+
+def test_storm_needs_volume_across_groups_within_window(tmp_path):
+    """
+    Tests the threshold, the min_groups condition, the sliding window and sharing between processes.
+    """
+    path = str(tmp_path / "queue.db")
+    detector = StormDetector(threshold=3, path=path, window=0.05, min_groups=2)
+    detector.observe(10, "group-a")
+    assert not detector.active()
+
+    # Another process observing the same database
+    StormDetector(threshold=3, path=path).observe(1, "group-b")
+    assert detector.active()
+    assert detector.stats() == (11, 2)
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert not detector.active()
+
+
+def test_storm_alerts_share_one_parent_closed_when_all_resolve(tmp_path):
+    """
+    Tests that a storm opens one parent ticket, batches followups and closes it at the end.
+    """
+    client = FakeClient()
+    detector = StormDetector(threshold=2, path=str(tmp_path / "queue.db"), window=60, min_groups=2)
+
+    async def scenario():
+        storms = StormCorrelator(client, detector, str(tmp_path / "queue.db"), followup_interval=60)
+        detector.observe(2, "group-a")
+        detector.observe(2, "group-b")
+        assert await storms.active(check_interval=0)
+
+        parents = await asyncio.gather(*[storms.attach(alert(f"Alert{i}")) for i in range(4)])
+        await storms.flush()
+
+        assert await storms.resolve(parents[0], {**alert("Alert0"), "status": "resolved"}) is True
+        assert await storms.resolve(999, alert("Unrelated")) is None
+
+        detector.window = 0
+        assert not await storms.active(check_interval=0)
+        for i in range(1, 4):
+            await storms.resolve(parents[0], {**alert(f"Alert{i}"), "status": "resolved"})
+        storms.close()
+        return parents
+
+    parents = asyncio.run(scenario())
+
+    assert set(parents) == {101}
+    assert client.tickets == ["[STORM] 4 alerts across 2 alert groups"]
+    assert client.followups[0][1].startswith("4 correlated alert updates")
+    assert client.closed == [101]
+
+
+def test_parent_closes_when_storm_ends_without_new_alerts(tmp_path):
+    """
+    Tests that a parent whose members all resolved during the storm is closed once the window passes.
+    """
+    client = FakeClient()
+    detector = StormDetector(threshold=2, path=str(tmp_path / "queue.db"), window=0.1, min_groups=2)
+
+    async def scenario():
+        storms = StormCorrelator(client, detector, str(tmp_path / "queue.db"), followup_interval=60)
+        detector.observe(2, "group-a")
+        detector.observe(2, "group-b")
+        assert await storms.active(check_interval=0)
+
+        parent = await storms.attach(alert("Alert0"))
+        assert await storms.resolve(parent, {**alert("Alert0"), "status": "resolved"}) is True
+        assert client.closed == []
+
+        await asyncio.sleep(0.2)
+        storms.close()
+        return parent
+
+    parent = asyncio.run(scenario())
+    assert client.closed == [parent]
+
+
+def test_buffered_followups_survive_a_restart(tmp_path):
+    """
+    Tests that followups not yet posted when the receiver stops are posted by the next run.
+    """
+    client = FakeClient()
+    path = str(tmp_path / "queue.db")
+
+    async def first_run():
+        storms = StormCorrelator(client, StormDetector(threshold=0, path=path), path, followup_interval=60)
+        storms._open(101)
+        storms._add_members(101, 2)
+        await storms.resolve(101, {**alert("Alert0"), "status": "resolved"})
+        storms.close()
+
+    async def next_run():
+        storms = StormCorrelator(client, StormDetector(threshold=0, path=path), path, followup_interval=0.01)
+        storms.start()
+        await asyncio.sleep(0.1)
+        storms.close()
+
+    asyncio.run(first_run())
+    assert client.followups == []
+    asyncio.run(next_run())
+    assert [ticket_id for ticket_id, _ in client.followups] == [101]
+    assert "RESOLVED [CRITICAL] Alert0" in client.followups[0][1]
@@ -0,0 +1,122 @@
+import json
+import os
+
+from scripts import disk_agent
+
+
+def test_hysteresis_alerts_once_per_crossing():
+    """
+    Tests that a disk hovering around the threshold stays critical until it drops below the margin.
+    """
+    levels = disk_agent.Hysteresis(margin=5)
+    key = ("/data", "space")
+    values = [80, 86, 84, 85, 81, 79, 60]
+    transitions = [levels.update(key, value, warning=75, critical=85) for value in values]
+
+    assert [level for _, level in transitions] == [
+        "warning", "critical", "critical", "critical", "critical", "warning", "ok",
+    ]
+
+
+def test_directory_index_skips_unchanged_directories(tmp_path):
+    """
+    Tests that a refresh only rescans directories whose mtime changed and persists the index.
+    """
+    for name in ("a", "b", "b/c"):
+        (tmp_path / name).mkdir()
+    (tmp_path / "a" / "big").write_bytes(b"x" * 64 * 1024)
+    (tmp_path / "b" / "c" / "small").write_bytes(b"x" * 4096)
+    cache = str(tmp_path / "index.json")
+
+    index = disk_agent.DirectoryIndex(str(tmp_path / "b"), cache, workers=2)
+    index.refresh()
+    assert index.last_stats["rescanned"] == 2
+
+    (tmp_path / "b" / "c" / "new").write_bytes(b"x" * 8192)
+    index = disk_agent.DirectoryIndex(str(tmp_path / "b"), cache, workers=2)
+    stats = index.refresh()
+    assert stats["rescanned"] == 1 and stats["full"] == 0
+
+    sizes = index.sizes()
+    c = os.path.join(str(tmp_path / "b"), "c")
+    assert sizes[str(tmp_path / "b")] == sizes[c] >= 12 * 1024
+    assert index.top(1) == [(str(tmp_path / "b"), sizes[c])]
+
+
+def test_agent_fires_and_resolves_through_the_webhook(monkeypatch):
+    """
+    Tests that crossing the threshold sends one firing event and recovering sends an ok one.
+    """
+    usage = {"free": 10}
+
+    def fake_sample(mountpoint, device, fstype):
+        return disk_agent.MountUsage(mountpoint, device, fstype, size_bytes=100, free_bytes=usage["free"],
+                                     avail_bytes=usage["free"], inodes=100, inodes_free=90)
+
+    posted = []
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+    monkeypatch.setattr(disk_agent, "sample_mount", fake_sample)
+    agent = disk_agent.DiskAgent({"/data": ("/dev/sdb1", "ext4")}, webhook_url="http://receiver/ingest/events",
+                                 slack_url="", index=False)
+    monkeypatch.setattr(agent.http, "post", lambda url, data, timeout, headers: posted.append(data) or FakeResponse())
+
+    agent.sample()
+    agent.sample()
+    usage["free"] = 40
+    agent.sample()
+
+    events = [json.loads(body) for body in posted]
+    assert [(event["check"], event["status"]) for event in events] == [("disk_space", "firing"), ("disk_space", "ok")]
+    assert events[0]["mount_point"] == "/data" and events[0]["value"] == 90.0
+    assert 'disk_agent_filesystem_used_ratio{mountpoint="/data",device="/dev/sdb1",fstype="ext4"} 0.6' in agent.metrics
+
+
+def test_once_runs_keep_alert_levels_between_processes(monkeypatch, tmp_path):
+    """
+    Tests that separate --once runs sharing a state file alert once per crossing, not once per run.
+    """
+    usage = {"free": 10}
+
+    def fake_sample(mountpoint, device, fstype):
+        return disk_agent.MountUsage(mountpoint, device, fstype, size_bytes=100, free_bytes=usage["free"],
+                                     avail_bytes=usage["free"], inodes=100, inodes_free=90)
+
+    posted = []
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+    monkeypatch.setattr(disk_agent, "sample_mount", fake_sample)
+    state = str(tmp_path / "state.json")
+
+    def run_once():
+        agent = disk_agent.DiskAgent({"/data": ("/dev/sdb1", "ext4")}, webhook_url="http://receiver/ingest/events",
+                                     slack_url="", index=False, state_path=state)
+        monkeypatch.setattr(agent.http, "post",
+                            lambda url, data, timeout, headers: posted.append(data) or FakeResponse())
+        agent.sample()
+        return agent
+
+    assert run_once().critical()
+    assert run_once().critical()
+    usage["free"] = 40
+    assert not run_once().critical()
+
+    events = [json.loads(body) for body in posted]
+    assert [event["status"] for event in events] == ["firing", "ok"]
+
+
+def test_host_events_url_keeps_the_legacy_webhook_setting():
+    """
+    Tests that a GLPI_WEBHOOK_URL pointing at /alert still reaches the receiver, now on /ingest/events.
+    """
+    assert disk_agent.host_events_url(None, "http://webhook:5000/alert") == "http://webhook:5000/ingest/events"
+    assert disk_agent.host_events_url(None, "http://webhook:5000/alert/") == "http://webhook:5000/ingest/events"
+    assert disk_agent.host_events_url(None, "http://webhook:5000") == "http://webhook:5000/ingest/events"
+    assert disk_agent.host_events_url(None, "") == ""
+    assert disk_agent.host_events_url("http://events/in", "http://webhook:5000/alert") == "http://events/in"
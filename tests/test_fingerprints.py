@@ -0,0 +1,59 @@
+import fingerprints
+from fingerprints import FingerprintIndex, alert_fingerprint
+
+
+def test_repeats_map_to_the_first_ticket(tmp_path):
+    """
+    Tests reserve/assign semantics for repeated alerts.
+    """
+    index = FingerprintIndex(str(tmp_path / "state.db"), ttl=3600)
+
+    assert index.reserve("fp") == (True, None)
+    # Another worker sees the reservation while the ticket is being created
+    assert index.reserve("fp") == (False, None)
+
+    index.assign("fp", 42)
+    assert index.reserve("fp") == (False, 42)
+    assert index.lookup(["fp", "other"]) == {"fp": 42}
+
+    index.forget("fp")
+    assert index.reserve("fp") == (True, None)
+
+
+def test_expired_entries_are_evicted(tmp_path):
+    """
+    Tests TTL eviction and release of failed reservations.
+    """
+    index = FingerprintIndex(str(tmp_path / "state.db"), ttl=0)
+    index.assign("old", 1)
+    assert index.lookup(["old"]) == {}
+    assert index.evict_expired() == 1
+
+    index.reserve("failed")
+    index.release("failed")
+    assert index.reserve("failed") == (True, None)
+
+
+def test_lookup_refresh_slides_the_ttl(tmp_path, monkeypatch):
+    """
+    Tests that deduplicated repeats found through lookup keep their ticket past the original TTL.
+    """
+    clock = [1000.0]
+    monkeypatch.setattr(fingerprints.time, "time", lambda: clock[0])
+    index = FingerprintIndex(str(tmp_path / "state.db"), ttl=100)
+    index.assign("fp", 7)
+
+    clock[0] += 80
+    assert index.lookup(["fp"], refresh=True) == {"fp": 7}
+    clock[0] += 80
+    assert index.lookup(["fp"]) == {"fp": 7}
+    clock[0] += 30
+    assert index.lookup(["fp"]) == {}
+
+
+def test_fingerprint_falls_back_to_label_hash():
+    """
+    Tests that alerts without an Alertmanager fingerprint still get a stable one.
+    """
+    assert alert_fingerprint({"fingerprint": "abc"}) == "abc"
+    assert alert_fingerprint({"labels": {"a": "1", "b": "2"}}) == alert_fingerprint({"labels": {"b": "2", "a": "1"}})
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import httpx
+
+from glpi import AsyncGLPIClient, ticket_input
+from resilience import RetryPolicy
+
+
+def make_client(handler):
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncGLPIClient(
+        http,
+        base_url="http://glpi.test/",
+        app_token="app",
+        user_token="user",
+        username="glpi",
+        password="glpi",
+    )
+
+
+def test_ticket_lifecycle_over_shared_pool():
+    """
+    Tests init_session, create_ticket and close_session against a fake GLPI.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path, request.headers.get("Session-Token")))
+        if request.url.path.endswith("/initSession"):
+            assert request.headers["Authorization"] == "user_token user"
+            return httpx.Response(200, json={"session_token": "abc"})
+        if request.url.path.endswith("/Ticket"):
+            body = json.loads(request.content)
+            assert body["input"]["urgency"] == 5
+            return httpx.Response(201, json={"id": 42, "message": ""})
+        return httpx.Response(200, json={})
+
+    async def scenario():
+        client = make_client(handler)
+        assert await client.init_session()
+        result = await client.create_ticket("title", "body", urgency=5, priority=5)
+        await client.close_session()
+        await client.http.aclose()
+        return result
+
+    assert asyncio.run(scenario()) == {"id": 42, "message": ""}
+    assert calls == [
+        ("GET", "/apirest.php/initSession", None),
+        ("POST", "/apirest.php/Ticket", "abc"),
+        ("GET", "/apirest.php/killSession", "abc"),
+    ]
+
+
+def test_create_ticket_returns_none_on_http_error():
+    """
+    Tests that GLPI errors are reported as a missing ticket instead of raising.
+    """
+    def handler(request):
+        if request.url.path.endswith("/initSession"):
+            return httpx.Response(200, json={"session_token": "abc"})
+        return httpx.Response(502)
+
+    async def scenario():
+        client = make_client(handler)
+        await client.init_session()
+        return await client.create_ticket("title", "body")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_session_is_reused_and_refreshed_after_401():
+    """
+    Tests that one login serves many tickets and a rejected token triggers a single re-login.
+    """
+    logins = []
+    expired = {"abc"}
+
+    def handler(request):
+        if request.url.path.endswith("/initSession"):
+            token = "abc" if not logins else "def"
+            logins.append(token)
+            return httpx.Response(200, json={"session_token": token})
+        if request.headers["Session-Token"] in expired:
+            return httpx.Response(401, json=["ERROR_SESSION_TOKEN_INVALID", "session expired"])
+        return httpx.Response(201, json={"id": 7})
+
+    async def scenario():
+        client = make_client(handler)
+        await client.ensure_session()
+        first = await client.create_ticket("a", "b")
+        second = await client.create_ticket("c", "d")
+        return first, second, client.session_token
+
+    first, second, token = asyncio.run(scenario())
+    assert first == second == {"id": 7}
+    assert logins == ["abc", "def"]
+    assert token == "def"
+
+
+def test_create_tickets_posts_array_input_and_maps_ids():
+    """
+    Tests bulk creation through GLPI's array input, including a rejected item.
+    """
+    posted = []
+
+    def handler(request):
+        if request.url.path.endswith("/initSession"):
+            return httpx.Response(200, json={"session_token": "abc"})
+        posted.append(json.loads(request.content)["input"])
+        return httpx.Response(207, json=[{"id": 10, "message": ""}, {"id": False, "message": "denied"}])
+
+    async def scenario():
+        client = make_client(handler)
+        return await client.create_tickets([ticket_input("a", "x"), ticket_input("b", "y")])
+
+    assert asyncio.run(scenario()) == [{"id": 10, "message": ""}, None]
+    assert [ticket["name"] for ticket in posted[0]] == ["a", "b"]
+
+
+def test_post_is_retried_only_when_glpi_did_not_apply_it():
+    """
+    Tests that a POST is retried after 429/503 but not after a 502, which GLPI may have applied.
+    """
+    answers = []
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if request.url.path.endswith("/initSession"):
+            return httpx.Response(200, json={"session_token": "abc"})
+        return answers.pop(0)
+
+    async def scenario():
+        client = make_client(handler)
+        client.retry = RetryPolicy(max_attempts=3, base_delay=0)
+        await client.init_session()
+        return await client.create_ticket("title", "body")
+
+    answers[:] = [httpx.Response(503), httpx.Response(201, json={"id": 5})]
+    assert asyncio.run(scenario()) == {"id": 5}
+    assert calls.count("POST") == 2
+
+    calls.clear()
+    answers[:] = [httpx.Response(502), httpx.Response(201, json={"id": 6})]
+    assert asyncio.run(scenario()) is None
+    assert calls.count("POST") == 1
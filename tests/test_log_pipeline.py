@@ -0,0 +1,68 @@
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+import log_pipeline
+
+
+@pytest.fixture(autouse=True)
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_json_records_carry_extra_fields_and_rate_limit_counts(monkeypatch):
+    """
+    Tests JSON output with fingerprint/ticket fields and that repeated errors are rate-limited.
+    """
+    stream = io.StringIO()
+    listener = log_pipeline.setup_logging(fmt="json", rate_limit_burst=2, rate_limit_window=60, stream=stream)
+    clock = [1000.0]
+    monkeypatch.setattr(log_pipeline.time, "monotonic", lambda: clock[0])
+    logger = logging.getLogger("test.pipeline")
+    try:
+        for ticket_id in range(5):
+            logger.error("Error closing GLPI ticket #%s", ticket_id, extra={"ticket_id": ticket_id, "fingerprint": "f1"})
+        clock[0] += 61
+        logger.error("Error closing GLPI ticket #%s", 9)
+    finally:
+        log_pipeline.stop_listener(listener)
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record["message"] for record in records] == [
+        "Error closing GLPI ticket #0", "Error closing GLPI ticket #1", "Error closing GLPI ticket #9",
+    ]
+    assert records[0]["ticket_id"] == 0 and records[0]["fingerprint"] == "f1"
+    assert records[2]["suppressed"] == 3
+
+
+def test_slow_sink_never_blocks_the_caller():
+    """
+    Tests that a stalled log stream drops records once the queue is full instead of blocking.
+    """
+    class StalledStream(io.StringIO):
+        released = threading.Event()
+
+        def write(self, text):
+            self.released.wait()
+            return super().write(text)
+
+    stream = StalledStream()
+    listener = log_pipeline.setup_logging(fmt="text", queue_size=10, rate_limit_burst=0, stream=stream)
+    logger = logging.getLogger("test.pipeline")
+    try:
+        for i in range(100):
+            logger.warning("record %s", i)
+    finally:
+        stream.released.set()
+        log_pipeline.stop_listener(listener)
+
+    written = stream.getvalue().splitlines()
+    assert 0 < len(written) <= 11
+    assert written[0].endswith("record 0")
@@ -20,3 +20,18 @@ def test_root():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Axity Infra Ops Lab"}
+
+def test_metrics_use_route_templates():
+    """
+    Tests that /metrics exposes request counts and latency labelled by route, not raw path.
+    """
+    client.get("/healthz")
+    client.get("/does-not-exist")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/healthz",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{le="0.5",method="GET",route="/healthz"}' in body
+    assert 'route="<unmatched>",status="404"' in body
+    assert "/does-not-exist" not in body
+    assert 'route="/metrics"' not in body
@@ -0,0 +1,13 @@
+from metrics import BoundedLabel
+
+
+def test_bounded_label_folds_new_values_into_other():
+    """
+    Tests that only the first max_values label values are kept.
+    """
+    label = BoundedLabel(2)
+
+    assert label("HighCPU") == "HighCPU"
+    assert label("DiskFull") == "DiskFull"
+    assert label("AppDown") == BoundedLabel.OTHER
+    assert label("HighCPU") == "HighCPU"
@@ -0,0 +1,125 @@
+import json
+
+import requests
+
+from scripts import open_alert
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error")
+
+
+def test_replay_reuses_one_session_and_keeps_failures(tmp_path, monkeypatch):
+    """
+    Tests that --replay streams the spool through a single session and saves failed records.
+    """
+    calls = []
+
+    def fake_request(method, url, **kwargs):
+        endpoint = url.split("/apirest.php/")[1]
+        calls.append((method, endpoint))
+        if endpoint == "initSession":
+            return FakeResponse(200, {"session_token": "abc"})
+        if endpoint == "Ticket":
+            return FakeResponse(201, [{"id": 5, "message": ""}])
+        return FakeResponse(404, {})
+
+    monkeypatch.setattr(open_alert.requests.Session, "request", lambda self, method, url, **kwargs: fake_request(method, url))
+
+    spool = tmp_path / "dead_letter.jsonl"
+    records = [
+        {"action": "create", "input": {"name": "Disk full"}},
+        {"action": "close", "ticket_id": 9},
+    ]
+    spool.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    assert open_alert.replay_spool(str(spool), rate=0) is False
+    assert calls.count(("GET", "initSession")) == 1
+    assert [json.loads(line) for line in open(f"{spool}.retry")] == [records[1]]
+
+
+def test_transient_errors_are_retried(monkeypatch):
+    """
+    Tests that a 503 from GLPI is retried before giving up, but a POST answered 502 is not.
+    """
+    responses = [FakeResponse(503, {}), FakeResponse(201, {"id": 3})]
+    monkeypatch.setattr(open_alert.requests.Session, "request", lambda self, method, url, **kwargs: responses.pop(0))
+    monkeypatch.setattr(open_alert, "GLPI_RETRY_BASE_DELAY", 0)
+
+    client = open_alert.GLPIClient()
+    client.session_token = "abc"
+    assert client.create_ticket("title", "body") == {"id": 3}
+
+    responses[:] = [FakeResponse(502, {}), FakeResponse(201, {"id": 4})]
+    client.create_ticket("title", "body")
+    assert len(responses) == 1
+
+
+def test_stream_creates_one_ticket_per_line_with_one_session(monkeypatch, capsys):
+    """
+    Tests that --jsonl streams every line through a single login and reports bad lines.
+    """
+    calls = []
+
+    def fake_request(self, method, url, **kwargs):
+        endpoint = url.split("/apirest.php/")[1]
+        calls.append((method, endpoint))
+        if endpoint == "initSession":
+            return FakeResponse(200, {"session_token": "abc"})
+        return FakeResponse(201, {"id": len(calls)})
+
+    monkeypatch.setattr(open_alert.requests.Session, "request", fake_request)
+    alert = {"alert_type": "disk_space", "severity": "high", "hostname": "web-01", "message": "Disk 95%"}
+    lines = [json.dumps(alert) + "\n"] * 5 + ["\n", "{not json\n", json.dumps({**alert, "severity": 5}) + "\n",
+                                             json.dumps({**alert, "mount": ["/"]}) + "\n", "[1]\n"]
+
+    assert open_alert.stream_alerts(iter(lines), concurrency=3) is False
+    assert calls.count(("GET", "initSession")) == 1
+    assert calls.count(("POST", "Ticket")) == 5
+    output = capsys.readouterr().out
+    assert "✗ line 7: invalid alert" in output
+    assert "✗ line 8: invalid alert: 'severity' is required and must be a string" in output
+    assert "✗ line 9: invalid alert: 'mount' must be a string or a number" in output
+    assert "✗ line 10: invalid alert: alert must be a JSON object" in output
+    assert "5 tickets created, 4 failed" in output
+
+
+def test_stream_logs_in_again_when_the_session_expires(monkeypatch, capsys):
+    """
+    Tests that a session expiring partway through a stream costs one new login, not failed tickets.
+    """
+    calls = []
+    sessions = iter(["abc", "def"])
+    server = {"token": None, "tickets": 0}
+
+    def fake_request(self, method, url, headers=None, **kwargs):
+        endpoint = url.split("/apirest.php/")[1]
+        calls.append((method, endpoint))
+        if endpoint == "initSession":
+            server["token"] = next(sessions)
+            return FakeResponse(200, {"session_token": server["token"]})
+        if endpoint == "killSession":
+            return FakeResponse(200, {})
+        if headers.get("Session-Token") != server["token"]:
+            return FakeResponse(401, ["ERROR_SESSION_TOKEN_INVALID", "session expired"])
+        server["tickets"] += 1
+        if server["tickets"] == 4:
+            server["token"] = None  # GLPI drops the session after the fourth ticket
+        return FakeResponse(201, {"id": server["tickets"]})
+
+    monkeypatch.setattr(open_alert.requests.Session, "request", fake_request)
+    alert = {"alert_type": "disk_space", "severity": "high", "hostname": "web-01", "message": "Disk 95%"}
+
+    assert open_alert.stream_alerts(iter([json.dumps(alert) + "\n"] * 10), concurrency=3) is True
+    assert calls.count(("GET", "initSession")) == 2
+    assert server["tickets"] == 10
+    assert "10 tickets created, 0 failed" in capsys.readouterr().out
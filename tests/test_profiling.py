@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+
+import profiling
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_finds_the_hot_function():
+    """
+    Tests that a thread spinning in one function dominates the profile and shows up in collapsed stacks.
+    """
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        result = profiling.SamplingProfiler(interval=0.002).profile(0.2)
+    finally:
+        stop.set()
+        worker.join()
+
+    summary = profiling.profile_summary(result)
+    assert summary["samples"] >= 20
+    busy = [entry for entry in summary["cumulative"] if entry["function"].startswith("busy_loop (test_profiling.py")]
+    assert busy and busy[0]["samples"] >= summary["threads"]["busy"] * 0.9
+    assert any(line.startswith("busy;") and "busy_loop" in line
+               for line in profiling.collapsed_stacks(result).splitlines())
+
+
+def test_loop_lag_and_memory_diff():
+    """
+    Tests that blocking the event loop shows up as lag and that new allocations show up in a memory diff.
+    """
+    async def scenario():
+        monitor = profiling.LoopLagMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+        return monitor.status()
+
+    status = asyncio.run(scenario())
+    assert status["max_seconds"] >= 0.15 and status["p50_seconds"] < 0.1
+
+    memory = profiling.MemoryTracker()
+    memory.start()
+    try:
+        memory.snapshot()
+        retained = [bytearray(1024) for _ in range(1000)]
+        diff = memory.diff(top=5)
+    finally:
+        memory.stop()
+    assert retained and diff["top"][0]["location"].startswith("test_profiling.py:")
+    assert diff["top"][0]["size_diff_bytes"] >= 1000 * 1024
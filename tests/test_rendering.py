@@ -0,0 +1,44 @@
+import json
+import os
+
+from rendering import DEFAULT_TEMPLATES_DIR, TicketRenderer
+
+ALERT = {
+    "status": "firing",
+    "startsAt": "2024-01-01T00:00:00Z",
+    "labels": {"alertname": "AppDown", "severity": "critical", "service": "axity-lab-app"},
+    "annotations": {"summary": "Axity Lab Application is down"},
+}
+
+
+def test_default_template_matches_the_built_in_ticket_text():
+    """
+    Tests that the shipped default template renders the ticket text the receiver always produced.
+    """
+    title, description = TicketRenderer(DEFAULT_TEMPLATES_DIR).render(ALERT)
+
+    assert title == "[CRITICAL] AppDown - axity-lab-app"
+    assert description.startswith("\nALERT DETAILS:\n==============\nAlert: AppDown\n")
+    assert "SUMMARY:\nAxity Lab Application is down\n" in description
+    assert "DESCRIPTION:\nNo description available\n" in description
+    assert f"LABELS:\n{json.dumps(ALERT['labels'], indent=2)}\n" in description
+
+
+def test_templates_are_selected_memoized_and_hot_reloaded(tmp_path):
+    """
+    Tests alertname-specific lookup, the render cache and reload on file change.
+    """
+    (tmp_path / "alertname").mkdir()
+    (tmp_path / "default.tmpl").write_text("{alertname} on {instance}\nbody")
+    specific = tmp_path / "alertname" / "AppDown.tmpl"
+    specific.write_text("{service} is down\n{summary}")
+    renderer = TicketRenderer(str(tmp_path), reload_interval=0)
+
+    assert renderer.render(ALERT) == ("axity-lab-app is down", "Axity Lab Application is down")
+    assert renderer.render({"labels": {"alertname": "HighCPU"}}) == ("HighCPU on unknown", "body")
+    assert renderer.render(ALERT) is renderer.render(ALERT)
+
+    specific.write_text("{SEVERITY}: {service}\nchanged")
+    stat = os.stat(specific)
+    os.utime(specific, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert renderer.render(ALERT) == ("CRITICAL: axity-lab-app", "changed")
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+
+from resilience import AdaptiveConcurrencyLimiter, CircuitBreaker, CircuitOpenError, TokenBucket
+
+
+def test_circuit_breaker_opens_and_recovers_through_half_open():
+    """
+    Tests closed -> open -> half-open -> closed transitions.
+    """
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial call is allowed while half-open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_token_bucket_spaces_calls_after_burst():
+    """
+    Tests that calls beyond the burst wait for new tokens.
+    """
+    async def scenario():
+        bucket = TokenBucket(rate=100, burst=2)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.015
+
+
+def test_aimd_limit_grows_on_fast_calls_and_halves_on_slow_ones():
+    """
+    Tests additive increase and multiplicative decrease of the concurrency limit.
+    """
+    limiter = AdaptiveConcurrencyLimiter(initial=4, min_limit=1, max_limit=8, target_latency=0.5)
+    for _ in range(4):
+        limiter.record(0.1, True)
+    assert 4.5 < limiter.limit < 5.5
+
+    limiter.record(2.0, True)
+    assert limiter.limit < 3
+    # A burst of slow responses counts as a single decrease
+    limiter.record(2.0, False)
+    assert limiter.limit >= 2
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import routing
+from glpi import AsyncGLPIClient
+
+RULES = {
+    "defaults": {"requester": 2, "group": "NOC"},
+    "rules": [
+        {"match": {"service": "payments"}, "entity": "Root entity > Payments", "category": 12},
+        {"match": {"team": ["infrastructure", "noc"]}, "category": "Infra", "group": "Infra On-call"},
+    ],
+}
+
+GLPI_ITEMS = {
+    "Entity": [{"id": 3, "completename": "Root entity > Payments"}],
+    "Group": [{"id": 7, "completename": "NOC"}, {"id": 8, "completename": "Infra On-call"},
+              {"id": 9, "completename": "Infra On-call > Night"}],
+    "ITILCategory": [],
+}
+
+
+def test_first_matching_rule_sets_each_field():
+    """
+    Tests that each field comes from the first matching rule that sets it, then from the defaults.
+    """
+    table = routing.RoutingTable(RULES["rules"], RULES["defaults"])
+
+    assert table.select({"service": "payments", "team": "noc"}) == {
+        "entity": "Root entity > Payments", "category": 12, "group": "Infra On-call", "requester": 2,
+    }
+    assert table.select({"service": "shop"}) == {"group": "NOC", "requester": 2}
+    with pytest.raises(routing.RoutingError):
+        routing.RoutingTable([{"match": {}, "group": "NOC"}])
+
+
+def test_router_routes_from_cache_and_survives_glpi_outage(tmp_path, monkeypatch):
+    """
+    Tests that names are resolved once in the background, routing makes no GLPI call and
+    cached IDs are kept through a GLPI outage until their TTL runs out.
+    """
+    path = tmp_path / "routing.json"
+    path.write_text(json.dumps(RULES))
+    calls = []
+    glpi_down = False
+
+    def handler(request):
+        endpoint = request.url.path.split("/apirest.php/", 1)[1]
+        calls.append(endpoint)
+        if glpi_down:
+            raise httpx.ConnectError("connection refused")
+        if endpoint == "initSession":
+            return httpx.Response(200, json={"session_token": "token"})
+        return httpx.Response(200, json=GLPI_ITEMS[endpoint])
+
+    clock = [1000.0]
+    monkeypatch.setattr(routing.time, "time", lambda: clock[0])
+    client = AsyncGLPIClient(httpx.AsyncClient(transport=httpx.MockTransport(handler)), "http://glpi.test",
+                             app_token="app", user_token="user", username="glpi", password="glpi")
+    router = routing.TicketRouter(client, str(path), ttl=600)
+    labels = {"service": "payments", "team": "noc"}
+
+    asyncio.run(router.refresh())
+    lookups = len(calls)
+    assert router.route(labels) == {
+        "entities_id": 3, "itilcategories_id": 12, "_groups_id_assign": 8, "_users_id_requester": 2,
+    }
+    assert len(calls) == lookups
+    assert router.status()["unresolved"] == {"category:Infra": "not found"}
+
+    glpi_down = True
+    client.session_token = None
+    clock[0] += 300
+    asyncio.run(router.refresh())
+    assert router.route(labels)["_groups_id_assign"] == 8
+
+    clock[0] += 400
+    assert router.route(labels) == {"itilcategories_id": 12, "_users_id_requester": 2}
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import httpx
+
+from glpi import AsyncGLPIClient
+from shared_state import LeaderLock, SharedState
+
+
+def test_shared_state_expiry_and_compare_and_delete(tmp_path):
+    """
+    Tests values visible across connections, TTL expiry and conditional delete.
+    """
+    path = str(tmp_path / "queue.db")
+    state, other = SharedState(path), SharedState(path)
+
+    state.set("token", "abc")
+    assert other.get("token") == "abc"
+    other.delete("token", "stale")
+    assert state.get("token") == "abc"
+    other.delete("token", "abc")
+    assert state.get("token") is None
+
+    state.set("short", "x", ttl=0.01)
+    time.sleep(0.02)
+    assert other.get("short") is None
+
+
+def test_only_one_leader_until_it_releases(tmp_path):
+    """
+    Tests that the leader lock is exclusive and can be taken over after release.
+    """
+    path = str(tmp_path / "queue.db.leader")
+    first, second = LeaderLock(path), LeaderLock(path)
+
+    assert first.acquire() and first.held
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_processes_reuse_one_glpi_session_through_the_store(tmp_path):
+    """
+    Tests that a second client picks up the session token instead of logging in again.
+    """
+    logins = []
+
+    def handler(request):
+        if request.url.path.endswith("/initSession"):
+            logins.append(request)
+            return httpx.Response(200, json={"session_token": "shared"})
+        return httpx.Response(201, json={"id": 1, "message": ""})
+
+    async def scenario():
+        store = SharedState(str(tmp_path / "queue.db"))
+        clients = [
+            AsyncGLPIClient(httpx.AsyncClient(transport=httpx.MockTransport(handler)), "http://glpi.test",
+                            "app", "user", "glpi", "glpi", session_store=store)
+            for _ in range(2)
+        ]
+        for client in clients:
+            assert await client.create_ticket("title", "body")
+            await client.http.aclose()
+        return clients[1].session_token
+
+    assert asyncio.run(scenario()) == "shared"
+    assert len(logins) == 1
@@ -0,0 +1,137 @@
+import asyncio
+import sqlite3
+import time
+
+from resilience import CircuitOpenError
+from ticket_queue import TicketQueue, TicketWorkerPool
+
+
+def test_jobs_are_leased_until_acknowledged(tmp_path):
+    """
+    Tests batched enqueue, lease-based claim and at-least-once redelivery.
+    """
+    queue = TicketQueue(str(tmp_path / "queue.db"), lease_seconds=0)
+    assert queue.put_many([{"n": 1}, {"n": 2}]) == 2
+
+    first = queue.claim()
+    assert first.payload == {"n": 1} and first.attempts == 1
+
+    # An expired lease makes the job deliverable again
+    again = queue.claim()
+    assert again.id == first.id and again.attempts == 2
+
+    queue.ack(first.id)
+    queue.retry(queue.claim().id, delay=3600)
+    assert queue.claim() is None
+    assert queue.depth() == 1
+
+
+def test_worker_pool_drains_queue_and_retries_failures(tmp_path):
+    """
+    Tests that workers acknowledge successes and re-queue failed jobs.
+    """
+    queue = TicketQueue(str(tmp_path / "queue.db"))
+    queue.put_many([{"ok": True}, {"ok": False}])
+    seen = []
+
+    async def handler(payload):
+        seen.append(payload)
+        return payload["ok"]
+
+    async def scenario():
+        pool = TicketWorkerPool(queue, handler, workers=2, poll_interval=0.01, retry_delay=3600)
+        pool.start()
+        while len(seen) < 2:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+    asyncio.run(scenario())
+    assert queue.depth() == 1
+    assert queue.claim() is None
+
+
+def test_open_circuit_parks_job_without_using_an_attempt(tmp_path):
+    """
+    Tests that CircuitOpenError postpones the job instead of counting a failure.
+    """
+    queue = TicketQueue(str(tmp_path / "queue.db"))
+    queue.put_many([{"n": 1}])
+
+    async def handler(payload):
+        raise CircuitOpenError(retry_after=3600)
+
+    async def scenario():
+        pool = TicketWorkerPool(queue, handler, workers=1, poll_interval=0.01)
+        pool.start()
+        await asyncio.sleep(0.1)
+        await pool.stop()
+
+    asyncio.run(scenario())
+    row = queue._conn.execute("SELECT attempts, available_at FROM ticket_jobs").fetchone()
+    assert row[0] == 0
+    assert row[1] > time.time() + 3000
+
+
+def test_drain_finishes_quick_jobs_and_releases_slow_ones(tmp_path):
+    """
+    Tests that draining waits for in-flight jobs up to the deadline and hands unfinished ones back at once.
+    """
+    queue = TicketQueue(str(tmp_path / "queue.db"), lease_seconds=3600)
+    queue.put_many([{"delay": 0.05}, {"delay": 60}, {"delay": 0}])
+    started = []
+
+    async def handler(payload):
+        started.append(payload)
+        await asyncio.sleep(payload["delay"])
+        return True
+
+    async def scenario():
+        pool = TicketWorkerPool(queue, handler, workers=2, poll_interval=0.01)
+        pool.start()
+        while len(started) < 2:
+            await asyncio.sleep(0.01)
+        return await pool.drain(timeout=0.3)
+
+    result = asyncio.run(scenario())
+    assert result["abandoned"] == 1 and 0.3 <= result["seconds"] < 1
+    # The quick job finished, no new job was started after draining began
+    assert [job["delay"] for job in started] == [0.05, 60]
+    leftover = queue.claim()
+    assert leftover.payload == {"delay": 60} and leftover.attempts == 1
+    assert queue.depth() == 2
+
+
+def test_claim_prefers_high_priority_but_ages_old_jobs(tmp_path):
+    """
+    Tests priority lanes, the min_priority filter for reserved workers and aging.
+    """
+    queue = TicketQueue(str(tmp_path / "queue.db"), max_wait=3600)
+    queue.put_many([{"n": "info"}, {"n": "critical"}, {"n": "warning"}], priorities=[2, 5, 3])
+
+    assert queue.claim(min_priority=5).payload == {"n": "critical"}
+    assert queue.claim(min_priority=5) is None
+    assert queue.depth_by_priority() == {2: 1, 3: 1, 5: 1}
+
+    # The info job has now waited longer than max_wait and jumps the queue
+    queue.max_wait = 0
+    assert queue.claim().payload == {"n": "info"}
+
+
+def test_queue_without_priority_column_is_migrated(tmp_path):
+    """
+    Tests that a queue database from before priority lanes keeps its jobs.
+    """
+    path = str(tmp_path / "queue.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE ticket_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, enqueued_at REAL NOT NULL,
+            available_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, leased_until REAL NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT INTO ticket_jobs (payload, enqueued_at, available_at) VALUES ('{\"n\": 1}', 0, 0)")
+    conn.commit()
+    conn.close()
+
+    job = TicketQueue(path).claim()
+    assert job.payload == {"n": 1} and job.priority == 3
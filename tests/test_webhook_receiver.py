@@ -0,0 +1,429 @@
+import asyncio
+import json
+import os
+import signal
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+FIRING_ALERT = {
+    "status": "firing",
+    "labels": {"alertname": "AppDown", "severity": "critical", "service": "axity-lab-app"},
+    "annotations": {"summary": "Axity Lab Application is down"},
+}
+
+
+class FakeGLPI:
+    """Records GLPI API calls made through an httpx.MockTransport"""
+
+    def __init__(self):
+        self.calls = []
+        self.fail_tickets = False
+
+    def __call__(self, request):
+        endpoint = request.url.path.split("/apirest.php/", 1)[1]
+        self.calls.append((request.method, endpoint))
+        if endpoint == "initSession":
+            return httpx.Response(200, json={"session_token": "token"})
+        if request.method == "POST" and endpoint == "Ticket":
+            if self.fail_tickets:
+                return httpx.Response(400, json=["ERROR_GLPI_ADD", "rejected"])
+            return httpx.Response(201, json={"id": len(self.tickets()), "message": ""})
+        return httpx.Response(200, json={})
+
+    def tickets(self):
+        return [call for call in self.calls if call == ("POST", "Ticket")]
+
+    def wait_for(self, call, timeout=5):
+        deadline = time.time() + timeout
+        while call not in self.calls:
+            assert time.time() < deadline, f"GLPI never received {call}"
+            time.sleep(0.01)
+
+
+def use_tmp_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "QUEUE_PATH", str(tmp_path / "queue.db"))
+    monkeypatch.setattr(main, "DEAD_LETTER_PATH", str(tmp_path / "dead_letter.jsonl"))
+
+
+@pytest.fixture
+def receiver(tmp_path, monkeypatch):
+    use_tmp_storage(tmp_path, monkeypatch)
+    monkeypatch.setattr(main, "QUEUE_WORKERS", 0)
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def glpi(tmp_path, monkeypatch):
+    fake = FakeGLPI()
+    use_tmp_storage(tmp_path, monkeypatch)
+    monkeypatch.setattr(main, "QUEUE_WORKERS", 1)
+    monkeypatch.setattr(main, "QUEUE_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(main, "build_http_client", lambda **kwargs: httpx.AsyncClient(transport=httpx.MockTransport(fake)))
+    with TestClient(main.app) as client:
+        yield client, fake
+
+
+def test_firing_alerts_are_queued(receiver):
+    """
+    Tests that /alert persists firing alerts and skips the rest.
+    """
+    payload = {"receiver": "webhook", "status": "firing",
+               "alerts": [FIRING_ALERT, {**FIRING_ALERT, "status": "resolved"}]}
+    response = receiver.post("/alert", json=payload)
+
+    assert response.status_code == 200
+    assert response.json()["alerts_processed"] == 1
+    assert main.app.state.queue.depth() == 1
+
+
+def test_full_queue_applies_backpressure(receiver, monkeypatch):
+    """
+    Tests that /alert answers 503 with Retry-After above the high-water mark.
+    """
+    monkeypatch.setattr(main, "QUEUE_HIGH_WATER", 0)
+    response = receiver.post("/alert", json={"receiver": "webhook", "status": "firing", "alerts": [FIRING_ALERT]})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(main.QUEUE_RETRY_AFTER)
+
+
+def test_repeats_are_deduplicated_and_resolve_closes_ticket(glpi):
+    """
+    Tests the fingerprint index: one ticket per alert, closed when it resolves.
+    """
+    client, fake = glpi
+    alert = {**FIRING_ALERT, "fingerprint": "f1"}
+
+    client.post("/alert", json={"receiver": "webhook", "status": "firing", "alerts": [alert]})
+    fake.wait_for(("POST", "Ticket"))
+    while not main.app.state.fingerprints.lookup(["f1"]).get("f1"):
+        time.sleep(0.01)
+
+    repeat = client.post("/alert", json={"receiver": "webhook", "status": "firing", "alerts": [alert]})
+    assert repeat.json()["alerts_deduplicated"] == 1
+
+    client.post("/alert", json={"receiver": "webhook", "status": "resolved",
+                                "alerts": [{**alert, "status": "resolved"}]})
+    fake.wait_for(("PUT", "Ticket/1"))
+    assert len(fake.tickets()) == 1
+
+
+def test_resolve_queued_before_its_firing_alert_ran_closes_the_ticket(glpi):
+    """
+    Tests that a resolve arriving while the firing alert still waits in the queue is kept and closes its ticket.
+    """
+    client, fake = glpi
+    main.app.state.workers.retry_delay = 0.05
+    fake.fail_tickets = True
+    alert = {**FIRING_ALERT, "fingerprint": "f2"}
+
+    client.post("/alert", json={"receiver": "webhook", "status": "firing", "alerts": [alert]})
+    fake.wait_for(("POST", "Ticket"))
+    resolved = client.post("/alert", json={"receiver": "webhook", "status": "resolved",
+                                           "alerts": [{**alert, "status": "resolved"}]})
+    assert resolved.json()["alerts_resolved"] == 1
+
+    fake.fail_tickets = False
+    deadline = time.time() + 5
+    while not any(method == "PUT" for method, _ in fake.calls):
+        assert time.time() < deadline, "the ticket of the resolved alert was never closed"
+        time.sleep(0.01)
+    assert ("PUT", f"Ticket/{len(fake.tickets())}") in fake.calls
+
+
+def test_exhausted_alerts_go_to_dead_letter_spool(glpi, tmp_path):
+    """
+    Tests that a ticket GLPI keeps rejecting ends up in the dead-letter spool.
+    """
+    client, fake = glpi
+    main.app.state.workers.max_attempts = 1
+    fake.fail_tickets = True
+
+    client.post("/alert", json={"receiver": "webhook", "status": "firing", "alerts": [FIRING_ALERT]})
+    spool = tmp_path / "dead_letter.jsonl"
+    deadline = time.time() + 5
+    while not spool.exists() or not spool.read_text():
+        assert time.time() < deadline, "alert never reached the dead-letter spool"
+        time.sleep(0.01)
+
+    record = json.loads(spool.read_text())
+    assert record["action"] == "create"
+    assert record["input"]["name"] == "[CRITICAL] AppDown - axity-lab-app"
+
+
+def test_invalid_payloads_are_rejected_without_the_model(receiver):
+    """
+    Tests the fast-path validation of the fields the receiver relies on.
+    """
+    bad_labels = {"receiver": "webhook", "status": "firing", "alerts": [{"status": "firing", "labels": []}]}
+
+    assert receiver.post("/alert", content=b"{not json").status_code == 422
+    assert receiver.post("/alert", json={"status": "firing", "alerts": []}).status_code == 422
+    response = receiver.post("/alert", json=bad_labels)
+    assert response.status_code == 422
+    assert "alerts[0].labels" in response.json()["detail"]
+    for field, values in (("labels", {"alertname": ["x"]}), ("annotations", {"summary": {"text": "x"}})):
+        alert = {**FIRING_ALERT, field: values}
+        response = receiver.post("/alert", json={"receiver": "webhook", "status": "firing", "alerts": [alert]})
+        assert response.status_code == 422 and f"alerts[0].{field}" in response.json()["detail"]
+
+
+def test_pipeline_stages_are_instrumented(glpi):
+    """
+    Tests that a created ticket shows up in the stage and alert-to-ticket histograms.
+    """
+    client, fake = glpi
+    before = main.alert_to_ticket_seconds._sum.get()
+
+    client.post("/alert", json={"receiver": "webhook", "status": "firing", "alerts": [FIRING_ALERT]})
+    fake.wait_for(("POST", "Ticket"))
+    deadline = time.time() + 5
+    while main.alert_to_ticket_seconds._sum.get() == before:
+        assert time.time() < deadline, "alert-to-ticket latency was never observed"
+        time.sleep(0.01)
+
+    metrics = client.get("/metrics").text
+    assert 'webhook_glpi_stage_duration_seconds_count{stage="ticket_create"}' in metrics
+    assert 'webhook_glpi_responses_total{code="201",method="POST"}' in metrics
+    assert 'webhook_alerts_by_name_total{alertname="AppDown",severity="critical"}' in metrics
+    assert "webhook_queue_wait_seconds_count" in metrics
+
+
+def test_host_events_are_coalesced_and_queued(receiver):
+    """
+    Tests that /ingest/events queues one alert per host/check and reports bad lines.
+    """
+    legacy = {"alert": "disk_space", "severity": "critical", "hostname": "web-01", "mount_point": "/",
+              "usage_percent": 91, "threshold": 85, "message": "Disk usage on web-01 (/) is at 91%"}
+    lines = [
+        json.dumps(legacy),
+        json.dumps({**legacy, "usage_percent": 93}),
+        json.dumps({"host": "web-02", "check": "disk_space", "severity": "warning"}),
+        "{not json",
+        json.dumps({"check": "disk_space"}),
+        json.dumps({**legacy, "mount_point": ["/", "/data"]}),
+    ]
+    response = receiver.post("/ingest/events", content="\n".join(lines).encode(),
+                             headers={"Content-Type": "application/x-ndjson"})
+
+    body = response.json()
+    assert response.status_code == 200
+    assert (body["events_total"], body["events_invalid"], body["events_coalesced"]) == (6, 3, 1)
+    assert body["alerts_processed"] == 2
+    assert body["errors"][0] == "line 4: invalid JSON"
+    assert body["errors"][2] == "line 6: 'mount_point' must be a string or a number"
+
+    jobs = [main.app.state.queue.claim() for _ in range(2)]
+    web01 = next(job.payload for job in jobs if job.payload["labels"]["instance"] == "web-01")
+    assert web01["annotations"]["description"] == "usage_percent: 93; threshold: 85"
+    assert web01["labels"]["mountpoint"] == "/"
+
+    resolved = receiver.post("/ingest/events", content=json.dumps({**legacy, "status": "ok"}).encode())
+    assert resolved.json()["alerts_processed"] == 0
+
+    assert receiver.post("/ingest/events", content=b"{not json\n").status_code == 422
+
+
+def test_ready_answers_from_the_cached_glpi_probe(glpi):
+    """
+    Tests that /ready reflects the background probe and costs no GLPI call per request.
+    """
+    client, fake = glpi
+    fake.wait_for(("GET", "getActiveProfile"))
+    while main.app.state.health.ok is None:
+        time.sleep(0.01)
+
+    probes = fake.calls.count(("GET", "getActiveProfile"))
+    for _ in range(20):
+        response = client.get("/ready")
+        assert response.status_code == 200
+    assert fake.calls.count(("GET", "getActiveProfile")) == probes
+    assert ("POST", "Ticket") not in fake.calls
+    assert response.json()["glpi"]["reachable"] is True
+
+
+@pytest.mark.parametrize("requires_glpi", [True, False])
+def test_ready_fails_when_glpi_is_unreachable(tmp_path, monkeypatch, requires_glpi):
+    """
+    Tests that /ready answers 503 with the probe error only with READY_REQUIRES_GLPI, while /health stays up.
+    """
+    use_tmp_storage(tmp_path, monkeypatch)
+    monkeypatch.setattr(main, "QUEUE_WORKERS", 0)
+    monkeypatch.setattr(main, "READY_REQUIRES_GLPI", requires_glpi)
+
+    def unreachable(request):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(main, "build_http_client", lambda **kwargs: httpx.AsyncClient(transport=httpx.MockTransport(unreachable)))
+    monkeypatch.setattr(main, "GLPI_RETRY_ATTEMPTS", 1)
+    with TestClient(main.app) as client:
+        deadline = time.time() + 5
+        while main.app.state.health.checked_at is None:
+            assert time.time() < deadline, "GLPI was never probed"
+            time.sleep(0.01)
+
+        response = client.get("/ready")
+        assert response.status_code == (503 if requires_glpi else 200)
+        assert response.json()["glpi"]["error"] == "GLPI login failed"
+        health = client.get("/health")
+        assert health.status_code == 200
+        assert health.json()["glpi"]["reachable"] is False
+
+
+def test_capture_records_webhook_bodies_for_replay(tmp_path, monkeypatch):
+    """
+    Tests that with CAPTURE_DIR set, every webhook body is captured with its path and arrival time.
+    """
+    import capture
+
+    use_tmp_storage(tmp_path, monkeypatch)
+    monkeypatch.setattr(main, "QUEUE_WORKERS", 0)
+    monkeypatch.setattr(main, "CAPTURE_DIR", str(tmp_path / "capture"))
+    alert = json.dumps({"alerts": [FIRING_ALERT]}).encode()
+    with TestClient(main.app) as client:
+        client.post("/alert", content=alert)
+        client.post("/alert", content=b"{not json")
+        client.post("/ingest/events", content=b'{"host": "web-01", "check": "disk_space"}\n')
+
+    records = list(capture.read_capture([str(tmp_path / "capture")]))
+    assert [(record["path"], record["body"]) for record in records] == [
+        ("/alert", alert), ("/alert", b"{not json"), ("/ingest/events", b'{"host": "web-01", "check": "disk_space"}\n'),
+    ]
+    assert records[0]["t"] <= records[1]["t"] <= records[2]["t"]
+    assert records[2]["content_type"] == "application/x-ndjson"
+
+
+def test_warm_up_precedes_readiness_and_draining_rejects_alerts(glpi):
+    """
+    Tests that startup logs in and opens pooled connections, and that a draining receiver turns alerts away.
+    """
+    client, fake = glpi
+    deadline = time.time() + 5
+    while not main.app.state.warm:
+        assert time.time() < deadline, "GLPI warm-up never finished"
+        time.sleep(0.01)
+    assert fake.calls.count(("GET", "initSession")) == 1
+    assert fake.calls.count(("GET", "getActiveProfile")) >= main.GLPI_WARM_CONNECTIONS
+
+    main.app.state.draining = True
+    response = client.post("/alert", json={"receiver": "webhook", "status": "firing", "alerts": [FIRING_ALERT]})
+    assert response.status_code == 503 and "Retry-After" in response.headers
+    assert client.get("/ready").json()["status"] == "draining"
+    assert main.app.state.queue.depth() == 0
+
+
+@pytest.mark.parametrize("installed_with", ["event loop", "signal.signal"])
+def test_sigterm_starts_draining_before_uvicorn_shuts_down(monkeypatch, installed_with):
+    """
+    Tests that SIGTERM flags the receiver as draining at once, starts the single shutdown deadline
+    and hands over to uvicorn's graceful shutdown after the ready delay, however uvicorn listens for signals.
+    """
+    monkeypatch.setattr(main, "SHUTDOWN_READY_DELAY", 0.2)
+    app = SimpleNamespace(state=SimpleNamespace(draining=False, shutdown_deadline=None))
+    exits = []
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(signal.SIGINT)
+        if installed_with == "event loop":
+            loop.add_signal_handler(signal.SIGINT, exits.append, "uvicorn")
+        else:
+            signal.signal(signal.SIGINT, lambda signum, frame: exits.append("uvicorn"))
+        main.install_drain_signal(app)
+        try:
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.sleep(0.05)
+            assert app.state.draining and exits == []
+            assert 0 < app.state.shutdown_deadline - time.monotonic() <= main.SHUTDOWN_DRAIN_TIMEOUT
+            await asyncio.sleep(0.3)
+        finally:
+            loop.remove_signal_handler(signal.SIGTERM)
+            loop.remove_signal_handler(signal.SIGINT)
+            signal.signal(signal.SIGINT, previous)
+
+    asyncio.run(scenario())
+    assert exits == ["uvicorn"]
+    # The lifespan shutdown keeps the deadline SIGTERM started instead of granting a new one
+    deadline = app.state.shutdown_deadline
+    main.start_draining(app)
+    assert app.state.shutdown_deadline == deadline
+
+
+def test_ticket_workers_start_after_the_first_routing_refresh(monkeypatch):
+    """
+    Tests that the leader resolves the routing names before claiming jobs, without waiting forever for GLPI.
+    """
+    calls = []
+
+    class Router:
+        def __init__(self, delay):
+            self.delay = delay
+
+        async def refresh(self):
+            await asyncio.sleep(self.delay)
+            calls.append("refresh")
+
+        def start(self):
+            calls.append("router")
+
+    def app(delay):
+        start = SimpleNamespace(start=lambda: calls.append("start"))
+        return SimpleNamespace(state=SimpleNamespace(router=Router(delay), storms=start, workers=start))
+
+    asyncio.run(main.start_ticket_workers(app(0)))
+    assert calls == ["refresh", "router", "start", "start"]
+
+    calls.clear()
+    monkeypatch.setattr(main, "WARMUP_TIMEOUT", 0.05)
+    asyncio.run(main.start_ticket_workers(app(10)))
+    assert calls == ["router", "start", "start"]
+
+
+def test_debug_endpoints_are_hidden_and_token_guarded(receiver, monkeypatch):
+    """
+    Tests that /debug is 404 unless enabled and then requires the debug token.
+    """
+    assert receiver.get("/debug/loop").status_code == 404
+
+    monkeypatch.setattr(main, "DEBUG_ENDPOINTS", True)
+    monkeypatch.setattr(main, "DEBUG_TOKEN", "s3cret")
+    assert receiver.get("/debug/loop", headers={"X-Debug-Token": "wrong"}).status_code == 403
+
+    headers = {"X-Debug-Token": "s3cret"}
+    profile = receiver.get("/debug/profile", params={"seconds": 0.05}, headers=headers)
+    assert profile.status_code == 200 and profile.json()["samples"] > 0
+    for seconds in ("nan", "inf", "-1"):
+        assert receiver.get("/debug/profile", params={"seconds": seconds}, headers=headers).status_code == 422
+    assert receiver.get("/debug/memory/diff", headers=headers).status_code == 409
+
+
+def test_web_workers_follow_the_container_cpu_quota(tmp_path, monkeypatch):
+    """
+    Tests that the cgroup v2 and v1 CPU quotas cap the default number of worker processes.
+    """
+    v2 = tmp_path / "v2"
+    v2.mkdir()
+    (v2 / "cpu.max").write_text("150000 100000\n")
+    v1 = tmp_path / "v1" / "cpu,cpuacct"
+    v1.mkdir(parents=True)
+    (v1 / "cpu.cfs_quota_us").write_text("200000\n")
+    (v1 / "cpu.cfs_period_us").write_text("100000\n")
+    unlimited = tmp_path / "unlimited"
+    unlimited.mkdir()
+    (unlimited / "cpu.max").write_text("max 100000\n")
+
+    assert main.cgroup_cpu_limit(str(v2)) == 1.5
+    assert main.cgroup_cpu_limit(str(tmp_path / "v1")) == 2.0
+    assert main.cgroup_cpu_limit(str(unlimited)) is None
+    assert main.cgroup_cpu_limit(str(tmp_path / "missing")) is None
+
+    monkeypatch.setattr(main.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    monkeypatch.setattr(main, "cgroup_cpu_limit", lambda: 1.5)
+    assert main.default_web_workers() == 2